@@ -1,20 +1,27 @@
 from .constants import *
 from .lexer.lexer import Lexer 
+from .lexer.regex_lexer import RegexLexer
 from .parser.parser import Parser
 from .interpreter import (
   Interpreter, 
+  ClosureCompiler,
+  Transpiler,
   Context, 
   SymbolTable, 
   Builtin_Function_Or_Method,
   values
 )
+from .vm import Compiler, VirtualMachine
+from .resolver import Resolver
 
 
-global_symbol_table = SymbolTable()
+# 内置变量单独放在一个表中, 作为全局变量表的上级表
+builtins_symbol_table = SymbolTable()
+global_symbol_table = SymbolTable(builtins_symbol_table)
 
 
 def set_builtins():
-  g = global_symbol_table
+  g = builtins_symbol_table
   g.set('null', values.null)
   g.set('Inf', values.Float(float('inf')))
   g.set('NaN', values.Float(float('nan')))
@@ -38,12 +45,49 @@ def set_builtins():
       g.set(k, Builtin_Function_Or_Method(func, func_name))
 
 
-def run(file, code):
+def run_tree(ast, context):
+  return Interpreter.visit(ast, context)
+
+
+def run_closure(ast, context):
+  return ClosureCompiler.compile(ast)(context)
+
+
+def run_vm(ast, context):
+  return VirtualMachine.run(Compiler.compile(ast), context)
+
+
+def run_python(ast, context):
+  return Transpiler.run(ast, context)
+
+
+# 可选的执行方式: 遍历语法树, 先把语法树编译为闭包再执行, 编译为字节码由虚拟机执行,
+# 或转换为 Python 代码由 CPython 执行
+BACKENDS = {
+  'tree': run_tree,
+  'closure': run_closure,
+  'vm': run_vm,
+  'python': run_python,
+}
+
+
+def run(file, code, backend='tree', optimizer=None, resolver=None, typechecker=None):
+  """
+  code 可以是字符串, 也可以是按行迭代的输入流 (如文件对象), 此时边读取边解析;
+  optimizer 为 Optimizer 时, 先优化语法树再执行; typechecker 为 TypeChecker 时, 把类型确定的运算替换为特化的节点;
+  执行前由 resolver (默认新建一个 Resolver) 解析变量名
+  """
   set_builtins()
   
-  lexer = Lexer(file, code)
-  tokens = lexer.parse()
-  ast = Parser(tokens).parse()
+  lexer = RegexLexer(file, code)
+  ast = Parser(lexer.iter_tokens(), lexer.brackets).parse()
+  if optimizer is not None:
+    ast = optimizer.optimize(ast)
+  if typechecker is not None:
+    ast = typechecker.check(ast)
+  if resolver is None:
+    resolver = Resolver(global_symbol_table)
+  resolver.resolve(ast)
   context = Context('<module>')
   context.symbol_table = global_symbol_table
-  return Interpreter.visit(ast, context)
+  return BACKENDS[backend](ast, context)
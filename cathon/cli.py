@@ -1,19 +1,24 @@
 import argparse, sys, os
 from . import errors, __version__
-from .basic import run
+from .basic import run, BACKENDS, global_symbol_table
+from .optimizer import Optimizer
+from .resolver import Resolver
+from .typechecker import TypeChecker
+from .interpreter.interpreter import cache_info, enable_cache_stats
+from .interpreter.quicken import quicken_info
 from .shell import Shell
 
 
-def run_code(file, code):
+def run_code(file, code, backend='tree', optimizer=None, resolver=None, typechecker=None):
   try:
-    res = run(file, code)
+    res = run(file, code, backend, optimizer, resolver, typechecker)
   except errors.BaseError as e:
     print(str(e))
     
   
-def run_file(file):
+def run_file(file, backend='tree', optimizer=None, resolver=None, typechecker=None):
   try:
-    run(file.name, file.read())
+    run(file.name, file, backend, optimizer, resolver, typechecker)
   except errors.BaseError as e:
     print(str(e))
   
@@ -35,15 +40,42 @@ def main():
   )
   parser.add_argument('-v', '-V', '--version', action='version', version='%(prog)s ' + __version__)
   parser.add_argument('-c', dest='cmd')
+  parser.add_argument('-b', '--backend', choices=BACKENDS, default='tree')
+  parser.add_argument('-O', dest='optimize', action='count', default=0, help='optimize the syntax tree; -OO also prunes constant branches')
+  parser.add_argument('--opt-report', action='store_true', help='print what the optimizer eliminated to stderr')
+  parser.add_argument('--check-names', action='store_true', help='print the names that are never defined to stderr')
+  parser.add_argument('--typecheck', action='store_true', help='infer the types of operations and run the proven ones without dispatch')
+  parser.add_argument('--explain', action='store_true', help='with --typecheck, print which operations were specialized to stderr')
+  parser.add_argument('--cache-stats', action='store_true', help='print the hit rates of the small-value caches to stderr')
+  parser.add_argument('--quicken-stats', action='store_true', help='print how many sites the closure backend specialized, deoptimized or gave up on to stderr')
   parser.add_argument('file', nargs='?', type=argparse.FileType('r'), default=sys.stdin)
   
   args = parser.parse_args()
+  optimizer = Optimizer(args.optimize) if args.optimize else None
+  resolver = Resolver(global_symbol_table)
+  typechecker = TypeChecker(global_symbol_table) if args.typecheck else None
+  if args.cache_stats:
+    enable_cache_stats()
   if args.cmd is not None:
-    run_code('<string>', args.cmd)
+    run_code('<string>', args.cmd, args.backend, optimizer, resolver, typechecker)
   elif not args.file.isatty():
-    run_file(args.file)
+    run_file(args.file, args.backend, optimizer, resolver, typechecker)
   else:
     Shell()
+  if optimizer is not None and args.opt_report:
+    print(optimizer.report(), file=sys.stderr)
+  if args.check_names:
+    for line in resolver.report():
+      print(line, file=sys.stderr)
+  if typechecker is not None and args.explain:
+    for line in typechecker.report():
+      print(line, file=sys.stderr)
+  if args.cache_stats:
+    for name, (hits, misses, rate) in cache_info().items():
+      print(f'{name} cache: {hits} hits, {misses} misses ({rate:.1%})', file=sys.stderr)
+  if args.quicken_stats:
+    for name, count in quicken_info().items():
+      print(f'{name} sites: {count}', file=sys.stderr)
   exit()
 
 
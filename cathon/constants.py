@@ -18,7 +18,7 @@ BUILTINS = {
 }
 BUILTINS_FUNC: dict[tuple, callable] = {
   ('print', '打印'): print,
-  ('getattr', '取属性'): 'cat_getattr',
+  ('getattr', '取属性'): 'builtin_getattr',
   ('abs', '绝对值'): 'cat_abs',
   ('len', '长度'): 'cat_len',
   # ('repr', ): 'cat_repr',
@@ -28,6 +28,7 @@ BUILTINS_FUNC: dict[tuple, callable] = {
 }
 BUILTINS |= set(chain.from_iterable(BUILTINS_FUNC))
 
+BOOL_OP = { DOUBLEAMPER, DOUBLEVBAR }
 COMP_OP = { EQEQUAL, NOTEQUAL, LESS, GREATER, LESSEQUAL, GREATEREQUAL }
 BITWISE_OR_OP = { VBAR }
 BITWISE_XOR_OP = { CIRCUMFLEX }
@@ -38,6 +39,7 @@ SUM_OP = { PLUS, MINUS }
 TERM_OP = { STAR, SLASH, DOUBLESLASH, PERCENT, AT }
 POWER_OP = { DOUBLESTAR }
 UNARY_OP = { PLUS, MINUS, TILDE }
+BRACKETS = { LPAR: RPAR, LSQB: RSQB, LBRACE: RBRACE }
 
 ASSIGNMENT_OP = {
   PLUSEQUAL, MINEQUAL, 
@@ -76,12 +76,21 @@ class BaseError(Exception):
   ATTR__name__ = 'BaseException'
   
   def __init__(self, pos_start: Position, pos_end: Position, error_name: str, details: str, error_pos_start=None,  error_pos_end=None):
-    self.pos_start = pos_start.copy()
-    self.pos_end = pos_end.copy()
+    self.pos_start = pos_start
+    self.pos_end = pos_end
     self.error_name = error_name
     self.details = details
     self.error_pos_start = error_pos_start
     self.error_pos_end = error_pos_end
+  
+  def locate(self, node, context=None):
+    """
+    值的方法中产生的错误不带位置, 由正在执行的节点 (或 Span) 补上
+    """
+    if self.pos_start is None:
+      self.pos_start = node.pos_start
+      self.pos_end = node.pos_end
+    return self
     
   def __str__(self):
     return (
@@ -121,6 +130,11 @@ class RuntimeError(BaseError):
   ):
     self.context = context
     super().__init__(pos_start, pos_end, error_name, details, error_pos_start, error_pos_end)
+  
+  def locate(self, node, context=None):
+    if self.context is None:
+      self.context = context
+    return super().locate(node, context)
 
   def __str__(self):
     return (
@@ -1,7 +1,9 @@
 from .interpreter import Interpreter
+from .closure import ClosureCompiler
+from .transpiler import Transpiler
 from .context import Context
 from .table import SymbolTable
 from . import values
 from .values import Builtin_Function_Or_Method
 
-__all__ = ['Interpreter', 'Context', 'SymbolTable', 'values', 'Builtin_Function_Or_Method']
\ No newline at end of file
+__all__ = ['Interpreter', 'ClosureCompiler', 'Transpiler', 'Context', 'SymbolTable', 'values', 'Builtin_Function_Or_Method']
\ No newline at end of file
@@ -0,0 +1,141 @@
+import inspect
+
+from .. import errors
+
+
+Parameter = inspect.Parameter
+
+
+def builtin(name: str):
+  """
+  声明内置函数 (或类型的构造函数) 的参数, 类似 CPython 的 Argument Clinic:
+  参数列表与实现相同, 参数的注解为值的类 (或值的类在实现所在模块中的名字) 时检查参数类型;
+  装饰时生成一次与实现参数列表相同的函数, 由 Python 按位置/关键字绑定参数,
+  再逐个 isinstance 检查, 报错信息的前缀也在生成时确定, 调用时不需要查看调用栈;
+  没有需要检查的参数时直接返回实现本身
+
+  @builtin('type.__new__')
+  def CAT__new__(self, name: 'String', bases: 'Tuple', dict: 'Dict', **kwds): ...
+  """
+  def decorator(func):
+    return Signature(name, func).build()
+  return decorator
+
+
+class Signature(object):
+  """
+  内置函数 name 的参数声明, 由 builtin 生成
+  """
+
+  def __init__(self, name: str, func):
+    self.name = name
+    self.func = func
+    self.parameters = list(inspect.signature(func).parameters.values())
+
+  def defaults(self) -> list:
+    return [i.default for i in self.parameters if i.default is not Parameter.empty]
+
+  def checks(self) -> list:
+    """
+    [(参数名, 注解, 报错信息的前缀, 默认值的序号或 None)];
+    第一个参数为 self 时不计入参数的序号; 取默认值时不检查类型
+    """
+    res = []
+    position = 0
+    defaults = 0
+    for i, param in enumerate(self.parameters):
+      default = None
+      if param.default is not Parameter.empty:
+        default = defaults
+        defaults += 1
+      if i == 0 and param.name == 'self':
+        continue
+      if param.kind in (Parameter.POSITIONAL_ONLY, Parameter.POSITIONAL_OR_KEYWORD):
+        position += 1
+        argument = f'argument {position}'
+      else:
+        argument = f'argument {param.name!r}'
+      if param.annotation is Parameter.empty:
+        continue
+      res.append((param.name, param.annotation, f'{self.name}() {argument} must be ', default))
+    return res
+
+  def source(self, checks) -> str:
+    params = []
+    args = []
+    defaults = 0
+    seen_positional_only = seen_keyword_only = False
+    for param in self.parameters:
+      text = param.name
+      if param.default is not Parameter.empty:
+        text += f'=_defaults[{defaults}]'
+        defaults += 1
+      if param.kind is Parameter.POSITIONAL_ONLY:
+        seen_positional_only = True
+        args.append(param.name)
+      else:
+        if seen_positional_only:
+          params.append('/')
+          seen_positional_only = False
+        if param.kind is Parameter.POSITIONAL_OR_KEYWORD:
+          args.append(param.name)
+        elif param.kind is Parameter.VAR_POSITIONAL:
+          text = '*' + text
+          args.append(text)
+          seen_keyword_only = True
+        elif param.kind is Parameter.KEYWORD_ONLY:
+          if not seen_keyword_only:
+            params.append('*')
+            seen_keyword_only = True
+          args.append(f'{param.name}={param.name}')
+        else:
+          text = '**' + text
+          args.append(text)
+      params.append(text)
+    if seen_positional_only:
+      params.append('/')
+
+    lines = [
+      'def make(_func, _types, _defaults, _mismatch):',
+      f"  def {self.func.__name__}({', '.join(params)}):",
+    ]
+    for i, (param, annotation, _, default) in enumerate(checks):
+      type_ = annotation if isinstance(annotation, str) else f'_types[{i}]'
+      test = f'not isinstance({param}, {type_})'
+      if default is not None:
+        test = f'{param} is not _defaults[{default}] and {test}'
+      lines.append(f'    if {test}:')
+      lines.append(f'      _mismatch({i}, {param})')
+    lines.append(f"    return _func({', '.join(args)})")
+    lines.append(f'  return {self.func.__name__}')
+    return '\n'.join(lines)
+
+  def build(self):
+    checks = self.checks()
+    if not checks:
+      return self.func
+    globals_ = self.func.__globals__
+
+    def mismatch(i, value):
+      _, annotation, prefix, _ = checks[i]
+      if isinstance(annotation, str):
+        annotation = globals_[annotation]
+      raise errors.TypeError(
+        None, None,
+        f'{prefix}{annotation.CAT__class__.CAT__name__}, not {value.CAT__class__.CAT__name__}',
+        None,
+      )
+
+    namespace = {}
+    # 在实现所在的模块中执行, 注解中的名字在调用时按模块的全局变量查找
+    exec(self.source(checks), globals_, namespace)
+    res = namespace['make'](
+      self.func,
+      [i[1] for i in checks],
+      self.defaults(),
+      mismatch,
+    )
+    res.__qualname__ = self.func.__qualname__
+    res.__doc__ = self.func.__doc__
+    res.__wrapped__ = self.func
+    return res
@@ -0,0 +1,368 @@
+from collections.abc import Callable
+from .. import errors
+from ..parser.nodes import *
+from .interpreter import Interpreter, auto, unbox, binary_dispatch, constant
+from .context import Context
+from .values import *
+from .quicken import Site, item_handlers, subscriptable, callable_type
+
+
+class ClosureCompiler(object):
+  """
+  把语法树编译为嵌套的 Python 闭包: 每个节点只编译一次,
+  执行时直接调用子节点的闭包, 不再经过 Interpreter.visit 分派;
+  各节点的语义 (包括报错) 与 Interpreter 共用同一套辅助方法;
+  运算、取属性、取下标与调用节点在预热后按看到的操作数类型特化 (见 quicken.Site)
+  """
+  # {节点类型: compile_* 方法}, 与 Interpreter.visitors 相同
+  compilers: dict[type, Callable] = {}
+  interpreter = Interpreter
+
+  def __init_subclass__(cls, **kwargs):
+    super().__init_subclass__(**kwargs)
+    cls.build_compilers()
+
+  @classmethod
+  def build_compilers(cls):
+    cls.compilers = {}
+    todo = [ASTNode]
+    while todo:
+      node_class = todo.pop()
+      todo.extend(node_class.__subclasses__())
+      method = getattr(cls, f'compile_{node_class.__name__}', None)
+      if method is not None:
+        cls.compilers[node_class] = method
+
+  @classmethod
+  def compile(cls, node) -> Callable[[Context], Object]:
+    try:
+      compiler = cls.compilers[type(node)]
+    except KeyError:
+      method_name = f'compile_{type(node).__name__}'
+      if not hasattr(cls, method_name):
+        raise AttributeError(f'No compile method "{method_name}"')
+      compiler = cls.compilers[type(node)] = getattr(cls, method_name)
+    return compiler(node)
+
+  @staticmethod
+  def compile_NumberNode(node):
+    value = node.value.value
+    node.constant = constant(value)
+    def literal(context):
+      return value
+    return literal
+
+  compile_StringNode = compile_NumberNode
+
+  @classmethod
+  def compile_UnaryOpNode(cls, node):
+    right = cls.compile(node.right)
+    op = node.op.type
+    unary_op = cls.interpreter.unary_op
+    def unary(context):
+      return unary_op(node, op, right(context), context)
+    return unary
+
+  @classmethod
+  def compile_TypedUnaryOpNode(cls, node):
+    right = cls.compile(node.right)
+    func = node.func
+    def unary(context):
+      return func(right(context))
+    return unary
+
+  @classmethod
+  def compile_BinaryOpNode(cls, node):
+    left = cls.compile(node.left)
+    right = cls.compile(node.right)
+    op = node.op.type
+    binary_op = cls.interpreter.binary_op
+    site = Site()
+    func = left_type = right_type = None
+    def binary(context):
+      nonlocal func, left_type, right_type
+      l = left(context)
+      r = right(context)
+      if func is not None:
+        if type(l) is left_type and type(r) is right_type:
+          return func(l, r)
+        func = None
+        site.deoptimize()
+      elif site.active and site.observe((type(l), type(r))):
+        func = binary_dispatch.get((op, type(l), type(r)))
+        if func is None:
+          site.unspecializable()
+        else:
+          left_type, right_type = type(l), type(r)
+          site.specialized()
+          return func(l, r)
+      return binary_op(node, op, l, r, context)
+    return binary
+
+  @classmethod
+  def compile_TypedBinaryOpNode(cls, node):
+    left = cls.compile(node.left)
+    right = cls.compile(node.right)
+    func = node.func
+    def binary(context):
+      return func(left(context), right(context))
+    return binary
+
+  @classmethod
+  def compile_BoolOpNode(cls, node):
+    left = cls.compile(node.left)
+    right = cls.compile(node.right)
+    boolean = cls.interpreter.boolean
+    if node.op.type == DOUBLEVBAR:
+      def or_(context):
+        l = left(context)
+        if boolean(l):
+          return l
+        return right(context)
+      return or_
+    def and_(context):
+      l = left(context)
+      if not boolean(l):
+        return l
+      return right(context)
+    return and_
+
+  @classmethod
+  def compile_VarAccessNode(cls, node):
+    var_name = node.var.value
+    depth, slot = node.depth, node.slot
+    load_name = cls.interpreter.load_name
+    def access(context):
+      return load_name(node, var_name, depth, slot, context)
+    return access
+
+  @classmethod
+  def compile_VarAssignNode(cls, node):
+    value = cls.compile(node.value)
+    slot = node.slot
+    assign = cls.interpreter.assign
+    def var_assign(context):
+      return assign(node, slot, value(context), context)
+    return var_assign
+
+  @classmethod
+  def compile_VarDeleteNode(cls, node):
+    visit = cls.interpreter.visit_VarDeleteNode
+    def var_delete(context):
+      return visit(node, context)
+    return var_delete
+
+  @classmethod
+  def compile_TupleNode(cls, node):
+    items = [cls.compile(i) for i in node.items]
+    def tuple_(context):
+      return Tuple(auto(i(context)) for i in items)
+    return tuple_
+
+  @classmethod
+  def compile_ListNode(cls, node):
+    items = [cls.compile(i) for i in node.items]
+    def list_(context):
+      return List(auto(i(context)) for i in items)
+    return list_
+
+  @classmethod
+  def compile_DictNode(cls, node):
+    items = [(cls.compile(k), cls.compile(v)) for k, v in node.items.items()]
+    make_dict = cls.interpreter.make_dict
+    def dict_(context):
+      return make_dict(node, (
+        (lambda k=k: k(context), lambda v=v: v(context))
+        for k, v in items
+      ), context)
+    return dict_
+
+  @classmethod
+  def compile_SliceNode(cls, node):
+    start, stop, step = (
+      None if i is None else cls.compile(i)
+      for i in (node.start, node.stop, node.step)
+    )
+    make_slice = cls.interpreter.make_slice
+    def slice_(context):
+      return make_slice(
+        None if start is None else start(context),
+        None if stop is None else stop(context),
+        None if step is None else step(context),
+      )
+    return slice_
+
+  @classmethod
+  def compile_GetAttrNode(cls, node):
+    object = cls.compile(node.object)
+    attr_site = AttributeSite(node.attr_name.value)
+    get_attr = cls.interpreter.get_attr
+    site = Site()
+    object_type = None
+    def getattr_(context):
+      nonlocal object_type
+      obj = object(context)
+      if object_type is not None:
+        if type(obj) is object_type:
+          # 值已经是 Object, 不需要 auto
+          try:
+            res = attr_site.get(obj)
+          except errors.BaseError as e:
+            raise e.locate(node, context)
+          if res is not None:
+            return unbox(res)
+        else:
+          object_type = None
+          site.deoptimize()
+      elif site.active and site.observe(type(obj)):
+        if isinstance(obj, Object):
+          object_type = type(obj)
+          site.specialized()
+        else:
+          site.unspecializable()
+      return get_attr(node, attr_site, obj, context)
+    return getattr_
+
+  @classmethod
+  def compile_SetAttrNode(cls, node):
+    object = cls.compile(node.object)
+    value = cls.compile(node.value)
+    attr_name = node.attr_name.value
+    set_attr = cls.interpreter.set_attr
+    def setattr_(context):
+      obj = object(context)
+      return set_attr(node, attr_name, obj, value(context), context)
+    return setattr_
+
+  @classmethod
+  def compile_GetItemNode(cls, node):
+    object = cls.compile(node.object)
+    key = cls.compile(node.key)
+    check_getitem = cls.interpreter.check_getitem
+    get_item = cls.interpreter.get_item
+    site = Site()
+    handler = object_type = key_type = version = None
+    def getitem(context):
+      nonlocal handler, object_type, key_type, version
+      obj = object(context)
+      if handler is not None:
+        if type(obj) is object_type and object_type._cat_version == version:
+          k = key(context)
+          if type(k) is key_type:
+            try:
+              return unbox(handler(obj, k))
+            except Exception:
+              # 由通用路径重新取下标并报错
+              return get_item(node, obj, k, context)
+          handler = None
+          site.deoptimize()
+          return get_item(node, obj, k, context)
+        handler = None
+        site.deoptimize()
+      check_getitem(node, obj, context)
+      k = key(context)
+      if site.active and site.observe((type(obj), type(k))):
+        handler = item_handlers.get((type(obj), type(k)))
+        if handler is None or not subscriptable(type(obj)):
+          handler = None
+          site.unspecializable()
+        else:
+          object_type, key_type, version = type(obj), type(k), type(obj)._cat_version
+          site.specialized()
+      return get_item(node, obj, k, context)
+    return getitem
+
+  @classmethod
+  def compile_SetItemNode(cls, node):
+    object = cls.compile(node.object)
+    key = cls.compile(node.key)
+    value = cls.compile(node.value)
+    check_setitem = cls.interpreter.check_setitem
+    set_item = cls.interpreter.set_item
+    def setitem(context):
+      obj = object(context)
+      check_setitem(node, obj, context)
+      k = key(context)
+      return set_item(node, obj, k, value(context), context)
+    return setitem
+
+  @classmethod
+  def compile_IfNode(cls, node):
+    oneline = node.oneline
+    cases = [(cls.compile(condition), cls.compile(body)) for condition, body in node.cases]
+    else_node = node.else_block
+    else_block = None if else_node is None else cls.compile(else_node)
+    truth = cls.interpreter.truth
+    def if_(context):
+      for condition, body in cases:
+        if truth(condition(context)):
+          res = body(context)
+          if oneline:
+            return auto(res)
+      if else_block:
+        res = else_block(context)
+        if oneline:
+          return auto(res)
+    return if_
+
+  @classmethod
+  def compile_CallNode(cls, node):
+    if isinstance(node.object, GetAttrNode):
+      return cls.compile_method_call(node)
+    object = cls.compile(node.object)
+    args = [cls.compile(i) for i in node.args.items]
+    kwargs = cls.compile(node.kwargs) if node.kwargs.items else None
+    check_call = cls.interpreter.check_call
+    call = cls.interpreter.call
+    site = Site()
+    object_type = version = None
+    def call_(context):
+      nonlocal object_type, version
+      obj = object(context)
+      # 特化的类型在类中定义了 __call__, check_call 总是通过
+      if type(obj) is not object_type or object_type._cat_version != version:
+        if object_type is not None:
+          object_type = None
+          site.deoptimize()
+        check_call(node, obj, context)
+        if site.active and site.observe(type(obj)):
+          if isinstance(obj, Object) and callable_type(type(obj)):
+            object_type, version = type(obj), type(obj)._cat_version
+            site.specialized()
+          else:
+            site.unspecializable()
+      a = [auto(i(context)) for i in args]
+      return call(node, obj, a, None if kwargs is None else kwargs(context), context)
+    return call_
+
+  @classmethod
+  def compile_method_call(cls, node):
+    """
+    调用方法: 属性所属的对象只求值一次, 由 AttributeSite 按其类型缓存方法
+    """
+    callee = node.object
+    receiver = cls.compile(callee.object)
+    site = AttributeSite(callee.attr_name.value)
+    args = [cls.compile(i) for i in node.args.items]
+    kwargs = cls.compile(node.kwargs) if node.kwargs.items else None
+    interpreter = cls.interpreter
+    load_method = interpreter.load_method
+    check_call = interpreter.check_call
+    call = interpreter.call
+    call_method = interpreter.call_method
+    def method_call(context):
+      r = auto(receiver(context))
+      func = site.method(r)
+      if func is None:
+        func, r = load_method(callee, site, r, context)
+        if r is None:
+          check_call(node, func, context)
+      a = [auto(i(context)) for i in args]
+      k = None if kwargs is None else kwargs(context)
+      if r is None:
+        return call(node, func, a, k, context)
+      return call_method(node, func, r, a, k, context)
+    return method_call
+
+
+ClosureCompiler.build_compilers()
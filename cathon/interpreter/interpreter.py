@@ -1,120 +1,496 @@
+import math
+import operator
+import weakref
 from itertools import chain
+from collections.abc import Callable
 from .. import errors
 from ..parser.nodes import *
 from .values import *
+from .table import SymbolTable
+
+
+# 预先创建的小整数的范围 (与 CPython 相同)
+SMALL_INT_MIN = -5
+SMALL_INT_MAX = 256
+# 驻留的短字符串的最大长度与个数, 个数为 0 时不驻留
+MAX_INTERN_LENGTH = 32
+INTERN_SIZE = 1024
+
+small_ints = [Int(i) for i in range(SMALL_INT_MIN, SMALL_INT_MAX + 1)]
+# 短字符串驻留表, 表满时按驻留的先后淘汰
+interned = {}
+# {缓存: [命中次数, 未命中次数]}, 只在 enable_cache_stats 之后统计
+cache_stats = {'int': [0, 0], 'bool': [0, 0], 'null': [0, 0], 'str': [0, 0]}
 
 
 def auto(val) -> Object:
+  """
+  把原生的 Python 值包装为值 (Object), 按 Python 类型查表选择包装方法
+  """
+  box = boxers.get(type(val))
+  if box is not None:
+    return box(val)
   if isinstance(val, Object):
     return val
-  if isinstance(val, bool):
-    return Bool(val)
-  if isinstance(val, int):
+  box = boxers[type(val)] = find_boxer(type(val))
+  return box(val)
+
+
+def box_bool(val: bool) -> Bool:
+  return true if val else false
+
+
+def box_int(val: int) -> Int:
+  if SMALL_INT_MIN <= val <= SMALL_INT_MAX:
+    return small_ints[val - SMALL_INT_MIN]
+  res = int_constants.get(val)
+  if res is None:
     return Int(val)
-  if isinstance(val, float):
+  return res
+
+
+def box_float(val: float) -> Float:
+  # 0.0 == -0.0, 两者不能共用常量池中的值
+  res = float_constants.get(val) if val else None
+  if res is None:
     return Float(val)
-  if val is None:
-    return null
-  if isinstance(val, str):
-    return String(val)
-  if isinstance(val, tuple):
-    return Tuple(val)
-  if isinstance(val, list):
-    return List(val)
-  if callable(val):
-    return Function(val)
-  return Single(val)
+  return res
+
+
+def box_none(val) -> Null:
+  return null
+
+
+def find_boxer(cls: type) -> Callable:
+  """
+  表中没有的 Python 类型 (如原生类型的子类): 按 isinstance 的顺序选择包装方法
+  """
+  for base in (bool, int, float, str, tuple, list):
+    if issubclass(cls, base):
+      return boxers[base]
+  # 与 callable(val) 相同: 只看类本身 (而非元类) 是否定义了 __call__
+  if any('__call__' in vars(base) for base in cls.__mro__):
+    return Function
+  return Single
+
+
+def intern(val: str) -> String:
+  """
+  短字符串在驻留表中的值, 表满时淘汰最早驻留的一项
+  """
+  if INTERN_SIZE <= 0 or len(val) > MAX_INTERN_LENGTH:
+    res = str_constants.get(val)
+    if res is None:
+      return String(val)
+    return res
+  res = interned.get(val)
+  if res is not None:
+    return res
+  res = interned[val] = String(val)
+  if len(interned) > INTERN_SIZE:
+    del interned[next(iter(interned))]
+  return res
+
+
+def count_bool(val: bool) -> Bool:
+  cache_stats['bool'][0] += 1
+  return box_bool(val)
+
+
+def count_int(val: int) -> Int:
+  cache_stats['int'][0 if SMALL_INT_MIN <= val <= SMALL_INT_MAX else 1] += 1
+  return box_int(val)
+
+
+def count_none(val) -> Null:
+  cache_stats['null'][0] += 1
+  return box_none(val)
+
+
+def count_str(val: str) -> String:
+  cache_stats['str'][0 if val in interned else 1] += 1
+  return intern(val)
+
+
+# 字面量的常量池: {Python 类型: {值: 值 (Object)}}; 值由语法树节点 (或编译后的代码) 持有,
+# 不再被引用时自动移除; 小整数与短字符串之外的原生值包装时也先在这里查找,
+# 因此相同的字面量 (及与之相等的运算结果) 包装后是同一个值
+constants = {
+  int: weakref.WeakValueDictionary(),
+  float: weakref.WeakValueDictionary(),
+  str: weakref.WeakValueDictionary(),
+}
+int_constants = constants[int]
+float_constants = constants[float]
+str_constants = constants[str]
+
+
+def constant_key(val) -> tuple:
+  """
+  区分字面量的键: 1, 1.0 与 True 相等, 0.0 与 -0.0 也相等, 需要按类型与符号区分
+  """
+  if type(val) is float:
+    return float, val, math.copysign(1.0, val)
+  return type(val), val
+
+
+def constant(val) -> Object:
+  """
+  字面量 val 在常量池中的值, 相同的字面量共用同一个值
+  """
+  pool = constants.get(type(val))
+  if pool is None or (pool is float_constants and not val):
+    return auto(val)
+  res = pool.get(val)
+  if res is None:
+    res = pool[val] = auto(val)
+  return res
+
+
+# {Python 类型: 包装方法}, 其余类型在第一次包装时由 find_boxer 补充
+boxers = {
+  bool: box_bool,
+  int: box_int,
+  float: box_float,
+  type(None): box_none,
+  str: intern,
+  tuple: Tuple,
+  list: List,
+}
+BOXED_TYPES = frozenset(boxers)
+# 解释器直接传递、不需要包装的原生类型
+NATIVE_TYPES = frozenset((bool, int, float, str, type(None)))
+
+# 操作数都是数字时直接计算的运算, 结果 (包括 Python 的异常) 与 Number 的对应方法相同
+NATIVE_UNARY_OPS = {
+  PLUS: operator.pos,
+  MINUS: operator.neg,
+  TILDE: operator.invert,
+  EXCLAMATION: operator.not_,
+}
+NATIVE_BINARY_OPS = {
+  DOUBLESTAR: operator.pow,
+  STAR: operator.mul,
+  SLASH: operator.truediv,
+  DOUBLESLASH: operator.floordiv,
+  PERCENT: operator.mod,
+  PLUS: operator.add,
+  MINUS: operator.sub,
+  DOUBLEAMPER: operator.and_,
+  VBAR: operator.or_,
+  CIRCUMFLEX: operator.xor,
+  LEFTSHIFT: operator.lshift,
+  RIGHTSHIFT: operator.rshift,
+  EQEQUAL: operator.eq,
+  NOTEQUAL: lambda a, b: not a == b,
+  LESS: operator.lt,
+  GREATEREQUAL: lambda a, b: not a < b,
+}
+
+
+def _binary(func, left_boxed, right_boxed):
+  """
+  操作数为值 (Int 等) 时先取出其 value, 再调用 func
+  """
+  if left_boxed and right_boxed:
+    return lambda a, b: func(a.value, b.value)
+  if left_boxed:
+    return lambda a, b: func(a.value, b)
+  if right_boxed:
+    return lambda a, b: func(a, b.value)
+  return func
+
+
+def _unary(func, boxed):
+  if boxed:
+    return lambda a: func(a.value)
+  return func
+
+
+def build_dispatch():
+  """
+  预先生成 {(运算符, 左操作数类型, 右操作数类型): 实现} 与 {(运算符, 操作数类型): 实现};
+  表中没有的组合由 Object.binary_op/unary_op 处理
+  """
+  numbers = [(bool, False), (int, False), (float, False), (Bool, True), (Int, True), (Float, True)]
+  binary = {}
+  for op, func in NATIVE_BINARY_OPS.items():
+    for left, left_boxed in numbers:
+      for right, right_boxed in numbers:
+        binary[op, left, right] = _binary(func, left_boxed, right_boxed)
+  # 字符串与整数相乘: 重复字符串
+  for string, string_boxed in ((str, False), (String, True)):
+    for integer, integer_boxed in ((bool, False), (int, False), (Bool, True), (Int, True)):
+      binary[STAR, string, integer] = _binary(operator.mul, string_boxed, integer_boxed)
+      binary[STAR, integer, string] = _binary(operator.mul, integer_boxed, string_boxed)
+
+  unary = {}
+  for op, func in NATIVE_UNARY_OPS.items():
+    for type_, boxed in numbers:
+      unary[op, type_] = _unary(func, boxed)
+  for type_, boxed in ((str, False), (String, True), (type(None), False), (Null, True)):
+    unary[EXCLAMATION, type_] = _unary(operator.not_, boxed)
+  return binary, unary
+
+
+undefined = SymbolTable.undefined
+
+
+def unbox(val):
+  """
+  原生类型的运算结果原样返回, 其余结果包装为值
+  """
+  if type(val) in NATIVE_TYPES:
+    return val
+  return auto(val)
+
+
+binary_dispatch, unary_dispatch = build_dispatch()
+
+
+def cache_info() -> dict:
+  """
+  各缓存的 (命中次数, 未命中次数, 命中率)
+  """
+  res = {}
+  for name, (hits, misses) in cache_stats.items():
+    total = hits + misses
+    res[name] = (hits, misses, hits / total if total else 0.0)
+  return res
+
+
+def clear_cache_stats():
+  for stats in cache_stats.values():
+    stats[0] = stats[1] = 0
+
+
+def enable_cache_stats(enabled: bool = True):
+  """
+  开始 (或停止) 统计各缓存的命中次数: 把包装方法换为同时计数的版本,
+  不统计时包装不需要任何额外的操作
+  """
+  boxes = (count_bool, count_int, count_none, count_str) if enabled else (box_bool, box_int, box_none, intern)
+  for cls, box in zip((bool, int, type(None), str), boxes):
+    boxers[cls] = box
+  # 原生类型的子类在第一次包装时重新选择包装方法
+  for cls in list(boxers):
+    if cls not in BOXED_TYPES:
+      del boxers[cls]
+
+
+class Interpreter(object):
+  # {节点类型: visit_* 方法}, 在类创建时生成; 之后出现的节点类型在第一次访问时补充
+  visitors: dict[type, Callable] = {}
   
+  def __init_subclass__(cls, **kwargs):
+    super().__init_subclass__(**kwargs)
+    cls.build_visitors()
   
-class Interpreter(object):
   @classmethod
-  def visit(cls, node, context):
-    method_name = f'visit_{type(node).__name__}'
+  def build_visitors(cls):
+    cls.visitors = {}
+    todo = [ASTNode]
+    while todo:
+      node_class = todo.pop()
+      todo.extend(node_class.__subclasses__())
+      method = getattr(cls, f'visit_{node_class.__name__}', None)
+      if method is not None:
+        cls.visitors[node_class] = method
+  
+  @classmethod
+  def find_visitor(cls, node_class) -> Callable:
+    method_name = f'visit_{node_class.__name__}'
     if not hasattr(cls, method_name):
       raise AttributeError(f'No visit method "{method_name}"')
-    return getattr(cls, method_name)(node, context)
+    method = cls.visitors[node_class] = getattr(cls, method_name)
+    return method
+  
+  @classmethod
+  def visit(cls, node, context):
+    try:
+      visitor = cls.visitors[type(node)]
+    except KeyError:
+      visitor = cls.find_visitor(type(node))
+    return visitor(node, context)
   
   @staticmethod
   def visit_NumberNode(node, context):
-    return auto(node.value.value).set_pos(node.value.pos_start, node.value.pos_end).set_context(context)
+    if node.constant is None:
+      node.constant = constant(node.value.value)
+    return node.value.value
     
-  @staticmethod
-  def visit_StringNode(node, context):
-    return String(node.value.value).set_pos(node.value.pos_start, node.value.pos_end).set_context(context)
+  visit_StringNode = visit_NumberNode
   
   @classmethod
   def visit_UnaryOpNode(cls, node, context):
-    num = cls.visit(node.right, context)
-    val = num.unary_op(node.op.type)
-    return auto(val).set_pos(node.pos_start, node.pos_end).set_context(context)
+    return cls.unary_op(node, node.op.type, cls.visit(node.right, context), context)
+  
+  @classmethod
+  def visit_TypedUnaryOpNode(cls, node, context):
+    return node.func(cls.visit(node.right, context))
+  
+  @staticmethod
+  def unary_op(node, op, num, context):
+    func = unary_dispatch.get((op, type(num)))
+    if func is not None:
+      return func(num)
+    try:
+      val = auto(num).unary_op(op)
+    except errors.BaseError as e:
+      raise e.locate(node, context)
+    return unbox(val)
   
   @classmethod
   def visit_BinaryOpNode(cls, node, context):
     left = cls.visit(node.left, context)
     right = cls.visit(node.right, context)
+    return cls.binary_op(node, node.op.type, left, right, context)
+  
+  @classmethod
+  def visit_TypedBinaryOpNode(cls, node, context):
+    left = cls.visit(node.left, context)
+    return node.func(left, cls.visit(node.right, context))
+  
+  @classmethod
+  def visit_BoolOpNode(cls, node, context):
+    left = cls.visit(node.left, context)
+    if node.op.type == DOUBLEVBAR:
+      if cls.boolean(left):
+        return left
+    elif not cls.boolean(left):
+      return left
+    return cls.visit(node.right, context)
+  
+  @staticmethod
+  def boolean(value) -> bool:
+    """
+    && 与 || 的左操作数的真假: 与 ! 运算一样按值的 __bool__ 判断, 没有 __bool__ 的值为真;
+    与条件的真假 (truth) 不同, 如 0 && 1 为 0, 而 0 ? 1 : 2 为 1
+    """
+    if type(value) in NATIVE_TYPES:
+      return bool(value)
+    func = getattr(auto(value), 'CAT__bool__', None)
+    return True if func is None else func()
+  
+  @staticmethod
+  def binary_op(node, op, left, right, context):
+    func = binary_dispatch.get((op, type(left), type(right)))
+    if func is not None:
+      return func(left, right)
+    left = auto(left)
+    right = auto(right)
+    error = None
     try:
-      val = left.binary_op(node.op.type, right)
+      val = left.binary_op(op, right)
     except errors.BaseError as e:
+      error = e
+      val = UNSUPPORTED
+    if val is UNSUPPORTED:
+      # 交换操作数重试, 仍不支持时报告左操作数的错误
       try:
-        val = right.binary_op(node.op.type, left)
+        val = right.binary_op(op, left)
       except errors.BaseError:
-        raise e
-    return auto(val).set_pos(node.pos_start, node.pos_end).set_context(context)
+        val = UNSUPPORTED
+      if val is UNSUPPORTED:
+        if error is None:
+          error = left.unsupported(op, right)
+        raise error.locate(node, context)
+    return unbox(val)
+  
+  @classmethod
+  def visit_VarAccessNode(cls, node, context):
+    return cls.load_name(node, node.var.value, node.depth, node.slot, context)
   
   @staticmethod
-  def visit_VarAccessNode(node, context):
-    var_name = node.var.value
-    value = context.symbol_table.get(var_name)
-    if value is context.symbol_table.undefined:
-      raise errors.NameError(
-        node.pos_start, node.pos_end,
-        f"name '{var_name}' is not defined", context
-      )
-    return auto(value).set_pos(node.pos_start, node.pos_end).set_context(context)
+  def load_name(node, var_name, depth, slot, context):
+    """
+    读取 (层数, 槽位) 处的变量; 没有经过 Resolver 的节点 (slot 为 None) 按变量名查找
+    """
+    table = context.symbol_table
+    if slot is None:
+      value = table.get(var_name)
+    else:
+      if depth:
+        table = table.scope(depth)
+      value = table.slots[slot]
+      if value is undefined:
+        # 不在当前的表中: 到上级表 (内置变量) 中查找
+        value = table.load(slot)
+    if value is undefined:
+      raise Interpreter.name_error(node, var_name, context)
+    return value
+  
+  @staticmethod
+  def name_error(node, var_name, context):
+    return errors.NameError(
+      node.pos_start, node.pos_end,
+      f"name '{var_name}' is not defined", context
+    )
   
   @classmethod
   def visit_VarAssignNode(cls, node, context):
-    var_name = node.var.value
-    value = cls.visit(node.value, context)
-    value = auto(value)
-    context.symbol_table.set(var_name, value)
-    return value.set_pos(node.pos_start, node.pos_end).set_context(context)
-    
+    return cls.assign(node, node.slot, cls.visit(node.value, context), context)
+  
   @staticmethod
-  def visit_VarDeleteNode(node, context):
+  def assign(node, slot, value, context):
+    value = unbox(value)
+    table = context.symbol_table
+    if slot is None:
+      table.set(node.var.value, value)
+    else:
+      table.slots[slot] = value
+    return value
+    
+  @classmethod
+  def visit_VarDeleteNode(cls, node, context):
     if not isinstance(node.var, list):
       node.var = [node.var]
     for i in node.var:
-      res = context.symbol_table.remove(i.value)
-      if res is context.symbol_table.undefined:
-        raise errors.NameError(
-          i.pos_start, i.pos_end,
-          f"name '{i.value}' is not defined", context
-        )
+      cls.delete_name(i, i.value, context)
+  
+  @staticmethod
+  def delete_name(node, var_name, context):
+    res = context.symbol_table.remove(var_name)
+    if res is context.symbol_table.undefined:
+      raise Interpreter.name_error(node, var_name, context)
   
   @classmethod
   def visit_TupleNode(cls, node, context):
     elements = (auto(cls.visit(i, context)) for i in node.items)
-    return Tuple(elements).set_pos(node.pos_start, node.pos_end).set_context(context)
+    return Tuple(elements)
   
   @classmethod
   def visit_ListNode(cls, node, context):
     elements = (auto(cls.visit(i, context)) for i in node.items)
-    return List(elements).set_pos(node.pos_start, node.pos_end).set_context(context)
+    return List(elements)
   
   @classmethod
   def visit_DictNode(cls, node, context):
+    return cls.make_dict(node, (
+      (lambda k=k: cls.visit(k, context), lambda v=v: cls.visit(v, context))
+      for k, v in node.items.items()
+    ), context)
+  
+  @classmethod
+  def make_dict(cls, node, items, context):
+    """
+    items 为 (键, 值) 求值函数的序列, 按 键, 值, 键, 值... 的顺序求值
+    """
     elements = {}
-    for k, v in node.items.items():
-      key = auto(cls.visit(k, context))
+    for k, v in items:
+      key = auto(k())
       try:
-        elements[key] = auto(cls.visit(v, context))
+        elements[key] = auto(v())
       except TypeError:
-        raise errors.TypeError(
-          key.pos_start, key.pos_end,
-          f'unhashable type: {key.name}', context
-        )
-    return Dict(elements).set_pos(node.pos_start, node.pos_end).set_context(context)
+        cls.unhashable(node, key, context)
+    return Dict(elements)
+  
+  @staticmethod
+  def unhashable(node, key, context):
+    raise errors.TypeError(
+      node.pos_start, node.pos_end,
+      f'unhashable type: {key.name}', context
+    )
   
   @classmethod
   def visit_SliceNode(cls, node, context):
@@ -125,89 +501,198 @@ class Interpreter(object):
       stop = cls.visit(node.stop, context)
     if node.step is not None: 
       step = cls.visit(node.step, context)
-    return Slice(start, stop, step).set_pos(node.pos_start, node.pos_end).set_context(context)
+    return cls.make_slice(start, stop, step)
+  
+  @staticmethod
+  def make_slice(start, stop, step):
+    # 缺省的部分 (None) 包装为 null
+    return Slice(auto(start), auto(stop), auto(step))
   
   
   @classmethod
   def visit_GetAttrNode(cls, node, context):
-    object = cls.visit(node.object, context)
-    attr_name = node.attr_name.value
-    
-    res = cat_getattr(object, attr_name)
+    site = node.site
+    if site is None:
+      site = node.site = AttributeSite(node.attr_name.value)
+    return cls.get_attr(node, site, cls.visit(node.object, context), context)
+  
+  @staticmethod
+  def get_attr(node, site, object, context):
+    """
+    site 为这处属性访问的 AttributeSite
+    """
+    object = auto(object)
+    try:
+      res = site.get(object)
+    except errors.BaseError as e:
+      raise e.locate(node, context)
     if res is None:
       raise errors.AttributeError(
         node.pos_start, node.pos_end,
-        f"'{object.CAT__class__.CAT__name__}' object has no attribute '{attr_name}'", context
+        f"'{object.CAT__class__.CAT__name__}' object has no attribute '{site.attr}'", context
       )
-      
-    return auto(res).set_pos(node.pos_start, node.pos_end).set_context(context)
+    return unbox(res)
     
   @classmethod
   def visit_SetAttrNode(cls, node, context):
     object = cls.visit(node.object, context)
-    attr_name = node.attr_name.value
-    value = auto(cls.visit(node.value, context))
-    auto(object.CAT__setattribute__(attr_name, value))
-    return value.set_pos(node.pos_start, node.pos_end).set_context(context)
+    return cls.set_attr(node, node.attr_name.value, object, cls.visit(node.value, context), context)
+  
+  @staticmethod
+  def set_attr(node, attr_name, object, value, context):
+    value = auto(value)
+    try:
+      auto(object).CAT__setattribute__(attr_name, value)
+    except errors.BaseError as e:
+      raise e.locate(node, context)
+    return value
   
   @classmethod
   def visit_GetItemNode(cls, node, context):
     object = cls.visit(node.object, context)
+    cls.check_getitem(node, object, context)
+    return cls.get_item(node, object, cls.visit(node.key, context), context)
+  
+  @staticmethod
+  def check_getitem(node, object, context):
+    object = auto(object)
     if not hasattr(object, 'CAT__getitem__'):
       raise errors.TypeError(
         node.pos_start, node.pos_end, 
         f"'{object.CAT__class__.CAT__name__}' object is not subscriptable", context
       )
-    key = cls.visit(node.key, context)
-    res = auto(object.CAT__getitem__(key))
-    return res.set_pos(node.pos_start, node.pos_end).set_context(context)
+  
+  @staticmethod
+  def get_item(node, object, key, context):
+    try:
+      return unbox(auto(object).CAT__getitem__(auto(key)))
+    except errors.BaseError as e:
+      raise e.locate(node, context)
     
   @classmethod
   def visit_SetItemNode(cls, node, context):
     object = cls.visit(node.object, context)
+    cls.check_setitem(node, object, context)
+    key = cls.visit(node.key, context)
+    return cls.set_item(node, object, key, cls.visit(node.value, context), context)
+  
+  @staticmethod
+  def check_setitem(node, object, context):
+    object = auto(object)
     if not hasattr(object, 'CAT__setitem__'):
       raise errors.TypeError(
         node.pos_start, node.pos_end, 
         f"'{object.name}' object does not support item assignment", context
       )
-    key = cls.visit(node.key, context)
-    value = auto(cls.visit(node.value, context))
-    object.CAT__setitem__(key, value)
-    return value.set_pos(node.pos_start, node.pos_end).set_context(context)
+  
+  @staticmethod
+  def set_item(node, object, key, value, context):
+    value = auto(value)
+    try:
+      auto(object).CAT__setitem__(auto(key), value)
+    except errors.BaseError as e:
+      raise e.locate(node, context)
+    return value
   
   @classmethod
   def visit_IfNode(cls, node, context):
     oneline = node.oneline
     for condition, body in node.cases:
-      condition_value = cls.visit(condition, context)
-      if bool(condition_value):
+      if cls.truth(cls.visit(condition, context)):
         res = cls.visit(body, context)
         if oneline: 
-          return auto(res).set_pos(body.pos_start, body.pos_end).set_context(context)
+          return auto(res)
     
     if node.else_block:
       res = cls.visit(node.else_block, context)
       if oneline:
-        return auto(res).set_pos(node.else_block.pos_start, node.else_block.pos_end).set_context(context)
+        return auto(res)
+  
+  @staticmethod
+  def truth(value) -> bool:
+    """
+    条件 (if 与 ?:) 的真假: 原生值先包装, 与值一样按 bool() 判断;
+    值没有定义 Python 的 __bool__, 因此总是为真, 与 && 和 || 使用的 boolean 不同
+    """
+    return bool(auto(value))
         
   @classmethod
   def visit_CallNode(cls, node, context):
-    object = cls.visit(node.object, context)
+    callee = node.object
+    if isinstance(callee, GetAttrNode):
+      # 调用方法: 属性所属的对象只求值一次
+      site = callee.site
+      if site is None:
+        site = callee.site = AttributeSite(callee.attr_name.value)
+      receiver = auto(cls.visit(callee.object, context))
+      object, receiver = cls.load_method(callee, site, receiver, context)
+      if receiver is None:
+        cls.check_call(node, object, context)
+      args = [auto(cls.visit(i, context)) for i in node.args.items]
+      kwargs = cls.visit(node.kwargs, context) if node.kwargs.items else None
+      if receiver is not None:
+        return cls.call_method(node, object, receiver, args, kwargs, context)
+      return cls.call(node, object, args, kwargs, context)
+    object = cls.visit(callee, context)
+    cls.check_call(node, object, context)
+    args = [auto(cls.visit(i, context)) for i in node.args.items]
+    kwargs = cls.visit(node.kwargs, context) if node.kwargs.items else None
+    return cls.call(node, object, args, kwargs, context)
+  
+  @staticmethod
+  def load_method(node, site, receiver, context):
+    """
+    取 receiver (已包装为值) 的方法, 返回 (函数, receiver) 或 (属性值, None):
+    取到的是 Function 时, 调用时以 receiver 为第一个参数, 直接返回它包装的函数;
+    类中的普通函数由 site 缓存, 不需要先包装为 Function
+    """
+    func = site.method(receiver)
+    if func is not None:
+      return func, receiver
+    object = Interpreter.get_attr(node, site, receiver, context)
+    if isinstance(object, Function):
+      return object.CAT__call__, receiver
+    return object, None
+  
+  @staticmethod
+  def check_call(node, object, context):
+    object = auto(object)
     if 'CAT__call__' not in object.__dict__ and 'CAT__call__' not in object.__class__.__dict__:
       raise errors.TypeError(
         node.pos_start, node.pos_end, 
         f"'{object.CAT__class__.CAT__name__}' object is not callable", context
       )
-    args = cls.visit(node.args, context)
-    if isinstance(object, Function) and isinstance(node.object, GetAttrNode):
-      args = Tuple((cls.visit(node.object.object, context), *args))
-    kwargs = cls.visit(node.kwargs, context)
+  
+  @staticmethod
+  def call(node, object, args, kwargs, context):
+    """
+    args 为参数 (值) 的列表; kwargs 为关键字参数的 Dict, 没有关键字参数时为 None
+    """
+    return Interpreter.invoke(node, object.CAT__call__, object, args, kwargs, context)
+  
+  @staticmethod
+  def call_method(node, func, receiver, args, kwargs, context):
+    """
+    调用 load_method 取到的方法: 以 receiver 为第一个参数调用 func
+    """
+    return Interpreter.invoke(node, func, None, [receiver, *args], kwargs, context)
+  
+  @staticmethod
+  def invoke(node, func, object, args, kwargs, context):
+    """
+    调用 func, 把报错转换为 RuntimeError; object 为被调用的对象, 用于报错, 为 None 时表示 Function
+    """
     try:
-      res = object.CAT__call__(*args, **kwargs)
-    except errors.RuntimeError:
-      raise
+      if kwargs is None:
+        res = func(*args)
+      else:
+        res = func(*args, **kwargs)
+    except errors.RuntimeError as e:
+      raise e.locate(node, context)
     except TypeError as e:
-      if 'CAT__name__' in object.__dict__:
+      if object is None:
+        name = Function.CAT__class__.CAT__name__
+      elif 'CAT__name__' in object.__dict__:
         name = object.CAT__name__
       else:
         name = object.CAT__class__.CAT__name__
@@ -221,5 +706,7 @@ class Interpreter(object):
         node.pos_start, node.pos_end,
         str(e), context, e.__class__.__name__
       )
-    return auto(res).set_pos(node.pos_start, node.pos_end).set_context(context)
-  
\ No newline at end of file
+    return unbox(res)
+
+
+Interpreter.build_visitors()
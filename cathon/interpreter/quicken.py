@@ -0,0 +1,107 @@
+from .values import *
+from .interpreter import auto
+
+
+# 同一处节点连续多少次看到相同的操作数类型后特化
+WARMUP = 16
+# 预热期间操作数类型改变超过多少次后认为是多态的, 不再尝试特化
+MAX_TYPE_CHANGES = 4
+# 特化后守卫失败超过多少次后不再尝试特化
+MAX_DEOPTIMIZATIONS = 4
+
+# {事件: 次数}: 特化、守卫失败回到通用路径、放弃特化 (多态)
+quicken_stats = {'specialized': 0, 'deoptimized': 0, 'megamorphic': 0}
+
+
+class Site(object):
+  """
+  一处可以特化的节点 (BinaryOpNode/GetAttrNode/GetItemNode/CallNode) 的预热状态:
+  记录执行时操作数的类型, 连续 WARMUP 次相同时可以换成带类型守卫的特化实现,
+  守卫失败时回到通用路径重新预热; 类型总在变化的节点是多态的, 之后一直走通用路径
+  """
+  __slots__ = ('key', 'counter', 'changes', 'deoptimizations', 'active')
+
+  def __init__(self):
+    self.key = None
+    self.counter = WARMUP
+    self.changes = 0
+    self.deoptimizations = 0
+    # 为 False 时不再记录类型
+    self.active = True
+
+  def observe(self, key) -> bool:
+    """
+    记录一次执行时操作数的类型 key, 可以特化时返回 True
+    """
+    if key == self.key:
+      self.counter -= 1
+      return self.counter <= 0
+    self.key = key
+    self.counter = WARMUP
+    self.changes += 1
+    if self.changes > MAX_TYPE_CHANGES:
+      self.megamorphic()
+    return False
+
+  def specialized(self):
+    self.active = False
+    quicken_stats['specialized'] += 1
+
+  def unspecializable(self):
+    """
+    操作数类型稳定, 但没有对应的特化实现
+    """
+    self.active = False
+
+  def deoptimize(self):
+    quicken_stats['deoptimized'] += 1
+    self.deoptimizations += 1
+    self.key = None
+    self.changes = 0
+    if self.deoptimizations > MAX_DEOPTIMIZATIONS:
+      self.megamorphic()
+    else:
+      self.active = True
+
+  def megamorphic(self):
+    self.active = False
+    quicken_stats['megamorphic'] += 1
+
+
+def _list_item(object, key):
+  return object.value[key]
+
+
+def _dict_item(object, key):
+  return object.value[auto(key)]
+
+
+# {(对象类型, 下标类型): 实现}; 实现出错 (IndexError 等) 时由通用路径重新执行并报错
+item_handlers = {
+  (List, int): _list_item,
+  (Dict, int): _dict_item,
+  (Dict, str): _dict_item,
+}
+
+
+def subscriptable(cls) -> bool:
+  """
+  cls 的值是否都可以取下标, 即 check_getitem 对其总是通过
+  """
+  return hasattr(cls, 'CAT__getitem__')
+
+
+def callable_type(cls) -> bool:
+  """
+  cls 的值是否都可以调用, 即 check_call 对其总是通过
+  """
+  return 'CAT__call__' in cls.__dict__
+
+
+def quicken_info() -> dict:
+  return dict(quicken_stats)
+
+
+def clear_quicken_stats():
+  for name in quicken_stats:
+    quicken_stats[name] = 0
@@ -1,29 +1,91 @@
 class SymbolTable(object):
+  """
+  变量表: 变量的值按槽位保存在列表 slots 中, 每个表有自己的 {变量名: 槽位};
+  在执行前由 Resolver 把变量名解析为 (层数, 槽位), 层数为从当前表向上经过的上级表数,
+  执行时只需一次列表索引; 本表中的变量未定义时按变量名到上级表 (如内置变量表) 中查找
+  """
   class Undefined(object):
     def __repr__(self):
       return 'undefined'
-      
+
     def get(self):
       return self
-      
+
   undefined = Undefined()
+
   def __init__(self, parent=None):
-    self.symbols = {}
+    # {变量名: 槽位} 与 [槽位对应的变量名], 只属于本表
+    self.names: dict[str, int] = {}
+    self.keys: list[str] = []
+    self.slots = []
     self.parent = parent
-  
+
+  def slot(self, name: str) -> int:
+    """
+    变量名在本表中的槽位, 第一次出现的变量名分配一个新的槽位
+    """
+    index = self.names.get(name)
+    if index is None:
+      index = self.names[name] = len(self.keys)
+      self.keys.append(name)
+      self.slots.append(self.undefined)
+    return index
+
+  def resolve(self, name: str, assigned: bool) -> tuple[int, int]:
+    """
+    变量名的 (层数, 槽位): 在本表中赋值过或出现过的变量在本表中,
+    否则为上级表中已定义的变量 (如没有被遮盖的内置变量), 都没有时在本表中分配槽位
+    """
+    if not assigned and name not in self.names:
+      depth = 1
+      table = self.parent
+      while table is not None:
+        if table.exist(name):
+          return depth, table.names[name]
+        depth += 1
+        table = table.parent
+    return 0, self.slot(name)
+
+  def scope(self, depth: int):
+    """
+    向上 depth 层的表
+    """
+    table = self
+    for _ in range(depth):
+      table = table.parent
+    return table
+
+  def load(self, slot: int):
+    value = self.slots[slot]
+    if value is self.undefined and self.parent is not None:
+      return self.parent.get(self.keys[slot])
+    return value
+
+  def store(self, slot: int, value):
+    self.slots[slot] = value
+
+  def delete(self, slot: int):
+    value = self.slots[slot]
+    self.slots[slot] = self.undefined
+    return value
+
   def get(self, name):
-    value = self.symbols.get(name, self.undefined)
-    if value is self.undefined and self.parent:
+    slot = self.names.get(name)
+    if slot is not None:
+      return self.load(slot)
+    if self.parent is not None:
       return self.parent.get(name)
-    return value
-  
+    return self.undefined
+
   def set(self, name, value):
-    self.symbols[name] = value
-    
+    self.store(self.slot(name), value)
+
   def remove(self, name):
-    if name not in self.symbols:
+    slot = self.names.get(name)
+    if slot is None:
       return self.undefined
-    return self.symbols.pop(name)
-    
+    return self.delete(slot)
+
   def exist(self, name):
-    return name in self.symbols
+    slot = self.names.get(name)
+    return slot is not None and self.slots[slot] is not self.undefined
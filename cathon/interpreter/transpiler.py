@@ -0,0 +1,565 @@
+import ast
+import hashlib
+import operator
+from collections import OrderedDict
+from collections.abc import Callable
+from ..parser.nodes import *
+from ..vm.code import Span
+from .interpreter import (
+  Interpreter, auto, unbox, constant, constant_key, undefined,
+  NATIVE_UNARY_OPS, NATIVE_BINARY_OPS, unary_dispatch, binary_dispatch,
+)
+from ..typechecker import result_types, UNKNOWN
+from .context import Context
+from .values import *
+
+
+# 最多缓存的 Python 代码对象个数
+CACHE_SIZE = 64
+
+# 原生类型的运算对应的 Python 运算符, 没有对应运算符的通过 _native_binary 调用
+UNARY_OPERATORS = {
+  operator.pos: ast.UAdd,
+  operator.neg: ast.USub,
+  operator.invert: ast.Invert,
+  operator.not_: ast.Not,
+}
+BINARY_OPERATORS = {
+  operator.pow: ast.Pow,
+  operator.mul: ast.Mult,
+  operator.truediv: ast.Div,
+  operator.floordiv: ast.FloorDiv,
+  operator.mod: ast.Mod,
+  operator.add: ast.Add,
+  operator.sub: ast.Sub,
+  operator.and_: ast.BitAnd,
+  operator.or_: ast.BitOr,
+  operator.xor: ast.BitXor,
+  operator.lshift: ast.LShift,
+  operator.rshift: ast.RShift,
+}
+COMPARE_OPERATORS = {
+  operator.eq: ast.Eq,
+  operator.lt: ast.Lt,
+}
+
+
+def _name(id: str) -> ast.Name:
+  return ast.Name(id, ast.Load())
+
+
+def _call(func: str, *args) -> ast.Call:
+  return ast.Call(_name(func), [
+    i if isinstance(i, ast.AST) else ast.Constant(i)
+    for i in args
+  ], [])
+
+
+def _lambda(body: ast.expr) -> ast.Lambda:
+  return ast.Lambda(
+    ast.arguments(posonlyargs=[], args=[], kwonlyargs=[], kw_defaults=[], defaults=[]),
+    body,
+  )
+
+
+class Transpiler(object):
+  """
+  把语法树转换为 Python 的 ast 模块, 由 CPython 的 compile/exec 执行;
+  类型确定的运算 (字面量与类型检查特化的运算) 转换为 Python 的运算符, 已解析的变量转换为 Python 的局部变量,
+  其余节点转换为对 Interpreter 辅助方法的调用, 语义 (包括报错) 与 Interpreter 一致;
+  生成的代码对象按源代码的哈希缓存
+  """
+  # {节点类型: transpile_* 方法}, 与 Interpreter.visitors 相同
+  transpilers: dict[type, Callable] = {}
+  interpreter = Interpreter
+  # {(文件名, 源代码哈希, 语法树结构哈希): (代码对象, [Span...], [AttributeSite...], [常量...])}
+  cache: OrderedDict = OrderedDict()
+  cache_size = CACHE_SIZE
+  # (语法树, 缓存的键): 反复执行同一棵语法树时不必每次遍历整棵树计算键;
+  # 优化与类型检查都在执行前进行, 执行过的语法树不会再被修改
+  last_key: tuple = (None, None)
+
+  def __init__(self):
+    self.positions = []
+    self.attrs = []
+    self.constants = []
+    self.constant_index = {}
+    # {(层数, 槽位): Python 局部变量名}, 以及第 0 层的 {变量名: (层数, 槽位)}
+    self.locals = {}
+    self.local_names = {}
+    # {运算节点: 原生类型或 None}
+    self.types = {}
+    self.stmts = []
+    self.depth = 0
+
+  def __init_subclass__(cls, **kwargs):
+    super().__init_subclass__(**kwargs)
+    cls.cache = OrderedDict()
+    cls.last_key = (None, None)
+    cls.build_transpilers()
+
+  @classmethod
+  def build_transpilers(cls):
+    cls.transpilers = {}
+    todo = [ASTNode]
+    while todo:
+      node_class = todo.pop()
+      todo.extend(node_class.__subclasses__())
+      method = getattr(cls, f'transpile_{node_class.__name__}', None)
+      if method is not None:
+        cls.transpilers[node_class] = method
+
+  @classmethod
+  def compile(cls, node: ASTNode):
+    """
+    返回 (Python 代码对象, 代码中 _spans 的值, 代码中 _sites 的值, 代码中 _consts 的值);
+    文件名与源代码相同时, 语法树与各节点的位置也相同, 可以直接复用;
+    优化或类型检查会改变语法树, 因此各节点的类型也是缓存的键的一部分
+    """
+    last, key = cls.last_key
+    if last is not node:
+      source = node.source
+      # 变量的 (层数, 槽位) 作为常量写在代码中, 也是结构的一部分
+      shape = ' '.join(
+        f"{type(i).__name__}{getattr(i, 'depth', '')}:{getattr(i, 'slot', '')}"
+        for i in node.walk()
+      )
+      key = source.file, hashlib.sha256(source.code.encode()).digest(), hashlib.sha256(shape.encode()).digest()
+      cls.last_key = node, key
+    res = cls.cache.get(key)
+    if res is not None:
+      cls.cache.move_to_end(key)
+      return res
+
+    self = cls()
+    self.find_locals(node)
+    value = self.visit(node)
+    self.stmts.append(ast.Return(value))
+    module = ast.fix_missing_locations(self.module())
+    positions = self.positions
+    spans = [
+      Span(source, positions[i], positions[i + 1])
+      for i in range(0, len(positions), 2)
+    ]
+    sites = [AttributeSite(i) for i in self.attrs]
+    res = compile(module, source.file, 'exec'), spans, sites, self.constants
+    cls.cache[key] = res
+    if len(cls.cache) > cls.cache_size:
+      cls.cache.popitem(last=False)
+    return res
+
+  @classmethod
+  def run(cls, node: ASTNode, context: Context):
+    code, spans, sites, consts = cls.compile(node)
+    interpreter = cls.interpreter
+    namespace = {
+      '__builtins__': {},
+      '_spans': spans,
+      '_sites': sites,
+      '_consts': consts,
+      '_context': context,
+      '_undefined': undefined,
+      '_value': auto,
+      '_unbox': unbox,
+      '_tuple': cls.make_tuple,
+      '_list': cls.make_list,
+      '_slice': interpreter.make_slice,
+      '_truth': interpreter.truth,
+      '_boolean': interpreter.boolean,
+      '_call': cls.call,
+      '_load_method': cls.load_method,
+      '_unary_op': interpreter.unary_op,
+      '_binary_op': interpreter.binary_op,
+      '_native_binary': NATIVE_BINARY_OPS,
+      '_load_name': interpreter.load_name,
+      '_load_parent': cls.load_parent,
+      '_assign': interpreter.assign,
+      '_store_name': cls.store_name,
+      '_delete_name': interpreter.delete_name,
+      '_delete_local': cls.delete_local,
+      '_make_dict': interpreter.make_dict,
+      '_get_attr': interpreter.get_attr,
+      '_set_attr': interpreter.set_attr,
+      '_check_getitem': cls.check(interpreter.check_getitem),
+      '_get_item': interpreter.get_item,
+      '_check_setitem': cls.check(interpreter.check_setitem),
+      '_set_item': interpreter.set_item,
+      '_check_call': cls.check(interpreter.check_call),
+    }
+    exec(code, namespace)
+    return namespace['_result']
+
+  @classmethod
+  def load_parent(cls, node, var_name, depth, context):
+    """
+    局部变量中的值未定义时 (还没有赋值或已被删除), 与 Interpreter.load_name 一样到上级表中按变量名查找
+    """
+    table = context.symbol_table.scope(depth).parent
+    value = undefined if table is None else table.get(var_name)
+    if value is undefined:
+      raise cls.interpreter.name_error(node, var_name, context)
+    return value
+
+  @staticmethod
+  def store_name(var_name, value, context):
+    """
+    没有经过 Resolver 的变量按变量名赋值
+    """
+    value = unbox(value)
+    context.symbol_table.set(var_name, value)
+    return value
+
+  @classmethod
+  def delete_local(cls, node, var_name, value, context):
+    """
+    删除局部变量: 返回局部变量的新值 (未定义)
+    """
+    if value is undefined:
+      raise cls.interpreter.name_error(node, var_name, context)
+    return undefined
+
+  @staticmethod
+  def make_tuple(items):
+    return Tuple(auto(i) for i in items)
+
+  @staticmethod
+  def make_list(items):
+    return List(auto(i) for i in items)
+
+  @staticmethod
+  def check(checker):
+    """
+    检查通过后返回被检查的对象, 使检查可以嵌在表达式中
+    """
+    def check(node, object, context):
+      checker(node, object, context)
+      return object
+    return check
+
+  @classmethod
+  def load_method(cls, node, call_node, site, receiver, context):
+    """
+    返回 (被调用对象, 对象或 None), 与 Interpreter.visit_CallNode 一样在求值参数前检查是否可以调用
+    """
+    object, receiver = cls.interpreter.load_method(node, site, auto(receiver), context)
+    if receiver is None:
+      cls.interpreter.check_call(call_node, object, context)
+    return object, receiver
+
+  @classmethod
+  def call(cls, node, method, args, kwargs, context):
+    object, receiver = method
+    if receiver is None:
+      return cls.interpreter.call(node, object, args, kwargs, context)
+    return cls.interpreter.call_method(node, object, receiver, args, kwargs, context)
+
+  def visit(self, node) -> ast.expr:
+    try:
+      transpiler = self.transpilers[type(node)]
+    except KeyError:
+      method_name = f'transpile_{type(node).__name__}'
+      if not hasattr(self, method_name):
+        raise AttributeError(f'No transpile method "{method_name}"')
+      transpiler = self.transpilers[type(node)] = getattr(type(self), method_name)
+    return transpiler(self, node)
+
+  def find_locals(self, node):
+    """
+    已解析的变量使用 Python 的局部变量 _v{层数}_{槽位}: 执行开始时从变量表中读入, 结束时写回第 0 层的表;
+    字典的键与值在 lambda 中求值, 其中赋值或删除的变量仍直接读写变量表
+    """
+    excluded = set()
+    for i in node.walk():
+      if isinstance(i, DictNode):
+        for j in i.walk():
+          if isinstance(j, VarAssignNode):
+            excluded.add(j.var.value)
+          elif isinstance(j, VarDeleteNode):
+            excluded.update(var.value for var in (j.var if isinstance(j.var, list) else [j.var]))
+    for i in node.walk():
+      if isinstance(i, (VarAccessNode, VarAssignNode)) and i.slot is not None and i.var.value not in excluded:
+        key = (i.depth if isinstance(i, VarAccessNode) else 0), i.slot
+        self.locals.setdefault(key, f'_v{key[0]}_{key[1]}')
+        if key[0] == 0:
+          self.local_names[i.var.value] = key
+
+  def module(self) -> ast.Module:
+    """
+    def _main():
+      _u = _undefined
+      _slots0 = _context.symbol_table.scope(0).slots
+      _v0_3 = _slots0[3]
+      try:
+        ...
+      finally:
+        _slots0[3] = _v0_3
+    _result = _main()
+    """
+    depths = sorted({depth for depth, _ in self.locals})
+    prologue = ['_u = _undefined']
+    prologue += [f'_slots{i} = _context.symbol_table.scope({i}).slots' for i in depths]
+    prologue += [f'{name} = _slots{depth}[{slot}]' for (depth, slot), name in self.locals.items()]
+    epilogue = [f'_slots0[{slot}] = {name}' for (depth, slot), name in self.locals.items() if depth == 0]
+    module = ast.parse('def _main():\n  pass\n_result = _main()\n')
+    body = self.stmts
+    if epilogue:
+      body = [ast.Try(body, [], [], ast.parse('\n'.join(epilogue)).body)]
+    module.body[0].body = ast.parse('\n'.join(prologue)).body + body
+    return module
+
+  def span(self, node) -> ast.expr:
+    """
+    node (节点或 Token) 的位置, 运行时为 _spans 中的一个 Span
+    """
+    index = len(self.positions) // 2
+    self.positions += (node.index_start, node.index_end)
+    return ast.Subscript(_name('_spans'), ast.Constant(index), ast.Load())
+
+  def site(self, node) -> ast.expr:
+    """
+    属性访问节点 node 的内联缓存, 运行时为 _sites 中的一个 AttributeSite
+    """
+    index = len(self.attrs)
+    self.attrs.append(node.attr_name.value)
+    return ast.Subscript(_name('_sites'), ast.Constant(index), ast.Load())
+
+  def constant(self, node) -> int:
+    """
+    字面量在 _consts 中的序号, 相同的字面量共用常量池中的同一项
+    """
+    value = node.value.value
+    key = constant_key(value)
+    index = self.constant_index.get(key)
+    if index is None:
+      index = self.constant_index[key] = len(self.constants)
+      self.constants.append(constant(value))
+    node.constant = self.constants[index]
+    return index
+
+  def boxed(self, node) -> ast.expr:
+    """
+    需要值 (Object) 的位置: 字面量直接取常量池中的值 _consts[i], 其余结果由 _value 包装
+    """
+    if isinstance(node, SingleNode):
+      return ast.Subscript(_name('_consts'), ast.Constant(self.constant(node)), ast.Load())
+    return _call('_value', self.visit(node))
+
+  def transpile_NumberNode(self, node):
+    self.constant(node)
+    return ast.Constant(node.value.value)
+
+  transpile_StringNode = transpile_NumberNode
+
+  def native_type(self, node):
+    """
+    转换时就能确定的原生类型, 不确定时为 None: 字面量、类型检查特化的运算,
+    以及操作数类型都确定、结果类型只由操作数类型决定的运算 (与 TypeChecker 的规则相同)
+    """
+    if isinstance(node, SingleNode):
+      return type(node.value.value)
+    if isinstance(node, (TypedUnaryOpNode, TypedBinaryOpNode)):
+      return node.result_type
+    if not isinstance(node, (UnaryOpNode, BinaryOpNode)):
+      return None
+    if node in self.types:
+      return self.types[node]
+    operands = (node.right,) if isinstance(node, UnaryOpNode) else (node.left, node.right)
+    types = tuple(self.native_type(i) for i in operands)
+    res = None
+    if None not in types:
+      res = result_types.get((node.op.type, *types))
+      if res is UNKNOWN:
+        res = None
+    self.types[node] = res
+    return res
+
+  def transpile_UnaryOpNode(self, node):
+    right = self.visit(node.right)
+    op = node.op.type
+    func = unary_dispatch.get((op, self.native_type(node.right)))
+    if func is not None and func is NATIVE_UNARY_OPS[op]:
+      return ast.UnaryOp(UNARY_OPERATORS[func](), right)
+    return _call('_unary_op', self.span(node), op, right, _name('_context'))
+
+  def transpile_BinaryOpNode(self, node):
+    left = self.visit(node.left)
+    right = self.visit(node.right)
+    op = node.op.type
+    func = binary_dispatch.get((op, self.native_type(node.left), self.native_type(node.right)))
+    if func is not None and func is NATIVE_BINARY_OPS.get(op):
+      return self.native_binary(func, op, left, right)
+    return _call('_binary_op', self.span(node), op, left, right, _name('_context'))
+
+  def transpile_BoolOpNode(self, node):
+    # a || b: (_left if _boolean(_left := a) else b); 读取 _left 紧跟在赋值之后, 嵌套时也不会被覆盖
+    test = _call('_boolean', ast.NamedExpr(ast.Name('_left', ast.Store()), self.visit(node.left)))
+    right = self.visit(node.right)
+    if node.op.type == DOUBLEVBAR:
+      return ast.IfExp(test, _name('_left'), right)
+    return ast.IfExp(test, right, _name('_left'))
+
+  def transpile_TypedUnaryOpNode(self, node):
+    right = self.visit(node.right)
+    return ast.UnaryOp(UNARY_OPERATORS[node.func](), right)
+
+  def transpile_TypedBinaryOpNode(self, node):
+    left = self.visit(node.left)
+    right = self.visit(node.right)
+    return self.native_binary(node.func, node.op.type, left, right)
+
+  @staticmethod
+  def native_binary(func, op, left, right) -> ast.expr:
+    if func in BINARY_OPERATORS:
+      return ast.BinOp(left, BINARY_OPERATORS[func](), right)
+    if func in COMPARE_OPERATORS:
+      return ast.Compare(left, [COMPARE_OPERATORS[func]()], [right])
+    func = ast.Subscript(_name('_native_binary'), ast.Constant(op), ast.Load())
+    return ast.Call(func, [left, right], [])
+
+  def transpile_VarAccessNode(self, node):
+    name = self.locals.get((node.depth, node.slot))
+    if node.slot is None or name is None:
+      return _call('_load_name', self.span(node), node.var.value, node.depth, node.slot, _name('_context'))
+    # (_v0_3 if _v0_3 is not _u else _load_parent(...))
+    return ast.IfExp(
+      ast.Compare(_name(name), [ast.IsNot()], [_name('_u')]),
+      _name(name),
+      _call('_load_parent', self.span(node), node.var.value, node.depth, _name('_context')),
+    )
+
+  def transpile_VarAssignNode(self, node):
+    value = self.visit(node.value)
+    if node.slot is None:
+      return _call('_store_name', node.var.value, value, _name('_context'))
+    name = self.locals.get((0, node.slot))
+    if name is None:
+      return _call('_assign', self.span(node), node.slot, value, _name('_context'))
+    if self.native_type(node.value) is None:
+      value = _call('_unbox', value)
+    return ast.NamedExpr(ast.Name(name, ast.Store()), value)
+
+  def transpile_VarDeleteNode(self, node):
+    vars = node.var if isinstance(node.var, list) else [node.var]
+    deletes = []
+    for i in vars:
+      key = self.local_names.get(i.value)
+      if key is None:
+        deletes.append(_call('_delete_name', self.span(i), i.value, _name('_context')))
+      else:
+        name = self.locals[key]
+        deletes.append(ast.NamedExpr(
+          ast.Name(name, ast.Store()),
+          _call('_delete_local', self.span(i), i.value, _name(name), _name('_context')),
+        ))
+    # (del_1, del_2, ..., None)[-1]
+    return ast.Subscript(ast.Tuple([*deletes, ast.Constant(None)], ast.Load()), ast.Constant(-1), ast.Load())
+
+  def transpile_TupleNode(self, node):
+    return self.items('_tuple', node)
+
+  def transpile_ListNode(self, node):
+    return self.items('_list', node)
+
+  def items(self, func, node) -> ast.expr:
+    if not any(isinstance(i, IfNode) and not i.oneline for i in node.items):
+      items = ast.List([self.visit(i) for i in node.items], ast.Load())
+      return _call(func, items)
+
+    # 含有 if 语句的语句块: 逐条语句执行, 结果依次追加到 _block{depth} 中
+    block = f'_block{self.depth}'
+    self.depth += 1
+    self.stmts.append(ast.Assign([ast.Name(block, ast.Store())], ast.List([], ast.Load())))
+    for i in node.items:
+      if isinstance(i, IfNode) and not i.oneline:
+        self.if_stmt(i)
+        value = ast.Constant(None)
+      else:
+        value = self.visit(i)
+      self.stmts.append(ast.Expr(ast.Call(
+        ast.Attribute(_name(block), 'append', ast.Load()), [value], [],
+      )))
+    self.depth -= 1
+    return _call(func, _name(block))
+
+  def body(self, node) -> list[ast.stmt]:
+    """
+    把 node 转换为一组语句, 结果丢弃
+    """
+    stmts, self.stmts = self.stmts, []
+    value = self.visit(node)
+    self.stmts.append(ast.Expr(value))
+    res, self.stmts = self.stmts, stmts
+    return res
+
+  def if_stmt(self, node):
+    # 与 Interpreter.visit_IfNode 一致: 依次检查每个条件, 最后总是执行 else 块
+    for condition, body in node.cases:
+      test = _call('_truth', self.visit(condition))
+      self.stmts.append(ast.If(test, self.body(body), []))
+    if node.else_block:
+      self.stmts.extend(self.body(node.else_block))
+
+  def transpile_IfNode(self, node):
+    if not node.oneline:
+      raise AttributeError('if statement must be transpiled by its block')
+    res = ast.Constant(None)
+    if node.else_block:
+      res = self.boxed(node.else_block)
+    for condition, body in reversed(node.cases):
+      test = _call('_truth', self.visit(condition))
+      body = self.boxed(body)
+      res = ast.IfExp(test, body, res)
+    return res
+
+  def transpile_DictNode(self, node):
+    items = ast.List([
+      ast.Tuple([_lambda(self.visit(k)), _lambda(self.visit(v))], ast.Load())
+      for k, v in node.items.items()
+    ], ast.Load())
+    return _call('_make_dict', self.span(node), items, _name('_context'))
+
+  def transpile_SliceNode(self, node):
+    start, stop, step = (
+      ast.Constant(None) if i is None else self.visit(i)
+      for i in (node.start, node.stop, node.step)
+    )
+    return _call('_slice', start, stop, step)
+
+  def transpile_GetAttrNode(self, node):
+    object = self.visit(node.object)
+    return _call('_get_attr', self.span(node), self.site(node), object, _name('_context'))
+
+  def transpile_SetAttrNode(self, node):
+    object = self.visit(node.object)
+    value = self.visit(node.value)
+    return _call('_set_attr', self.span(node), node.attr_name.value, object, value, _name('_context'))
+
+  def transpile_GetItemNode(self, node):
+    span = self.span(node)
+    object = _call('_check_getitem', span, self.visit(node.object), _name('_context'))
+    key = self.visit(node.key)
+    return _call('_get_item', span, object, key, _name('_context'))
+
+  def transpile_SetItemNode(self, node):
+    span = self.span(node)
+    object = _call('_check_setitem', span, self.visit(node.object), _name('_context'))
+    key = self.visit(node.key)
+    value = self.visit(node.value)
+    return _call('_set_item', span, object, key, value, _name('_context'))
+
+  def transpile_CallNode(self, node):
+    span = self.span(node)
+    callee = node.object
+    if isinstance(callee, GetAttrNode):
+      # 调用方法: 属性所属的对象只求值一次
+      receiver = self.visit(callee.object)
+      method = _call('_load_method', self.span(callee), span, self.site(callee), receiver, _name('_context'))
+    else:
+      object = _call('_check_call', span, self.visit(callee), _name('_context'))
+      method = ast.Tuple([object, ast.Constant(None)], ast.Load())
+    args = ast.List([self.boxed(i) for i in node.args.items], ast.Load())
+    kwargs = self.visit(node.kwargs) if node.kwargs.items else ast.Constant(None)
+    return _call('_call', span, method, args, kwargs, _name('_context'))
+
+
+Transpiler.build_transpilers()
@@ -1,9 +1,66 @@
 from abc import abstractmethod
-import math, inspect, sys
+import math, sys, itertools, types
 
 from ..constants import *
 from .. import errors
-from .context import Context
+from .clinic import builtin
+
+
+# 类中没有某个属性时 lookup 的结果
+MISSING = object()
+# 类的版本号, 每次修改类都分配一个新的
+_versions = itertools.count()
+# {(类, 属性名): (类的版本号, 'CAT' + 属性名, 类中的值或 MISSING)}
+_attribute_cache = {}
+
+
+class ObjectMeta(type):
+  """
+  值的类的元类: 每个类在自己的 __dict__ 中记录版本号 _cat_version,
+  类 (或其父类) 的属性被修改时版本号改变, 按版本号缓存的属性查找随之失效
+  """
+  def __init__(cls, *args, **kwargs):
+    super().__init__(*args, **kwargs)
+    type.__setattr__(cls, '_cat_version', next(_versions))
+
+  def __setattr__(cls, name, value):
+    super().__setattr__(name, value)
+    cls.modified(name)
+
+  def __delattr__(cls, name):
+    super().__delattr__(name)
+    cls.modified(name)
+
+  def modified(cls, name):
+    # 类中的值是否为描述器取决于值的类, 修改 __get__ 时所有类都需要重新查找
+    todo = [Object, Object._CAT__class__] if name in ('CAT__get__', 'CAT__set__') else [cls]
+    while todo:
+      i = todo.pop()
+      type.__setattr__(i, '_cat_version', next(_versions))
+      todo.extend(i.__subclasses__())
+
+
+def lookup(cls, attr):
+  """
+  在类 cls 自身的 __dict__ 中查找属性 attr, 返回 (版本号, 'CAT' + attr, 值或 MISSING);
+  结果按 (类, 属性名) 缓存, 类的版本号改变后重新查找
+  """
+  key = cls, attr
+  entry = _attribute_cache.get(key)
+  if entry is None or entry[0] != cls._cat_version:
+    name = 'CAT' + attr
+    entry = _attribute_cache[key] = cls._cat_version, name, cls.__dict__.get(name, MISSING)
+  return entry
+
+
+def is_descriptor(value) -> bool:
+  """
+  value 的类中定义了 __get__; 与 Python 相同, 只在类中查找, 不看实例自身的属性
+  """
+  return (
+    isinstance(value, (Object, Object._CAT__class__))
+    and lookup(value.__class__, '__get__')[2] is not MISSING
+  )
 
 
 def cat_getattr(object, attr, default=None):
@@ -11,24 +68,87 @@ def cat_getattr(object, attr, default=None):
     Object, Object._CAT__class__
   )):
     return default
-  if 'CAT__getattribute__' in object.__class__.__dict__:
-    res = object.CAT__getattribute__(attr_name)
-  attr = 'CAT' + attr
+  cls = object.__class__
+  # 类定义了 __getattribute__ 时, 所有属性都由它取得
+  if lookup(cls, '__getattribute__')[2] is not MISSING:
+    return object.CAT__getattribute__(attr)
+  _, attr, res = lookup(cls, attr)
   if attr in object.__dict__:
     res = object.__dict__[attr]
-  elif attr in object.__class__.__dict__:
-    res = object.__class__.__dict__[attr]
-  else:
-    if 'CAT__getattr__' in object.__class__.__dict__:
+  elif res is MISSING:
+    if 'CAT__getattr__' in cls.__dict__:
       res = object.CAT__getattr__(attr)
     else:
       res = default
   
-  if res is not None and cat_getattr(res, '__get__'):
-    return res.CAT__get__(object, object.__class__)
+  if is_descriptor(res):
+    return res.CAT__get__(object, cls)
   return res 
 
 
+class AttributeSite(object):
+  """
+  一处属性访问 (GetAttrNode 或 LOAD_ATTR/LOAD_METHOD 指令) 的内联缓存:
+  记住上次访问的值的类、类的版本号与在类中找到的属性,
+  下次访问同一个类 (且类未被修改、实例中没有同名属性) 的值时跳过 cat_getattr 中的查找;
+  类定义了 __getattribute__ 时不缓存, 每次都经过 cat_getattr
+  """
+  __slots__ = ('attr', 'name', 'cls', 'version', 'res', 'descriptor', 'function')
+
+  def __init__(self, attr: str):
+    self.attr = attr
+    self.name = 'CAT' + attr
+    self.cls = None
+    self.version = None
+    self.res = None
+    self.descriptor = False
+    # 类中的属性为普通函数时即 res, 否则为 None
+    self.function = None
+
+  def hit(self, object) -> bool:
+    cls = object.__class__
+    return cls is self.cls and cls._cat_version == self.version and self.name not in object.__dict__
+
+  def get(self, object, default=None):
+    if self.hit(object):
+      if self.descriptor:
+        return self.res.CAT__get__(object, object.__class__)
+      return self.res
+    res = cat_getattr(object, self.attr, default)
+    self.fill(object)
+    return res
+
+  def method(self, object):
+    """
+    object 的类中作为方法的普通函数: 取属性得到的是包装它的 Function,
+    调用时以 object 为第一个参数, 因此可以直接调用该函数; 不是时返回 None
+    """
+    if not self.hit(object):
+      self.fill(object)
+      if not self.hit(object):
+        return None
+    return self.function
+
+  def fill(self, object):
+    cls = object.__class__
+    if (
+      isinstance(object, Object)
+      and self.name not in object.__dict__
+      and lookup(cls, '__getattribute__')[2] is MISSING
+    ):
+      version, _, value = lookup(cls, self.attr)
+      if value is not MISSING:
+        self.cls = cls
+        self.version = version
+        self.res = value
+        self.descriptor = is_descriptor(value)
+        self.function = value if isinstance(value, types.FunctionType) else None
+
+
+@builtin('getattr')
+def builtin_getattr(object, name: 'String', default=None, /):
+  return cat_getattr(object, name.value, default)
+
 def cat_abs(obj):
   return cat_getattr(obj, '__abs__')
 
@@ -36,12 +156,76 @@ def cat_len(obj):
   return cat_getattr(obj, '__abs__')
 
 
-class Object:
-  def __init__(self):
-    self.set_pos()
-    self.set_context()
-  
-  class _CAT__class__:
+# Object.binary_op 不支持某个运算时的返回值
+UNSUPPORTED = object()
+
+
+def _less(a, b):
+  try:
+    return a.CAT__lt__(b)
+  except AttributeError:
+    return not a.CAT__ge__(b)
+
+
+def _greater(a, b):
+  try:
+    return not a.CAT__le__(b)
+  except AttributeError:
+    return a.CAT__gt__(b)
+
+
+def _less_equal(a, b):
+  try:
+    return a.CAT__le__(b)
+  except AttributeError:
+    return not a.CAT__gt__(b)
+
+
+def _greater_equal(a, b):
+  try:
+    return not a.CAT__lt__(b)
+  except AttributeError:
+    return a.CAT__ge__(b)
+
+
+# {运算符: 实现}, 值没有对应的 CAT 方法时抛出 AttributeError
+UNARY_OPS = {
+  PLUS: lambda a: a.CAT__pos__(),
+  MINUS: lambda a: a.CAT__neg__(),
+  TILDE: lambda a: a.CAT__invert__(),
+  EXCLAMATION: lambda a: not a.CAT__bool__(),
+}
+BINARY_OPS = {
+  DOUBLESTAR: lambda a, b: a.CAT__pow__(b),
+  STAR: lambda a, b: a.CAT__mul__(b),
+  SLASH: lambda a, b: a.CAT__truediv__(b),
+  DOUBLESLASH: lambda a, b: a.CAT__floordiv__(b),
+  PERCENT: lambda a, b: a.CAT__mod__(b),
+  PLUS: lambda a, b: a.CAT__add__(b),
+  MINUS: lambda a, b: a.CAT__sub__(b),
+  DOUBLEAMPER: lambda a, b: a.CAT__and__(b),
+  DOUBLEVBAR: lambda a, b: a or b,
+  AMPER: lambda a, b: a and b,
+  VBAR: lambda a, b: a.CAT__or__(b),
+  CIRCUMFLEX: lambda a, b: a.CAT__xor__(b),
+  LEFTSHIFT: lambda a, b: a.CAT__lshift__(b),
+  RIGHTSHIFT: lambda a, b: a.CAT__rshift__(b),
+  EQEQUAL: lambda a, b: a.CAT__eq__(b),
+  NOTEQUAL: lambda a, b: not a.CAT__eq__(b),
+  AT: lambda a, b: a.CAT__AT__(b),
+  LESS: _less,
+  GREATER: _greater,
+  LESSEQUAL: _less_equal,
+  GREATEREQUAL: _greater_equal,
+}
+
+
+class Object(metaclass=ObjectMeta):
+  """
+  值不记录产生它的位置与上下文, 可以被共享;
+  值的方法中产生的错误不带位置, 由 Interpreter 按正在执行的节点补上
+  """
+  class _CAT__class__(metaclass=ObjectMeta):
     CAT__name__ = '<anonymous>'
     def CAT__get__(self, instance, type=None):
       return cat_object
@@ -54,106 +238,46 @@ class Object:
   def get_pyobject(self):
     return self.get_object()
     
-  def set_pos(self, pos_start=None, pos_end=None):
-    self.pos_start = pos_start
-    self.pos_end = pos_end
-    return self
-    
-  def set_context(self, context: Context = None):
-    self.context = context
-    return self
-    
   def invalid(self, op, other=None, details=None):
     if details is None:
       details = f"invalid {'unary' if other is None else 'binary'} operation: {OP_REDICT[op]}"
     raise errors.OpertionError(
-      self.pos_start, self.pos_end,
-      details, self.context, 
+      None, None,
+      details, None,
     )
     
   def unary_op(self, op):
+    func = UNARY_OPS.get(op)
+    if func is None:
+      return self.invalid(op)
     try:
-      if op == PLUS:
-        return self.CAT__pos__()
-      if op == MINUS:
-        return self.CAT__neg__()
-      if op == TILDE:
-        return self.CAT__invert__()
-      if op == EXCLAMATION:
-        return not self.CAT__bool__()
+      return func(self)
     except AttributeError:
       raise errors.TypeError(
-        self.pos_start, self.pos_end,
+        None, None,
         f"bad operand type for unary {OP_REDICT[op]}: '{self.CAT__name__}' ",
-        context
+        None
       )
-    return self.invalid(op)
   
   def binary_op(self, op, other):
+    """
+    不支持该运算时返回 UNSUPPORTED 而不报错, 由调用方交换操作数重试, 都不支持时再调用 unsupported 报错
+    """
     assert isinstance(other, Object), "binary_op"
-    
+    func = BINARY_OPS.get(op)
+    if func is None:
+      return self.invalid(op, other)
     try:
-      if op == DOUBLESTAR:
-        return self.CAT__pow__(other)
-      if op == STAR:
-        return self.CAT__mul__(other)
-      if op == SLASH:
-        return self.CAT__truediv__(other)
-      if op == DOUBLESLASH:
-        return self.CAT__floordiv__(other)
-      if op == PERCENT:
-        return self.CAT__mod__(other)
-      if op == PLUS:
-        return self.CAT__add__(other)
-      if op == MINUS:
-        return self.CAT__sub__(other)
-      if op == DOUBLEAMPER:
-        return self.CAT__and__(other)
-      if op == DOUBLEVBAR:
-        return self or other
-      if op == AMPER:
-        return self and other
-      if op == VBAR:
-        return self.CAT__or__(other)
-      if op == CIRCUMFLEX:
-        return self.CAT__xor__(other)
-      if op == LEFTSHIFT:
-        return self.CAT__lshift__(other)
-      if op == RIGHTSHIFT:
-        return self.CAT__rshift__(other)
-      if op == EQEQUAL:
-        return self.CAT__eq__(other)
-      if op == NOTEQUAL:
-        return not self.CAT__eq__(other)
-      if op == AT:
-        return self.CAT__AT__(other)
-        
-      try:
-        if op == LESS:
-          return self.CAT__lt__(other)
-        if op == GREATER:
-          return not self.CAT__le__(other)
-        if op == LESSEQUAL:
-          return self.CAT__le__(other)
-        if op == GREATEREQUAL:
-          return not self.CAT__lt__(other)
-      except AttributeError:
-        if op == LESS:
-          return not self.CAT__ge__(other)
-        if op == GREATER:
-          return self.CAT__gt__(other)
-        if op == LESSEQUAL:
-          return not self.CAT__gt__(other)
-        if op == GREATEREQUAL:
-          return self.CAT__ge__(other)
-      
+      return func(self, other)
     except AttributeError:
-      raise errors.TypeError(
-        self.pos_start, self.pos_end, 
-        f"'{OP_REDICT[op]}' not supported between instances of '{self.CAT__class__.CAT__name__}' and '{other.CAT__class__.CAT__name__}'", 
-        self.context
-      )
-    return self.invalid(op, other)
+      return UNSUPPORTED
+  
+  def unsupported(self, op, other):
+    return errors.TypeError(
+      None, None, 
+      f"'{OP_REDICT[op]}' not supported between instances of '{self.CAT__class__.CAT__name__}' and '{other.CAT__class__.CAT__name__}'", 
+      None
+    )
   
   def CAT__repr__(self):
     t = super().__repr__()
@@ -177,18 +301,6 @@ class Object:
   def __getitem__(self):
     return self.CAT__getitem__()
   
-  def test_type(self, obj, expected_type):
-    func_name = inspect.stack(1)[1].function[3:]
-    if func_name == '__call__':
-      func_name = ''
-    func_name = self.CAT__name__ + func_name
-    if not isinstance(obj, expected_type):
-      raise errors.TypeError(
-        self.pos_start, self.pos_end,
-        f'{func_name}() argument 1 must be {expected_type.CAT__class__.CAT__name__}, not {obj.CAT__class__.CAT__name__}',
-        self.context,
-      )
-
 
 class cat_property(Object):
   def __init__(self, fget=None, fset=None):
@@ -220,15 +332,14 @@ class Type(Object):
       
   @cat_property
   def CAT__dict__(self):
-    class mappingproxy(Dict):
-      CAT__class__ = mappingproxy_type()
-      def __init__(self, value):
-        super().__init__(value)
-        
-      def CATkeys(self):
-        return self.value.keys()
-    
-    return mappingproxy({k[3:]: v for k, v in self.__class__.__dict__.items() if k.startswith('CAT')})
+    # 按类的版本号缓存, 类未被修改时不重新生成
+    cls = self.__class__
+    res = _dict_cache.get(cls)
+    if res is None or res[0] != cls._cat_version:
+      res = _dict_cache[cls] = cls._cat_version, mappingproxy(
+        {k[3:]: v for k, v in cls.__dict__.items() if k.startswith('CAT')}
+      )
+    return res[1]
   
   @cat_property
   def CAT__class__(self):
@@ -244,18 +355,16 @@ class Type(Object):
     """
     if len(args) not in (1,3):
       raise errors.TypeError(
-        self.pos_start, self.pos_end,
+        None, None,
         'type() takes 1 or 3 arguments',
-        self.context,
+        None,
       )
     if len(args) == 1:
       return cat_getattr(args[0], '__class__')
     return self.CAT__new__(*args, **kwds)
   
-  def CAT__new__(self, name, bases, dict, **kwds):
-    self.test_type(name, String)
-    self.test_type(bases, Tuple)
-    self.test_type(dict, Dict)
+  @builtin('type.__new__')
+  def CAT__new__(self, name: 'String', bases: 'Tuple', dict: 'Dict', **kwds):
     a = Type()
     a.CAT__name__ = name.get_object()
     return a
@@ -335,12 +444,14 @@ class Number(Single):
       
   def zero_error(self):
     raise errors.OpertionError(
-      self.pos_start, self.pos_end,
-      'division by zero', self.context, 
+      None, None,
+      'division by zero', None,
     )
     
+  # 作为字典的键时按数值比较, 与 Python 相同 (1, 1.0 与 true 是同一个键);
+  # 因此键能否找到与值是否来自小整数缓存或常量池无关
   def __hash__(self):
-    return super().__hash__()
+    return hash(self.value)
     
   def __truediv__(self, other):
     if other.get_object() == 0:
@@ -353,6 +464,8 @@ class Number(Single):
     return super().__floor__(other)
     
   def __eq__(self, other):
+    if not isinstance(other, Single):
+      return NotImplemented
     return self.get_object() == other.get_object()
   
   def bool_to_string(self):
@@ -438,7 +551,7 @@ class BoolType(Type):
   CAT__name__ = 'bool'
   CAT__class__ = cat_type
   def CAT__call__(self, value):
-    return Bool(value.CAT__bool__())
+    return true if value.CAT__bool__() else false
 
 
 class Bool(Number):
@@ -454,7 +567,8 @@ false = Bool(False)
 class IntType(Type):
   CAT__name__ = 'int'
   CAT__class__ = cat_type
-  def CAT__call__(self, value=0, /, base=10):
+  @builtin('int')
+  def CAT__call__(self, value=0, /, base: 'Int' = 10):
     if isinstance(base, Int):
       base = base.get_object()
     return Int(int(value.get_object(), base))
@@ -491,8 +605,14 @@ class String(Single):
   def __init__(self, value):
     super().__init__(str(value))
     
+  # 作为字典的键时按内容比较, 键能否找到与字符串是否驻留 (或已被淘汰) 无关
   def __hash__(self):
     return hash(self.value)
+  
+  def __eq__(self, other):
+    if not isinstance(other, String):
+      return NotImplemented
+    return self.value == other.value
     
   def CAT__bool__(self):
     return bool(self.get_object())
@@ -500,8 +620,8 @@ class String(Single):
   def __getitem__(self, key):
     if not isinstance(key, int) and key.name not in ('int', 'slice'):
       raise errors.TypeError(
-        self.pos_start, self.pos_end,
-        f"string indices must be integers or slices, not {key.name}", self.context, 
+        None, None,
+        f"string indices must be integers or slices, not {key.name}", None,
       )
     try:
       if isinstance(key, int):
@@ -511,8 +631,8 @@ class String(Single):
       if isinstance(key, int):
         raise
       raise errors.IndexError(
-        key.pos_start, key.pos_end,
-        str(e), self.context,
+        None, None,
+        str(e), None,
       )
 
 
@@ -565,35 +685,35 @@ class List(Single):
   def CAT__getitem__(self, key):
     if not isinstance(key, (Int, Slice)):
       raise errors.TypeError(
-        self.pos_start, self.pos_end,
-        f"list indices must be integers or slices, not {key.name}", self.context, 
+        None, None,
+        f"list indices must be integers or slices, not {key.name}", None,
       )
     try:
       return self.value.__getitem__(key.get_object())
     except IndexError as e:
       raise errors.IndexError(
-        key.pos_start, key.pos_end,
-        str(e), self.context,
+        None, None,
+        str(e), None,
       )
       
   def CAT__setitem__(self, key, value):
     if key.name not in ('int', 'slice'):
       raise errors.TypeError(
-        self.pos_start, self.pos_end,
-        f"string indices must be integers or slices, not {key.name}", self.context, 
+        None, None,
+        f"string indices must be integers or slices, not {key.name}", None,
       )
     
     try:
       return self.value.__setitem__(key.get_object(), value)
     except IndexError as e:
       raise errors.IndexError(
-        key.pos_start, key.pos_end,
-        str(e), self.context,
+        None, None,
+        str(e), None,
       )
     except TypeError as e:
       raise errors.TypeError(
-        key.pos_start, key.pos_end,
-        str(e), self.context,
+        None, None,
+        str(e), None,
       )
       
   def CAT__bool__(self):
@@ -641,13 +761,13 @@ class Dict(Single):
       return self.value.__getitem__(key)
     except TypeError:
       raise errors.TypeError(
-        key.pos_start, key.pos_end,
-        f"unhashable type: '{key.name}'", self.context, 
+        None, None,
+        f"unhashable type: '{key.name}'", None,
       )
     except KeyError as e:
       raise errors.KeyError(
-        key.pos_start, key.pos_end,
-        str(e), self.context,
+        None, None,
+        str(e), None,
       )
       
   def get(self, key):
@@ -663,6 +783,19 @@ class Dict(Single):
     return self.CATitems()
 
 
+class mappingproxy(Dict):
+  CAT__class__ = mappingproxy_type()
+  def __init__(self, value):
+    super().__init__(value)
+    
+  def CATkeys(self):
+    return self.value.keys()
+
+
+# {类: (类的版本号, mappingproxy)}, Type.CAT__dict__ 的缓存
+_dict_cache = {}
+
+
 class Slice(Object):
   def __init__(self, start, stop, step):
     super().__init__()
@@ -687,8 +820,8 @@ class Builtin_Function_Or_Method_Type(Type):
   CAT__name__ = 'builtin_function_or_method'
   def CAT__call__(self):
     raise errors.TypeError(
-      self.pos_start, self.pos_end,
-      "cannot create 'builtin_function_or_method' instances", self.context
+      None, None,
+      "cannot create 'builtin_function_or_method' instances", None
     )
 
 
@@ -697,6 +830,9 @@ class Builtin_Function_Or_Method(Object):
   def __init__(self, func, name):
     self.func = func 
     self.CAT__name__ = name
+    # 调用时直接调用实现 (或 builtin 生成的带参数检查的函数), 不经过 *args/**kwargs 转发;
+    # 没有关键字参数时也就不需要构造 kwargs 字典
+    self.CAT__call__ = func
     
   def get_object(self):
     return self.func
@@ -706,15 +842,6 @@ class Builtin_Function_Or_Method(Object):
   
   def CAT__str__(self):
     return self.__repr__()
-  
-  def CAT__call__(self, *args, **kwargs):
-    try:
-      return self.func(*args, **kwargs)
-    except errors.AttributeError:
-      raise errors.TypeError(
-        self.pos_start, self.pos_end,
-        f"bad operand type for {name.replace('_', '')}(): '{self.CAT__name__}'", self.context
-      )
 
 
 class FunctionType(Type):
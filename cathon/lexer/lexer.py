@@ -1,56 +1,80 @@
+from collections.abc import Iterator
 from ..constants import * 
-from .tokens import Token
-from .position import Position
+from .tokens import Token, BracketTable
+from .position import Position, Source
 from .. import errors
 
 
 class Lexer(object):
   def __init__(self, file: str, code: str):
     self.file, self.code = file, code
+    self.source = Source(file, code)
     self.char = None
-    self.pos = Position(-1, 0, -1, file, code)
+    self.index = -1
     self.advance()
     self.indents = []
     self.indent_type = None
+    self.brackets = BracketTable()
     
   def advance(self, count=1):
-    while (count := count - 1) >= 0:
-      self.pos.advance(self.char)
-      self.update()
+    self.index += count
+    self.update()
     
   def update(self):
-    if self.pos.index >= len(self.code):
+    if self.index >= len(self.code):
       self.char = None 
     else:
-      self.char = self.code[self.pos.index]
+      self.char = self.code[self.index]
       
-  def reverse_to(self, pos):
-    self.pos = pos
+  def reverse_to(self, index):
+    self.index = index
     self.update()
     
+  def position(self, index=None) -> Position:
+    if index is None:
+      index = self.index
+    return Position(self.source, index)
+    
+  def token(self, type, value=None, start=None, end=None) -> Token:
+    if start is None:
+      start = self.index
+    return Token(type, value, start, end, self.source)
+    
   def lookahead(self, count=1):
-    index = self.pos.index + count
+    index = self.index + count
     if index >= len(self.code):
       return None 
     return self.code[index]
   
   def parse(self) -> list[Token]:
-    res = []
+    return list(self.iter_tokens())
+
+  def iter_tokens(self) -> Iterator[Token]:
+    """
+    按需逐个产生 token
+    """
+    started = False
+    # 尚未输出的 NEWLINE: 其后的 DEDENT 先输出, 连续空行只保留最后一个
+    newline = None
     brackets_nl = ''
     while self.char:
       if self.char == '#':
         self.skip_comment()
         continue
      
-      if len(res) == 0 or self.char == '\n':
+      if not started or self.char == '\n':
         tokens = self.make_indent()
-        if len(res) != 0:
-          res.append(Token(NEWLINE, pos_start=self.pos))
+        if started:
+          newline = self.token(NEWLINE)
         if tokens: 
-          if len(res) == 0:
-            raise errors.IndentationError(self.pos, self.pos, 'unexpected indent')
-          res.extend(tokens)
-        if len(res) != 0:
+          if not started:
+            raise errors.IndentationError(self.position(), self.position(), 'unexpected indent')
+          for token in tokens:
+            if token.type == INDENT and newline:
+              yield newline
+              newline = None
+            yield token
+        if started:
           i = 1 
           while self.lookahead(i) in (' ', '\t'):
             i += 1
@@ -72,7 +96,7 @@ class Lexer(object):
         brackets_nl = ''
       
       if self.char == '\\':
-        token = Token(NL, pos_start=self.pos)
+        token = self.token(NL)
         self.advance()
       elif (
         (DIGITS(self.char) and self.char != '.') or 
@@ -83,34 +107,31 @@ class Lexer(object):
         token = self.make_dots()
       elif self.char in OP_DICT:
         token = self.make_opertor()
+        self.brackets.record(token)
       elif self.char in STRING_FLAG:
         token = self.make_string(self.char)
       elif LETTERS(self.char):
         token = self.make_name()
       else:
-        pos_start = self.pos.copy()
+        pos_start = self.position()
         char = self.char
         self.advance()
-        raise errors.SyntaxError(pos_start, self.pos, f"invalid character '{char}' (U+{hex(ord(char))})")
-      res.append(token)
+        raise errors.SyntaxError(pos_start, self.position(), f"invalid character '{char}' (U+{hex(ord(char))})")
+      if newline:
+        yield newline
+        newline = None
+      started = True
+      yield token
       if brackets_nl:
-        res.append(Token(NL, pos_start=self.pos)) 
+        yield self.token(NL)
     
     while self.indents:
-      res.append(Token(DEDENT, len(self.indents), pos_start=self.pos))
+      yield self.token(DEDENT, len(self.indents))
       self.indents.pop()
+    if newline:
+      yield newline
     
-    i = 0
-    while i < len(res) - 1:
-      if res[i].type == NEWLINE and res[i+1].type == DEDENT:
-        res[i:i+2] = (res[i:i+2])[::-1]
-      elif res[i].type == NEWLINE and res[i+1].type == NEWLINE:
-        i -= 1 
-        res.pop(i+1)
-      i += 1
-    
-    res.append(Token(ENDMARKER, pos_start=self.pos))
-    return res
+    yield self.token(ENDMARKER)
     
   def skip_comment(self):
     self.advance()
@@ -130,13 +151,13 @@ class Lexer(object):
       '''
         
     count = 0
-    pos_start = self.pos.copy()
+    start = self.index
     while self.char and self.char in (' ', '\t'):
       if self.indent_type == None:
         self.indent_type = self.char
       elif self.indent_type != self.char:
         raise errors.TabError(
-          self.pos, self.pos,
+          self.position(), self.position(),
           'inconsistent use of tabs and spaces in indentation'
         )
       count += 1
@@ -145,21 +166,17 @@ class Lexer(object):
     while self.indents:
       if count >= self.indents[-1]:
         break
-      res.append(Token(DEDENT, len(self.indents), self.pos))
+      res.append(self.token(DEDENT, len(self.indents)))
       self.indents.pop()
     
-    if count:
-      flag = self.indents.count(count) == 0
-      if self.lookahead() == NEWLINE:
-        flag = False
-      if not self.indents or count > self.indents[-1]:
-        self.indents.append(count)
-      if flag:
-        res.append(Token(INDENT, len(self.indents), pos_start, self.pos))
+    # indents 严格递增, 弹出后栈顶不大于 count, 只需与栈顶比较
+    if count and (not self.indents or count > self.indents[-1]):
+      self.indents.append(count)
+      res.append(self.token(INDENT, len(self.indents), start, self.index))
     return res
   
   def make_number(self) -> Token:
-    pos_start = self.pos.copy()
+    start = self.index
     if self.char == '0' and self.lookahead() == 'b':
       self.advance(2)
       num = self.make_num(2)
@@ -168,7 +185,7 @@ class Lexer(object):
       num = self.make_num(16)
     else:
       num = self.make_num(10)
-    return Token(NUMBER, num, pos_start, self.pos)
+    return self.token(NUMBER, num, start, self.index)
   
   def make_num(self, base=10):
     bases = {
@@ -177,7 +194,7 @@ class Lexer(object):
       16: ('hexadecimal', HEX_DIGITS),
     }
     num = []
-    pos_start = self.pos.copy()
+    pos_start = self.position()
     is_float = False
     while self.char and (
       LETTERS_DIGITS(self.char) or 
@@ -190,30 +207,30 @@ class Lexer(object):
         continue
       elif not bases[base][1](self.char):
         self.advance()
-        raise errors.SyntaxError(pos_start, self.pos, f'invalid {bases[base][0]} literal')
+        raise errors.SyntaxError(pos_start, self.position(), f'invalid {bases[base][0]} literal')
       num.append(self.char)
       self.advance()
     num = ''.join(num)
     if not num:
       self.advance()
-      raise errors.SyntaxError(pos_start, self.pos, f'invalid {bases[base][0]} literal')
+      raise errors.SyntaxError(pos_start, self.position(), f'invalid {bases[base][0]} literal')
       
     if is_float:
       return float(num)
     return int(num, base)
     
   def make_dots(self):
-    pos_start = self.pos.copy()
+    start = self.index
     self.advance()
     count = 1
     while self.char == '.':
       self.advance()
       count += 1
     if count == 1:
-      return Token(DOT, None, pos_start, self.pos)
+      return self.token(DOT, None, start, self.index)
     if count == 3:
-      return Token(ELLIPSIS, None, pos_start, self.pos)
-    raise errors.SyntaxError(pos_start, self.pos)
+      return self.token(ELLIPSIS, None, start, self.index)
+    raise errors.SyntaxError(self.position(start), self.position())
   
   def make_opertor(self) -> Token:
     def get_op(dict_, res=None):
@@ -230,16 +247,16 @@ class Lexer(object):
         return get_op(dict_, res)
       return res
     
-    pos_start = self.pos.copy()
+    start = self.index
     res = get_op(OP_DICT)
     if res is None:
-      self.reverse_to(pos_start)
+      self.reverse_to(start)
       return self.make_name()
-    return Token(res, pos_start=pos_start, pos_end=self.pos)
+    return self.token(res, None, start, self.index)
       
   def make_string(self, quotation) -> Token:
     res = []
-    pos_start = self.pos.copy()
+    start = self.index
     escape_character = False
     
     self.advance()
@@ -248,7 +265,7 @@ class Lexer(object):
       (quotation in ('“', '”') and self.char not in ('“', '”'))
     ) or escape_character:
       if self.char is None or self.char == '\n':
-        raise errors.SyntaxError(self.pos, self.pos, f'unterminated string literal (excepted {repr(quotation)} )')
+        raise errors.SyntaxError(self.position(), self.position(), f'unterminated string literal (excepted {repr(quotation)} )')
       if escape_character:
         res.append(ESCAPE_CHAR.get(self.char, self.char))
         escape_character = False
@@ -261,11 +278,11 @@ class Lexer(object):
       res.append(self.char)
       self.advance()
     self.advance()
-    return Token(STRING, ''.join(res), pos_start, self.pos)
+    return self.token(STRING, ''.join(res), start, self.index)
   
   def make_name(self) -> Token:
     res = []
-    pos_start = self.pos.copy()
+    start = self.index
     res.append(self.char)
     self.advance()
     while self.char and LETTERS_DIGITS(self.char):
@@ -275,8 +292,8 @@ class Lexer(object):
     
     if res in SPECIAL_KEYWORDS:
       tok_type, tok_value = SPECIAL_KEYWORDS[res]
-      return Token(tok_type, tok_value, pos_start, self.pos)
+      return self.token(tok_type, tok_value, start, self.index)
     elif res in KEYWORDS:
-      return Token(NAME, res, pos_start, self.pos)
-    return Token(NAME, res, pos_start, self.pos)
+      return self.token(NAME, res, start, self.index)
+    return self.token(NAME, res, start, self.index)
     
\ No newline at end of file
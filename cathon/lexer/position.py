@@ -1,19 +1,69 @@
+import re
+from bisect import bisect_right
+
+
+class Source(object):
+  """
+  源代码, 由同一文件的全部 token 与节点共享;
+  行列号只在需要时 (报错、回溯) 通过行首索引二分查找得到;
+  流式读取时, 新读入的文本通过 feed 追加, 行首索引随之增量更新, 不需要拼接全文;
+  全文始终保留 (语法树的任意节点报错时都要显示所在的行, 转换与序列化也以全文为键),
+  因此只有词法分析的窗口与语法分析的缓冲区不随文件增长
+  """
+  __slots__ = ('file', '_chunks', '_line_starts', '_length')
+
+  def __init__(self, file: str, code: str = ''):
+    self.file = file
+    self._chunks = [code]
+    self._line_starts = None
+    self._length = len(code)
+
+  @property
+  def code(self) -> str:
+    if len(self._chunks) > 1:
+      self._chunks = [''.join(self._chunks)]
+    return self._chunks[0]
+
+  def feed(self, text: str):
+    self._chunks.append(text)
+    if self._line_starts is not None:
+      base = self._length
+      self._line_starts.extend(base + m.end() for m in re.finditer('\n', text))
+    self._length += len(text)
+
+  @property
+  def line_starts(self) -> list[int]:
+    if self._line_starts is None:
+      self._line_starts = [0] + [m.end() for m in re.finditer('\n', self.code)]
+    return self._line_starts
+
+  def line_column(self, index: int) -> tuple[int, int]:
+    line = max(bisect_right(self.line_starts, index) - 1, 0)
+    return line, index - self.line_starts[line]
+
+
 class Position(object):
-  def __init__(self, index: int, line: int, column: int, file: str, code: str):
+  """
+  源代码中的一个位置, 只在报错时创建
+  """
+  __slots__ = ('source', 'index')
+
+  def __init__(self, source: Source, index: int):
+    self.source = source
     self.index = index
-    self.line = line
-    self.column = column
-    self.file = file
-    self.code = code
-    
-  def advance(self, char: str = None):
-    self.index += 1
-    self.column += 1
-    
-    if char == '\n':
-      self.column = 0
-      self.line += 1
-      
-  def copy(self):
-    return Position(self.index, self.line, self.column, self.file, self.code)
-    
\ No newline at end of file
+
+  @property
+  def file(self) -> str:
+    return self.source.file
+
+  @property
+  def code(self) -> str:
+    return self.source.code
+
+  @property
+  def line(self) -> int:
+    return self.source.line_column(self.index)[0]
+
+  @property
+  def column(self) -> int:
+    return self.source.line_column(self.index)[1]
@@ -0,0 +1,416 @@
+import re
+from typing import Union
+from collections.abc import Iterable, Iterator
+from ..constants import *
+from .lexer import Lexer
+from .tokens import Token
+from .position import Position
+from .. import errors
+
+
+def _char_class(ascii_chars, excludes):
+  """
+  构造字符类: 给定的 ASCII 字符 + 除 excludes 外的全部非 ASCII 字符
+  """
+  ranges = []
+  start = 0x80
+  for o in sorted(map(ord, excludes)):
+    if start < o:
+      ranges.append(f'\\U{start:08x}-\\U{o - 1:08x}')
+    start = o + 1
+  ranges.append(f'\\U{start:08x}-\\U0010ffff')
+  return '[' + ascii_chars + ''.join(ranges) + ']'
+
+
+def _op_paths(dict_, prefix='', res=None):
+  """
+  展开 OP_DICT, 得到 {可被 make_opertor 消耗的字符串: token 类型或 None}
+  """
+  if isinstance(dict_, tuple):
+    res = dict_[0] or res
+    dict_ = dict_[1]
+  if isinstance(dict_, set):
+    dict_ = {'=': next(i for i in dict_ if i != '=')}
+  paths = {}
+  if prefix:
+    paths[prefix] = res
+  for char, sub in dict_.items():
+    if len(char) != 1:
+      continue
+    if isinstance(sub, dict):
+      sub = (None, sub)
+    if isinstance(sub, tuple):
+      paths.update(_op_paths(sub, prefix + char))
+    else:
+      paths[prefix + char] = sub
+  return paths
+
+
+_FULLWIDTH = '（）“”：，'
+LETTER_CLASS = _char_class(r'a-zA-Z_\$', _FULLWIDTH)
+LETTER_DIGIT_CLASS = _char_class(r'0-9a-zA-Z_\$', _FULLWIDTH)
+NUMBER_CLASS = _char_class(r'0-9a-zA-Z_\$\.', _FULLWIDTH)
+
+OP_PATHS = _op_paths(OP_DICT)
+BRACKETS_NL = {'(': ')', '[': ']', '{': '}'}
+
+MASTER = re.compile('|'.join((
+  r'(?P<SPACE> +)',
+  r'(?P<COMMENT>#[^\n]*)',
+  r'(?P<NL>\\)',
+  r'(?P<NUMBER>(?=[0-9]|\.[0-9])(?:0[bx])?' + NUMBER_CLASS + '*)',
+  r'(?P<DOTS>\.+)',
+  '(?P<OP>' + '|'.join(map(re.escape, sorted(OP_PATHS, key=len, reverse=True))) + ')',
+  '(?P<STRING>[' + ''.join(STRING_FLAG) + '])',
+  '(?P<NAME>' + LETTER_CLASS + LETTER_DIGIT_CLASS + '*)',
+))).match
+# 行内常见 token 的快速路径, 由 finditer 一次扫描整个窗口;
+# 各组的先后顺序与 MASTER 相同, 需要特殊处理的情况 (后接换行的左括号、带转义的字符串、
+# 非十进制或非法的数字、空行与缩进变化等) 都不匹配, 落到 SLOW, 交给 MASTER 逐个处理
+FAST = re.compile('|'.join((
+  r'(?P<SPACE> +)',
+  r'(?P<COMMENT>#[^\n]*)',
+  r'(?P<FLOAT>[0-9]+\.[0-9]+(?!' + NUMBER_CLASS + '))',
+  r'(?P<INT>[0-9]+(?!' + NUMBER_CLASS + '))',
+  r'(?P<DOT>\.(?![.0-9]))',
+  '(?P<OP>' + '|'.join(
+    re.escape(i) + (r'(?!\n)' if i in BRACKETS_NL else '')
+    for i in sorted(OP_PATHS, key=len, reverse=True)
+  ) + ')',
+  r'(?P<STRING>"[^"\\\n]*"|' + r"'[^'\\\n]*'|[“”][^“”\\\n]*[“”])",
+  '(?P<NAME>' + LETTER_CLASS + LETTER_DIGIT_CLASS + '*)',
+  # 缩进不变、下一行不是空行或注释的换行; 下一行首个字符之后为空白时 Lexer 有特殊处理, 也不匹配
+  r'(?P<NEWLINE>\n[ \t]*(?=[^\s#])(?!.[ \t]*(?:\n|\Z)))',
+  r'(?P<SLOW>[\s\S])',
+))).finditer
+NAME_PATTERN = re.compile('.' + LETTER_DIGIT_CLASS + '*').match
+INDENT_PATTERN = re.compile(r'[ \t]*').match
+BLANK_PATTERN = re.compile(r'[ \t]*(?:\n|\Z)').match
+ESCAPE_PATTERN = re.compile(r'\\(.)')
+
+NUMBER_BASES = {
+  '0b': (2, 'binary', re.compile(r'[01_]*').fullmatch, re.compile(r'[^01_]').search),
+  '0x': (16, 'hexadecimal', re.compile(r'[0-9a-fA-F_]*').fullmatch, re.compile(r'[^0-9a-fA-F_]').search),
+  '': (10, 'decimal', re.compile(r'[0-9_.]*').fullmatch, re.compile(r'[^0-9_.]').search),
+}
+STRING_PATTERNS = {
+  q: re.compile(
+    '(?:[^“”\\\\\n]|\\\\[^\n])*[“”]' if q in ('“', '”') else
+    f'[^{q}\n]*{q}' if q == '`' else
+    f'(?:[^{q}\\\\\n]|\\\\[^\n])*{q}'
+  ).match
+  for q in STRING_FLAG
+}
+STRING_PREFIX_PATTERNS = {
+  q: re.compile(
+    '(?:[^“”\\\\\n]|\\\\[^\n])*' if q in ('“', '”') else
+    f'[^{q}\n]*' if q == '`' else
+    f'(?:[^{q}\\\\\n]|\\\\[^\n])*'
+  ).match
+  for q in STRING_FLAG
+}
+BRACKET_TYPES = set(BRACKETS) | set(BRACKETS.values())
+# 流式读取时每次至少读入的字符数
+CHUNK_SIZE = 1 << 16
+
+
+class RegexLexer(Lexer):
+  """
+  基于主正则的词法分析器, 一次匹配完整的 NAME/NUMBER/STRING/运算符,
+  产生的 token 流与 Lexer 完全一致
+  """
+  def __init__(self, file: str, code: Union[str, Iterable[str]]):
+    lines = None
+    if not isinstance(code, str):
+      lines, code = iter(code), ''
+    super().__init__(file, code)
+    self.index = 0
+    # code 只是输入中尚未处理完的一段窗口, base 为窗口起点在整个源代码中的偏移
+    self.base = 0
+    self.lines = lines
+    self.refill_at = len(code) + 1
+
+  def refill(self):
+    """
+    从输入流中读入更多的行, 同时丢弃窗口中已经处理过的部分;
+    保证当前行之后至少还有两个完整的行 (或已到达输入末尾)
+    """
+    chunk = []
+    size = 0
+    for line in self.lines:
+      chunk.append(line)
+      size += len(line)
+      if not line.endswith('\n'):
+        self.lines = None
+        break
+      if size >= CHUNK_SIZE and len(chunk) >= 3:
+        break
+    else:
+      self.lines = None
+    text = ''.join(chunk)
+    self.source.feed(text)
+
+    self.base += self.index
+    self.code = code = self.code[self.index:] + text
+    self.index = 0
+    if self.lines is None:
+      self.refill_at = len(code) + 1
+      return
+    index = len(code)
+    for _ in range(3):
+      index = code.rfind('\n', 0, index)
+      if index < 0:
+        break
+    self.refill_at = index + 1
+
+  def position(self, index=None) -> Position:
+    if index is None:
+      index = self.index
+    return Position(self.source, self.base + index)
+
+  def token(self, type, value=None, start=None, end=None) -> Token:
+    if start is None:
+      start = self.index
+    if end is None:
+      end = start
+    return Token(type, value, self.base + start, self.base + end, self.source)
+
+  def iter_tokens(self) -> Iterator[Token]:
+    if self.lines is not None:
+      self.refill()
+    code, source, base = self.code, self.source, self.base
+    brackets = self.brackets
+    bracket_types = BRACKET_TYPES
+    length = len(code)
+    started = False
+    # 尚未输出的 NEWLINE: 其后的 DEDENT 先输出, 连续空行只保留最后一个
+    newline = None
+    brackets_nl = ''
+    fast = FAST
+    special_keywords = SPECIAL_KEYWORDS
+    op_paths = OP_PATHS
+    while self.index < length:
+      if started and not brackets_nl:
+        index = self.index
+        refill_at = self.refill_at
+        indentation = '\n' + (self.indent_type or '') * (self.indents[-1] if self.indents else 0)
+        for m in fast(code, index):
+          kind = m.lastgroup
+          if kind == 'NAME':
+            index, end = m.span()
+            name = m.group()
+            special = special_keywords.get(name)
+            if special is None:
+              token = Token(NAME, name, base + index, base + end, source)
+            else:
+              token = Token(special[0], special[1], base + index, base + end, source)
+          elif kind == 'SPACE':
+            continue
+          elif kind == 'OP':
+            index, end = m.span()
+            tok_type = op_paths[m.group()]
+            if tok_type is None:
+              break
+            token = Token(tok_type, None, base + index, base + end, source)
+            if tok_type in bracket_types:
+              brackets.record(token)
+          elif kind == 'NEWLINE':
+            index, end = m.span()
+            if index >= refill_at or m.group() != indentation:
+              break
+            newline = Token(NEWLINE, None, base + end, base + end, source)
+            continue
+          elif kind == 'INT':
+            index, end = m.span()
+            token = Token(NUMBER, int(m.group()), base + index, base + end, source)
+          elif kind == 'STRING':
+            index, end = m.span()
+            token = Token(STRING, m.group()[1:-1], base + index, base + end, source)
+          elif kind == 'FLOAT':
+            index, end = m.span()
+            token = Token(NUMBER, float(m.group()), base + index, base + end, source)
+          elif kind == 'DOT':
+            index, end = m.span()
+            token = Token(DOT, None, base + index, base + end, source)
+          elif kind == 'COMMENT':
+            continue
+          else:
+            index = m.start()
+            break
+          if newline:
+            yield newline
+            newline = None
+          yield token
+        else:
+          index = length
+        self.index = index
+        if index >= length:
+          break
+
+      index = self.index
+      char = code[index]
+      if char == '#':
+        end = code.find('\n', index)
+        self.index = length if end < 0 else end
+        continue
+
+      if not started or char == '\n':
+        if index >= self.refill_at:
+          self.refill()
+          code, base = self.code, self.base
+          length = len(code)
+        tokens = self.make_indent()
+        if started:
+          newline = self.token(NEWLINE)
+        if tokens:
+          if not started:
+            raise errors.IndentationError(self.position(), self.position(), 'unexpected indent')
+          for token in tokens:
+            if token.type == INDENT and newline:
+              yield newline
+              newline = None
+            yield token
+        if started and BLANK_PATTERN(code, self.index + 1):
+          self.index += 1
+          continue
+        if self.index >= length:
+          break
+        index = self.index
+        char = code[index]
+
+      m = MASTER(code, index)
+      kind = m and m.lastgroup
+      if kind == 'SPACE':
+        self.index = m.end()
+        continue
+      if kind == 'COMMENT':
+        # 与 Lexer 一致: 紧跟在换行之后的注释不会被跳过
+        kind = None
+
+      if char in BRACKETS_NL and index + 1 < length and code[index + 1] == '\n':
+        brackets_nl = BRACKETS_NL[char]
+      if char == brackets_nl:
+        brackets_nl = ''
+
+      if kind == 'NAME':
+        end = self.index = m.end()
+        name = m.group()
+        tok_type, tok_value = SPECIAL_KEYWORDS.get(name, (NAME, name))
+        token = Token(tok_type, tok_value, base + index, base + end, source)
+      elif kind == 'OP':
+        tok_type = OP_PATHS[m.group()]
+        if tok_type is None:
+          token = self.match_name()
+        else:
+          end = self.index = m.end()
+          token = Token(tok_type, None, base + index, base + end, source)
+          if tok_type in bracket_types:
+            brackets.record(token)
+      elif kind == 'NUMBER':
+        token = self.match_number(m)
+      elif kind == 'STRING':
+        token = self.match_string(char)
+      elif kind == 'DOTS':
+        self.index = m.end()
+        count = self.index - index
+        if count == 1:
+          token = self.token(DOT, None, index, self.index)
+        elif count == 3:
+          token = self.token(ELLIPSIS, None, index, self.index)
+        else:
+          raise errors.SyntaxError(self.position(index), self.position())
+      elif kind == 'NL':
+        self.index = index + 1
+        token = self.token(NL, None, index)
+      else:
+        self.index = index + 1
+        raise errors.SyntaxError(self.position(index), self.position(), f"invalid character '{char}' (U+{hex(ord(char))})")
+      if newline:
+        yield newline
+        newline = None
+      started = True
+      yield token
+      if brackets_nl:
+        yield self.token(NL)
+
+    while self.indents:
+      yield self.token(DEDENT, len(self.indents))
+      self.indents.pop()
+    if newline:
+      yield newline
+
+    yield self.token(ENDMARKER)
+
+  def make_indent(self):
+    code = self.code
+    if self.index < len(code) and code[self.index] == '\n':
+      self.index += 1
+    start = self.index
+    end = INDENT_PATTERN(code, start).end()
+    for index in range(start, end):
+      if self.indent_type is None:
+        self.indent_type = code[index]
+      elif self.indent_type != code[index]:
+        raise errors.TabError(
+          self.position(index), self.position(index),
+          'inconsistent use of tabs and spaces in indentation'
+        )
+    count = end - start
+    self.index = end
+
+    res = []
+    while self.indents:
+      if count >= self.indents[-1]:
+        break
+      res.append(self.token(DEDENT, len(self.indents)))
+      self.indents.pop()
+
+    # indents 严格递增, 弹出后栈顶不大于 count, 只需与栈顶比较
+    if count and (not self.indents or count > self.indents[-1]):
+      self.indents.append(count)
+      res.append(self.token(INDENT, len(self.indents), start, end))
+    return res
+
+  def match_number(self, m) -> Token:
+    text = m.group()
+    prefix = text[:2] if text[:2] in ('0b', '0x') else ''
+    base, name, valid, invalid = NUMBER_BASES[prefix]
+    num_start = m.start() + len(prefix)
+    num = text[len(prefix):]
+    if not valid(num):
+      self.index = num_start + invalid(num).start() + 1
+      raise errors.SyntaxError(self.position(num_start), self.position(), f'invalid {name} literal')
+    self.index = m.end()
+    num = num.replace('_', '')
+    if not num:
+      self.index += 1
+      raise errors.SyntaxError(self.position(num_start), self.position(), f'invalid {name} literal')
+
+    if '.' in num:
+      num = float(num)
+    else:
+      num = int(num, base)
+    return self.token(NUMBER, num, m.start(), self.index)
+
+  def match_string(self, quotation: str) -> Token:
+    start = self.index
+    m = STRING_PATTERNS[quotation](self.code, start + 1)
+    if m is None:
+      index = STRING_PREFIX_PATTERNS[quotation](self.code, start + 1).end()
+      if self.code.startswith('\\', index) and quotation != '`':
+        index += 1
+      raise errors.SyntaxError(self.position(index), self.position(index), f'unterminated string literal (excepted {repr(quotation)} )')
+
+    self.index = m.end()
+    value = m.group()[:-1]
+    if quotation != '`' and '\\' in value:
+      value = ESCAPE_PATTERN.sub(lambda m: ESCAPE_CHAR.get(m.group(1), m.group(1)), value)
+    return self.token(STRING, value, start, self.index)
+
+  def match_name(self) -> Token:
+    start = self.index
+    m = NAME_PATTERN(self.code, start)
+    self.index = m.end()
+    name = m.group()
+    tok_type, tok_value = SPECIAL_KEYWORDS.get(name, (NAME, name))
+    return self.token(tok_type, tok_value, start, self.index)
@@ -1,29 +1,68 @@
 from typing import Any
+from collections import deque
 from collections.abc import Iterable
 from ..constants import *
-from .position import Position
+from .position import Position, Source
 
 
 class Token(object):
-  def __init__(self, type: str, value: Any = None, pos_start: Position = None, pos_end: Position = None):
+  __slots__ = ('type', 'value', 'index_start', 'index_end', 'source')
+
+  def __init__(self, type: int, value: Any = None, index_start: int = 0, index_end: int = None, source: Source = None):
     self.type = type
     self.value = value
-    self.pos_start = pos_start.copy()
-    if not pos_end:
-      pos_end = pos_start
-    self.pos_end = pos_end.copy()
-    
+    self.index_start = index_start
+    self.index_end = index_start if index_end is None else index_end
+    self.source = source
+
+  @property
+  def pos_start(self) -> Position:
+    return Position(self.source, self.index_start)
+
+  @property
+  def pos_end(self) -> Position:
+    return Position(self.source, self.index_end)
+
   def __repr__(self):
     if self.value is None:
       return str(tok_name[self.type])
     return f'{tok_name[self.type]}({repr(self.value)})'
-  
+
   def to_dict(self):
     if self.value is None:
       return {'type': tok_name[self.type]}
     return {'type': tok_name[self.type], 'value': self.value}
-  
+
   def matches(self, type, values):
     if not isinstance(values, Iterable):
       values = (values,)
     return self.type == type and any(self.value == value for value in values)
+
+
+class BracketTable(dict):
+  """
+  括号匹配表: 左括号的起始索引 -> 对应右括号的起始索引;
+  左括号不在表中说明对应的右括号尚未读到
+  """
+  def __init__(self):
+    super().__init__()
+    self.opens = {type: [] for type in BRACKETS}
+    self.closes = {close: self.opens[type] for type, close in BRACKETS.items()}
+    # 按右括号出现的顺序记录的左括号索引, 用于 prune
+    self.order = deque()
+
+  def record(self, token: Token):
+    if token.type in self.opens:
+      self.opens[token.type].append(token.index_start)
+    elif (stack := self.closes.get(token.type)):
+      start = stack.pop()
+      self[start] = token.index_start
+      self.order.append(start)
+
+  def prune(self, index: int):
+    """
+    删除起始索引在 index 之前的记录
+    """
+    order = self.order
+    while order and order[0] < index:
+      del self[order.popleft()]
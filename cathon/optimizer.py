@@ -0,0 +1,223 @@
+from collections.abc import Callable
+from .constants import *
+from .lexer.tokens import Token
+from .parser.nodes import *
+from .interpreter import Interpreter, Context, values
+from .interpreter.interpreter import auto
+
+
+# 各优化级别: 1 折叠常量表达式; 2 另外删除条件为常量的分支, 并展开嵌套的语句块
+FOLD = 1
+PRUNE = 2
+
+# 折叠得到的常量的上限, 超过时留到运行时再计算
+MAX_STR_SIZE = 4096
+MAX_INT_BITS = 128
+
+
+class Optimizer(object):
+  """
+  在解析与执行之间对语法树做等价变换, 变换前后的执行效果 (输出与报错) 相同;
+  级别 2 展开语句块后, 程序的结果 (各语句的值组成的元组) 可能不同
+  """
+  # {节点类型: optimize_* 方法}, 与 Interpreter.visitors 相同
+  optimizers: dict[type, Callable] = {}
+  interpreter = Interpreter
+
+  def __init__(self, level: int = PRUNE):
+    self.level = level
+    self.context = Context('<optimizer>')
+    self.nodes_before = 0
+    self.nodes_after = 0
+    self.folded = 0
+    self.pruned = 0
+    self.flattened = 0
+
+  def __init_subclass__(cls, **kwargs):
+    super().__init_subclass__(**kwargs)
+    cls.build_optimizers()
+
+  @classmethod
+  def build_optimizers(cls):
+    cls.optimizers = {}
+    todo = [ASTNode]
+    while todo:
+      node_class = todo.pop()
+      todo.extend(node_class.__subclasses__())
+      method = getattr(cls, f'optimize_{node_class.__name__}', None)
+      if method is not None:
+        cls.optimizers[node_class] = method
+
+  def optimize(self, node: ASTNode) -> ASTNode:
+    if self.level <= 0:
+      return node
+    self.nodes_before += sum(1 for _ in node.walk())
+    node = self.visit(node)
+    self.nodes_after += sum(1 for _ in node.walk())
+    return node
+
+  def report(self) -> str:
+    return (
+      f'optimizer (level {self.level}): '
+      f'{self.nodes_before} -> {self.nodes_after} nodes '
+      f'({self.nodes_before - self.nodes_after} eliminated), '
+      f'{self.folded} folded, {self.pruned} branches pruned, '
+      f'{self.flattened} blocks flattened'
+    )
+
+  def visit(self, node):
+    method = self.optimizers.get(type(node), Optimizer.generic_optimize)
+    return method(self, node)
+
+  def generic_optimize(self, node):
+    for name, value in node.iter_fields():
+      setattr(node, name, self.transform(value))
+    return node
+
+  def transform(self, value):
+    if isinstance(value, ASTNode):
+      return self.visit(value)
+    if isinstance(value, dict):
+      return {self.transform(k): self.transform(v) for k, v in value.items()}
+    if isinstance(value, list):
+      return [self.transform(i) for i in value]
+    if isinstance(value, tuple):
+      return tuple(self.transform(i) for i in value)
+    return value
+
+  def constant(self, node):
+    """
+    常量节点求值后的值, 不是常量时返回 None
+    """
+    if isinstance(node, (NumberNode, StringNode)):
+      return auto(self.interpreter.visit(node, self.context))
+
+  def fold(self, node):
+    """
+    在优化时计算 node, 结果为数字或字符串时替换为常量节点; 出错时保持原样, 留到运行时报错
+    """
+    try:
+      res = auto(self.interpreter.visit(node, self.context))
+    except Exception:
+      return node
+    if isinstance(res, (values.Bool, values.Int, values.Float)):
+      type, cls = NUMBER, NumberNode
+    elif isinstance(res, values.String) and len(res.value) <= MAX_STR_SIZE:
+      type, cls = STRING, StringNode
+    else:
+      return node
+    if isinstance(res.value, int) and res.value.bit_length() > MAX_INT_BITS:
+      return node
+    self.folded += 1
+    # 常量的位置即原表达式的位置, 之后的报错位置不变
+    return cls(Token(type, res.value, node.index_start, node.index_end, node.source))
+
+  def optimize_UnaryOpNode(self, node):
+    node.right = self.visit(node.right)
+    if self.constant(node.right) is not None:
+      return self.fold(node)
+    return node
+
+  def optimize_BinaryOpNode(self, node):
+    node.left = self.visit(node.left)
+    node.right = self.visit(node.right)
+    left = self.constant(node.left)
+    right = self.constant(node.right)
+    if left is None or right is None or not self.small(node.op.type, left.value, right.value):
+      return node
+    return self.fold(node)
+
+  def optimize_BoolOpNode(self, node):
+    node.left = self.visit(node.left)
+    node.right = self.visit(node.right)
+    left = self.constant(node.left)
+    if left is None:
+      return node
+    # 与运行时相同, 按 Interpreter.boolean 判断常量左操作数, 结果为左操作数或右操作数本身
+    self.folded += 1
+    if self.interpreter.boolean(left) == (node.op.type == DOUBLEVBAR):
+      return node.left
+    return node.right
+
+  @staticmethod
+  def small(op, left, right) -> bool:
+    """
+    粗略估计运算结果的大小, 避免在优化时构造巨大的常量
+    """
+    if isinstance(right, str):
+      left, right = right, left
+    if isinstance(left, str):
+      return op != STAR or not isinstance(right, int) or len(left) * right <= MAX_STR_SIZE
+    if not isinstance(left, int) or not isinstance(right, int):
+      return True
+    if op == DOUBLESTAR:
+      return right < 0 or left.bit_length() * right <= MAX_INT_BITS
+    if op == LEFTSHIFT:
+      return right < 0 or left.bit_length() + right <= MAX_INT_BITS
+    if op == STAR:
+      return left.bit_length() + right.bit_length() <= MAX_INT_BITS
+    return True
+
+  def optimize_IfNode(self, node):
+    node = self.generic_optimize(node)
+    if self.level < PRUNE:
+      return node
+
+    # [(条件, 语句块, 是否一定执行)]
+    cases = []
+    for condition, body in node.cases:
+      value = self.constant(condition)
+      # 与运行时相同, 按 Interpreter.truth 判断常量条件
+      if value is not None and not self.interpreter.truth(value):
+        self.pruned += 1
+        continue
+      cases.append((condition, body, value is not None))
+      if node.oneline and value is not None:
+        # 其后的分支与 else 块不会执行
+        self.pruned += len(node.cases) - len(cases) + (node.else_block is not None)
+        node.else_block = None
+        break
+
+    if not node.oneline:
+      if all(always for condition, body, always in cases):
+        # 全部分支都一定执行: 由所在的语句块展开
+        self.flattened += 1
+        bodies = [body for condition, body, always in cases]
+        if node.else_block is not None:
+          bodies.append(node.else_block)
+        return bodies
+    elif not cases:
+      return node if node.else_block is None else node.else_block
+    elif len(cases) == 1 and cases[0][2]:
+      body = cases[0][1]
+      if not isinstance(body, (IfNode, VarDeleteNode)):
+        return body
+
+    node.cases = [(condition, body) for condition, body, always in cases]
+    return node
+
+  def optimize_TupleNode(self, node):
+    node.items = self.block(node.items)
+    return node
+
+  def optimize_ListNode(self, node):
+    node.items = self.block(node.items)
+    return node
+
+  def block(self, items):
+    res = []
+    for i in items:
+      i = self.visit(i)
+      if not isinstance(i, list):
+        res.append(i)
+        continue
+      # 展开的 if 语句: 依次执行各语句块中的语句
+      for body in i:
+        if isinstance(body, (TupleNode, ListNode)):
+          res.extend(body.items)
+        else:
+          res.append(body)
+    return res
+
+
+Optimizer.build_optimizers()
@@ -1,13 +1,54 @@
 from abc import abstractmethod
-from collections.abc import Sequence, Mapping
-from typing import Union
-from ..lexer.position import Position
+from collections import deque
+from collections.abc import Sequence, Mapping, Iterator
+from typing import Any, Union
+from ..lexer.position import Position, Source
 from ..lexer.tokens import Token
 
 
 class ASTNode(object):
-  pos_start: Position
-  pos_end: Position
+  """
+  语法树节点的基类; 子类用 __slots__ 声明属性, 并在 _fields 中列出其全部字段
+  """
+  __slots__ = ('index_start', 'index_end', 'source')
+  _fields = ()
+  index_start: int
+  index_end: int
+  source: Source
+  
+  def span(self, first, last):
+    """
+    节点从 first 的开头延伸到 last 的结尾 (first/last 为 Token 或 ASTNode)
+    """
+    self.index_start = first.index_start
+    self.index_end = last.index_end
+    self.source = first.source
+  
+  @property
+  def pos_start(self) -> Position:
+    return Position(self.source, self.index_start)
+  
+  @property
+  def pos_end(self) -> Position:
+    return Position(self.source, self.index_end)
+  
+  def iter_fields(self) -> Iterator[tuple[str, Any]]:
+    for name in self._fields:
+      yield name, getattr(self, name)
+  
+  def iter_child_nodes(self) -> Iterator['ASTNode']:
+    for name in self._fields:
+      yield from _child_nodes(getattr(self, name))
+  
+  def walk(self) -> Iterator['ASTNode']:
+    """
+    广度优先遍历以该节点为根的整棵树
+    """
+    todo = deque([self])
+    while todo:
+      node = todo.popleft()
+      todo.extend(node.iter_child_nodes())
+      yield node
   
   @abstractmethod
   def to_dict(self):
@@ -15,18 +56,32 @@ class ASTNode(object):
   
   def __repr__(self):
     return str(self.to_dict())
+
+
+def _child_nodes(value):
+  if isinstance(value, ASTNode):
+    yield value
+  elif isinstance(value, Mapping):
+    for k, v in value.items():
+      yield from _child_nodes(k)
+      yield from _child_nodes(v)
+  elif isinstance(value, (list, tuple)):
+    for i in value:
+      yield from _child_nodes(i)
   
   
 class SingleNode(ASTNode):
   """
   单值节点
   """
+  __slots__ = ('value', 'constant')
+  _fields = ('value',)
   type = 'single'
   def __init__(self, value: Token):
     self.value = value
-    
-    self.pos_start = value.pos_start.copy()
-    self.pos_end = value.pos_end.copy()
+    # 字面量在常量池中的值, 在第一次执行 (或编译) 时由解释器取得; 执行时仍传递原生值
+    self.constant = None
+    self.span(value, value)
     
   def to_dict(self):
     return {
@@ -36,10 +91,12 @@ class SingleNode(ASTNode):
   
   
 class NumberNode(SingleNode):
+  __slots__ = ()
   type = 'number'
   
 
 class StringNode(SingleNode):
+  __slots__ = ()
   type = 'string'
     
 
@@ -47,12 +104,12 @@ class UnaryOpNode(ASTNode):
   """
   一元运算符节点
   """
+  __slots__ = ('op', 'right')
+  _fields = __slots__
   def __init__(self, op, right):
     self.op = op 
     self.right = right 
-    
-    self.pos_start = op.pos_start.copy()
-    self.pos_end = right.pos_end.copy()
+    self.span(op, right)
     
   def to_dict(self):
     return {
@@ -66,13 +123,13 @@ class BinaryOpNode(ASTNode):
   """
   二元运算符节点
   """
+  __slots__ = ('left', 'op', 'right')
+  _fields = __slots__
   def __init__(self, left: Token, op: Token, right: Token):
     self.left = left
     self.op = op 
     self.right = right 
-    
-    self.pos_start = left.pos_start.copy()
-    self.pos_end = right.pos_end.copy()
+    self.span(left, right)
     
   def to_dict(self):
     return {
@@ -83,15 +140,62 @@ class BinaryOpNode(ASTNode):
     }
 
 
+class BoolOpNode(ASTNode):
+  """
+  逻辑运算符 (&&, ||) 节点: 左操作数已经决定结果时不求值右操作数
+  """
+  __slots__ = ('left', 'op', 'right')
+  _fields = __slots__
+  def __init__(self, left, op, right):
+    self.left = left
+    self.op = op
+    self.right = right
+    self.span(left, right)
+
+  def to_dict(self):
+    return {
+      'type': 'bool-op',
+      'left': self.left.to_dict(),
+      'op': self.op.to_dict(),
+      'right': self.right.to_dict(),
+    }
+
+
+class TypedUnaryOpNode(UnaryOpNode):
+  """
+  类型检查证明操作数为原生类型 (int 等) 的一元运算: 执行时直接调用 func,
+  不经过 auto 与类型分派; result_type 为运算结果的类型
+  """
+  __slots__ = ('func', 'result_type')
+  def __init__(self, op, right, func, result_type):
+    super().__init__(op, right)
+    self.func = func
+    self.result_type = result_type
+
+
+class TypedBinaryOpNode(BinaryOpNode):
+  """
+  类型检查证明两个操作数都为原生类型的二元运算, 同 TypedUnaryOpNode
+  """
+  __slots__ = ('func', 'result_type')
+  def __init__(self, left, op, right, func, result_type):
+    super().__init__(left, op, right)
+    self.func = func
+    self.result_type = result_type
+
+
 class VarAccessNode(ASTNode):
   """
   变量访问节点
   """
+  __slots__ = ('var', 'depth', 'slot')
+  _fields = ('var',)
   def __init__(self, var: Token):
     self.var = var
-    
-    self.pos_start = var.pos_start.copy()
-    self.pos_end = var.pos_end.copy()
+    # 变量所在的表 (向上的层数) 与在表中的槽位, 由 Resolver 填写
+    self.depth = 0
+    self.slot = None
+    self.span(var, var)
     
   def to_dict(self):
     return {
@@ -104,6 +208,8 @@ class VarAssignNode(ASTNode):
   """
   变量设置节点
   """
+  __slots__ = ('var', 'value', 'slot')
+  _fields = ('var', 'value')
   def __init__(self, 
     var: Union[Token, VarAccessNode], 
     value: ASTNode,
@@ -112,9 +218,8 @@ class VarAssignNode(ASTNode):
       var = var.var
     self.var = var
     self.value = value
-    
-    self.pos_start = var.pos_start.copy()
-    self.pos_end = value.pos_end.copy()
+    self.slot = None
+    self.span(var, value)
     
   def to_dict(self):
     return {
@@ -127,15 +232,15 @@ class VarDeleteNode(ASTNode):
   """
   变量删除节点
   """
+  __slots__ = ('var',)
+  _fields = __slots__
   def __init__(
     self, 
     var: Token, 
-    pos_start, pos_end
+    first, last
   ):
     self.var = var
-    
-    self.pos_start = pos_start
-    self.pos_end = pos_end
+    self.span(first, last)
     
   def to_dict(self):
     return {
@@ -148,14 +253,15 @@ class TupleNode(ASTNode):
   """
   元组节点
   """
+  __slots__ = ('items',)
+  _fields = __slots__
   def __init__(
     self, 
     items: Sequence[ASTNode], 
-    pos_start, pos_end
+    first, last
   ):
     self.items = items
-    self.pos_start = pos_start
-    self.pos_end = pos_end
+    self.span(first, last)
     
   def to_dict(self):
     return {
@@ -168,14 +274,15 @@ class ListNode(ASTNode):
   """
   列表节点
   """
+  __slots__ = ('items',)
+  _fields = __slots__
   def __init__(
     self, 
     items: Sequence[ASTNode], 
-    pos_start, pos_end
+    first, last
   ):
     self.items = items
-    self.pos_start = pos_start
-    self.pos_end = pos_end
+    self.span(first, last)
     
   def to_dict(self):
     return {
@@ -188,17 +295,18 @@ class SliceNode(ASTNode):
   """
   切片节点
   """
+  __slots__ = ('start', 'stop', 'step')
+  _fields = __slots__
   def __init__(self, 
     start: ASTNode,
     stop: ASTNode,
     step: ASTNode,
-    pos_start, pos_end,
+    first, last,
   ):
     self.start = start
     self.stop = stop
     self.step = step
-    self.pos_start = pos_start
-    self.pos_end = pos_end
+    self.span(first, last)
     
   def to_dict(self):
     start = stop = step = None
@@ -220,16 +328,17 @@ class GetItemNode(ASTNode):
   """
   索引值访问节点
   """
+  __slots__ = ('object', 'key')
+  _fields = __slots__
   def __init__(
     self, 
     object: ASTNode, 
     key: ASTNode, 
-    pos_start, pos_end
+    first, last
   ):
     self.object = object
     self.key = key
-    self.pos_start = pos_start
-    self.pos_end = pos_end
+    self.span(first, last)
     
   def to_dict(self):
     return {
@@ -243,18 +352,18 @@ class SetItemNode(ASTNode):
   """
   索引值设置节点
   """
+  __slots__ = ('object', 'key', 'value')
+  _fields = __slots__
   def __init__(self, 
     object: ASTNode, 
     key: ASTNode,
     value: ASTNode,
-    pos_start: Position,
+    first,
   ):
     self.object = object
     self.key = key
     self.value = value
-    
-    self.pos_start = pos_start
-    self.pos_end = value.pos_end.copy()
+    self.span(first, value)
     
   def to_dict(self):
     return {
@@ -268,11 +377,14 @@ class GetAttrNode(ASTNode):
   """
   属性值访问节点
   """
-  def __init__(self, object: ASTNode, attr_name: Token, pos_start, pos_end):
+  __slots__ = ('object', 'attr_name', 'site')
+  _fields = ('object', 'attr_name')
+  def __init__(self, object: ASTNode, attr_name: Token, first, last):
     self.object = object
     self.attr_name = attr_name
-    self.pos_start = pos_start
-    self.pos_end = pos_end
+    # 属性访问的内联缓存 (AttributeSite), 第一次执行时创建
+    self.site = None
+    self.span(first, last)
     
   def to_dict(self):
     return {
@@ -286,12 +398,13 @@ class SetAttrNode(ASTNode):
   """
   属性值设置节点
   """
-  def __init__(self, object: ASTNode, attr_name: Token, value: ASTNode, pos_start):
+  __slots__ = ('object', 'attr_name', 'value')
+  _fields = __slots__
+  def __init__(self, object: ASTNode, attr_name: Token, value: ASTNode, first):
     self.object = object
     self.attr_name = attr_name
     self.value = value
-    self.pos_start = pos_start
-    self.pos_end = value.pos_end.copy()
+    self.span(first, value)
     
   def to_dict(self):
     return {
@@ -303,10 +416,11 @@ class SetAttrNode(ASTNode):
 
 
 class DictNode(ASTNode):
-  def __init__(self, items: Mapping[ASTNode, ASTNode], pos_start, pos_end):
+  __slots__ = ('items',)
+  _fields = __slots__
+  def __init__(self, items: Mapping[ASTNode, ASTNode], first, last):
     self.items = items
-    self.pos_start = pos_start
-    self.pos_end = pos_end
+    self.span(first, last)
     
   def to_dict(self):
     return {
@@ -316,6 +430,8 @@ class DictNode(ASTNode):
 
 
 class IfNode(ASTNode):
+  __slots__ = ('oneline', 'cases', 'else_block')
+  _fields = __slots__
   def __init__(self, 
     oneline: bool,
     cases: Mapping[ASTNode, ASTNode], 
@@ -324,8 +440,7 @@ class IfNode(ASTNode):
     self.oneline = oneline
     self.cases = cases
     self.else_block = else_block
-    self.pos_start = cases[0][0].pos_start
-    self.pos_end = (else_block or cases[-1][-1]).pos_end
+    self.span(cases[0][0], else_block or cases[-1][-1])
     
   def to_dict(self):
     cases = [{
@@ -343,17 +458,18 @@ class IfNode(ASTNode):
     }
 
 class CallNode(ASTNode):
+  __slots__ = ('object', 'args', 'kwargs')
+  _fields = __slots__
   def __init__(self, 
     object: ASTNode,
     args: TupleNode,
     kwargs: DictNode,
-    pos_start, pos_end,
+    first, last,
   ):
     self.object = object
     self.args = args
     self.kwargs = kwargs
-    self.pos_start = pos_start
-    self.pos_end = pos_end
+    self.span(first, last)
     
   def to_dict(self):
     return  {
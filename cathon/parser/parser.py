@@ -1,12 +1,98 @@
 from contextlib import contextmanager
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator
+from functools import wraps
+from itertools import islice
 from .nodes import *
+from ..lexer.tokens import BracketTable
 from ..constants import *
 from .. import errors
 
 
+# 运算符的绑定力, 从低到高; 同一层的二元运算符左结合
+OPERATOR_LEVELS = (
+  ('binary', {DOUBLEVBAR}),
+  ('binary', {DOUBLEAMPER}),
+  ('prefix', {EXCLAMATION}),
+  ('binary', COMP_OP),
+  ('binary', BITWISE_OR_OP),
+  ('binary', BITWISE_XOR_OP),
+  ('binary', BITWISE_AND_OP),
+  ('binary', SHIFT_OP),
+  ('binary', SUM_OP),
+  ('binary', TERM_OP),
+  ('prefix', UNARY_OP),
+  ('binary', POWER_OP),
+)
+BINARY_POWER = {
+  op: power
+  for power, (kind, ops) in enumerate(OPERATOR_LEVELS, 1) if kind == 'binary'
+  for op in ops
+}
+PREFIX_POWER = {
+  op: power
+  for power, (kind, ops) in enumerate(OPERATOR_LEVELS, 1) if kind == 'prefix'
+  for op in ops
+}
+# 每次从 token 流中读取的 token 数
+FILL_SIZE = 64
+# packrat 记忆表的最大条目数
+MEMO_SIZE = 4096
+
+
+def memoize(func):
+  """
+  packrat 记忆化: 以 (规则, token 索引) 为键缓存规则的结果与结束位置,
+  回溯后在同一位置再次尝试该规则时直接复用
+  """
+  name = func.__name__
+  
+  @wraps(func)
+  def wrapper(self, *args):
+    memo = self.memo
+    if args or memo is None:
+      return func(self, *args)
+    key = (name, self.index)
+    if key in memo:
+      self.memo_hits += 1
+      res, index, error = memo[key]
+      self.reverse_to(index)
+      if error is not None:
+        raise error
+      return res
+    
+    self.memo_misses += 1
+    if not self.marks:
+      # 不在 try_register 之内, 不会回溯到这里
+      return func(self)
+    try:
+      res = func(self)
+    except errors.SyntaxError as e:
+      self.remember(key, (None, self.index, e))
+      raise
+    self.remember(key, (res, self.index, None))
+    return res
+  return wrapper
+
+
 class Parser(object):
-  def __init__(self, tokens):
-    self.tokens = tokens
+  def __init__(self, tokens: Iterable[Token], brackets: BracketTable = None, memo_size: int = MEMO_SIZE):
+    if brackets is None:
+      brackets = BracketTable()
+      tokens = self.record_brackets(tokens, brackets)
+    self.stream = iter(tokens)
+    self.brackets = brackets
+    # 前瞻/回溯缓冲区, tokens[0] 是 token 流中的第 offset 个 token
+    self.tokens = []
+    self.offset = 0
+    # 未结束的 try_register 数量, 不为 0 时不能丢弃缓冲区
+    self.marks = 0
+    self.error = None
+    # memo_size 为 0 时不使用记忆表
+    self.memo = OrderedDict() if memo_size else None
+    self.memo_size = memo_size
+    self.memo_hits = 0
+    self.memo_misses = 0
     self.index = -1
     self.token = None
     self.advance()
@@ -31,21 +117,82 @@ class Parser(object):
     return self.token 
     
   def update(self):
-    if 0 <= self.index < len(self.tokens):
-      self.token = self.tokens[self.index]
+    index = self.index - self.offset
+    if 0 <= index < len(self.tokens) or (index >= 0 and self.fill(self.index)):
+      self.token = self.tokens[index]
       
   def lookahead(self, count=1):
     index = self.index + count
-    if index < len(self.tokens):
-      return self.tokens[index]
+    if self.fill(index):
+      return self.tokens[index - self.offset]
+  
+  def fill(self, index) -> bool:
+    """
+    从 token 流中读取, 直到缓冲区包含第 index 个 token; token 流已结束时返回 False
+    """
+    tokens = self.tokens
+    while index - self.offset >= len(tokens):
+      if self.stream is None:
+        return False
+      size = len(tokens)
+      try:
+        tokens.extend(islice(self.stream, FILL_SIZE))
+      except errors.BaseError as e:
+        self.stream = None
+        self.error = e
+        raise
+      if len(tokens) - size < FILL_SIZE:
+        self.stream = None
+    return True
+  
+  def release(self):
+    """
+    丢弃缓冲区中当前 token 之前的部分, 使缓冲区大小与文件大小无关
+    """
+    if self.marks == 0 and self.index > self.offset:
+      del self.tokens[:self.index - self.offset]
+      self.offset = self.index
+      self.brackets.prune(self.token.index_start)
+      if self.memo:
+        self.memo.clear()
+  
+  def remember(self, key, value):
+    memo = self.memo
+    memo[key] = value
+    if len(memo) > self.memo_size:
+      memo.popitem(last=False)
+  
+  def closed(self) -> bool:
+    """
+    当前的左括号是否有对应的右括号, 需要时从 token 流中继续读取
+    """
+    start = self.token.index_start
+    index = self.offset + len(self.tokens)
+    while start not in self.brackets:
+      if not self.fill(index):
+        return False
+      index += 1
+    return True
+  
+  @staticmethod
+  def record_brackets(tokens: Iterable[Token], brackets: BracketTable) -> Iterator[Token]:
+    for token in tokens:
+      brackets.record(token)
+      yield token
     
   @contextmanager
   def try_register(self):
     old_index = self.index
+    self.marks += 1
     try:
       yield old_index
-    except errors.SyntaxError:
+    except errors.SyntaxError as e:
+      # 词法错误不能通过回溯恢复
+      if e is self.error:
+        raise
       self.reverse_to(old_index)
+    finally:
+      self.marks -= 1
     
   def parse(self):
     return self.program()
@@ -67,21 +214,22 @@ class Parser(object):
     return res
     
   def statements(self) -> TupleNode:
-    pos_start = self.token.pos_start.copy()
+    first = self.token
     res = []
     self.blanks()
     if ISEOF(self.token.type):
-      return TupleNode(res, pos_start, self.token.pos_end.copy())
+      return TupleNode(res, first, self.token)
     
     res.extend(self.statement())
     while self.blanks() and not ISEOF(self.token.type):
+      self.release()
       # with self.try_register():
       r = self.statement()
       res.extend(r)
-    return TupleNode(res, pos_start, self.token.pos_end.copy())
+    return TupleNode(res, first, self.token)
     
   def statement(self) -> list[ASTNode]:
-    pos_start = self.token.pos_start.copy()
+    first = self.token
     items = []
     if res := self.compound_stmt():
       items.append(res)
@@ -107,11 +255,11 @@ class Parser(object):
   def simple_stmt(self) -> ASTNode:
     tok = None
     with self.try_register() as old_index:
-      pos_start = self.token.pos_start.copy()
+      first = self.token
       var = self.primary()
       tok = self.token 
     if tok is not None and (tok.type == EQUAL or tok.type in ASSIGNMENT_OP_DICT):
-      return self.assignment(var, pos_start)
+      return self.assignment(var, first)
     else:
       self.reverse_to(old_index)
     
@@ -122,12 +270,12 @@ class Parser(object):
       return node.items[0]
     return node
   
-  def assignment(self, var, pos_start):
+  def assignment(self, var, first):
     def get_node(var, value):
       if isinstance(var, GetAttrNode):
-        return SetAttrNode(var.object, var.attr_name, value, var.object.pos_start)
+        return SetAttrNode(var.object, var.attr_name, value, var.object)
       if isinstance(var, GetItemNode):
-        return SetItemNode(var.object, var.key, value, var.object.pos_start)
+        return SetItemNode(var.object, var.key, value, var.object)
       return VarAssignNode(var, value)
      
     if self.token.type in ASSIGNMENT_OP_DICT:
@@ -162,26 +310,26 @@ class Parser(object):
     return TupleNode([
       get_node(var, value) 
       for var in var_list
-    ], pos_start, self.token.pos_end.copy())
+    ], first, self.token)
   
   def star_expressions(self) -> TupleNode:
-    pos_start = self.token.pos_start.copy()
+    first = self.token
     items = [self.star_expression()]
     while self.token.type == COMMA:
       self.advance()
       if self.token.type in (RPAR, RSQB):
         break
       items.append(self.star_expression())
-    return TupleNode(items, pos_start, self.token.pos_end.copy())
+    return TupleNode(items, first, self.token)
     
   def star_expression(self) -> ASTNode:
     return self.expression()
     
   def expression(self) -> ASTNode:
-    res = self.disjunction()
+    res = self.operation()
     if self.token.matches(NAME, IF_KEYWORDS):
       self.advance()
-      condition = self.disjunction()
+      condition = self.operation()
       if not self.token.matches(NAME, ELSE_KEYWORDS):
         raise errors.SyntaxError(
           self.token.pos_start, self.token.pos_end,
@@ -194,7 +342,7 @@ class Parser(object):
     
     if self.token.type == QUESTION:
       self.advance()
-      value = self.disjunction()
+      value = self.operation()
       if self.token.type != COLON:
         raise errors.SyntaxError(
           self.token.pos_start, self.token.pos_end,
@@ -206,51 +354,30 @@ class Parser(object):
       return IfNode(True, cases, else_block)
     return res
     
-  def disjunction(self):
-    return self.bin_op({DOUBLEVBAR}, self.conjunction)
-    
-  def conjunction(self):
-    return self.bin_op({DOUBLEAMPER}, self.inversion)
-    
-  def inversion(self):
-    if self.token.type == EXCLAMATION:
+  def operation(self, min_power=1):
+    """
+    优先级爬升: 解析由绑定力不低于 min_power 的运算符组成的表达式
+    """
+    tok = self.token
+    power = PREFIX_POWER.get(tok.type)
+    if power is not None and power >= min_power:
       self.advance()
-      return UnaryOpNode(EXCLAMATION, self.inversion())
-    return self.comparison()
-    
-  def comparison(self):
-    return self.bin_op(COMP_OP, self.bitwise_or)
-  
-  def bitwise_or(self):
-    return self.bin_op(BITWISE_OR_OP, self.bitwise_xor)
-    
-  def bitwise_xor(self):
-    return self.bin_op(BITWISE_XOR_OP, self.bitwise_and)
-  
-  def bitwise_and(self):
-    return self.bin_op(BITWISE_AND_OP, self.shift_expr)
-  
-  def shift_expr(self):
-    return self.bin_op(SHIFT_OP, self.sum)
+      left = UnaryOpNode(tok, self.operation(power))
+    else:
+      left = self.primary()
     
-  def sum(self):
-    return self.bin_op(SUM_OP, self.term)
-  
-  def term(self):
-    return self.bin_op(TERM_OP, self.factor)
-  
-  def factor(self):
-    if self.token.type in UNARY_OP:
+    while True:
+      power = BINARY_POWER.get(self.token.type)
+      if power is None or power < min_power:
+        return left
       op = self.token
       self.advance()
-      return UnaryOpNode(op, self.factor())
-    return self.power()
-    
-  def power(self):
-    return self.bin_op(POWER_OP, self.primary)
+      node = BoolOpNode if op.type in BOOL_OP else BinaryOpNode
+      left = node(left, op, self.operation(power + 1))
   
+  @memoize
   def primary(self, atom=None):
-    pos_start = self.token.pos_start.copy()
+    first = self.token
     if atom is None:
       atom = self.atom()
     
@@ -262,10 +389,10 @@ class Parser(object):
         )
       tok = self.token
       self.advance()
-      return self.primary(GetAttrNode(atom, tok, atom.pos_start.copy(), tok.pos_end.copy()))
+      return self.primary(GetAttrNode(atom, tok, atom, tok))
     
     if self.token.type == LPAR:
-      if not any(i.type == RPAR for i in self.tokens[self.index:]):
+      if not self.closed():
         raise errors.SyntaxError(
           self.token.pos_start, self.token.pos_end, 
           "'(' was never closed"
@@ -278,10 +405,10 @@ class Parser(object):
           'expected ")"'
         )
       self.advance()
-      return self.primary(CallNode(atom, args, kwargs, atom.pos_start.copy(), self.token.pos_end.copy()))
+      return self.primary(CallNode(atom, args, kwargs, atom, self.token))
     
     if self.token.type == LSQB:
-      if not any(i.type == RSQB for i in self.tokens[self.index:]):
+      if not self.closed():
         raise errors.SyntaxError(
           self.token.pos_start, self.token.pos_end, 
           "'[' was never closed"
@@ -289,20 +416,20 @@ class Parser(object):
       self.advance()
       key = self.slices()
       self.advance()
-      return self.primary(GetItemNode(atom, key, pos_start, self.token.pos_end.copy()))
+      return self.primary(GetItemNode(atom, key, first, self.token))
     return atom
   
   def arguments(self) -> tuple[TupleNode, DictNode]:
     if self.token.type == RPAR:
-      return TupleNode([], self.token.pos_start.copy(), self.token.pos_end.copy()), DictNode({}, self.token.pos_start.copy(), self.token.pos_end.copy())
+      return TupleNode([], self.token, self.token), DictNode({}, self.token, self.token)
     
-    pos_start = dict_pos_start = self.token.pos_start.copy()
-    pos_end = None
+    first = dict_first = self.token
+    last = None
     args = []
     kwargs = {}
     while self.token.type != RPAR:
       if self.token.type == NAME and self.lookahead().type == EQUAL:
-        pos_end = dict_pos_start = self.token.pos_start.copy()
+        last = dict_first = self.token
         kw = StringNode(self.token)
         self.advance()
         self.advance()
@@ -318,13 +445,13 @@ class Parser(object):
             'positional argument follows keyword argument'
           )
         args.append(self.expression())
-    return TupleNode(args, pos_start, pos_end), DictNode(kwargs, dict_pos_start, self.token.pos_end.copy())
+    return TupleNode(args, first, last or self.token), DictNode(kwargs, dict_first, self.token)
   
   def slices(self):
     return self.slice()
     
   def slice(self) -> SliceNode:
-    pos_start = self.token.pos_start.copy()
+    first = self.token
     v1 = None
     if self.token.type != COLON:
       v1 = self.expression()
@@ -335,21 +462,13 @@ class Parser(object):
     if self.token.type not in {COLON, COMMA, RSQB}:
       v2 = self.expression()
     if self.token.type != COLON:
-      return SliceNode(v1, v2, None, pos_start, self.token.pos_end.copy())
+      return SliceNode(v1, v2, None, first, self.token)
     self.advance()
     v3 = None
     if self.token.type not in {COLON, COMMA, RSQB}:
       v3 = self.expression()
-    return SliceNode(v1, v2, v3, pos_start, self.token.pos_end.copy())
+    return SliceNode(v1, v2, v3, first, self.token)
   
-  def bin_op(self, operators, func):
-    left = func()
-    while self.token.type in operators:
-      op = self.token
-      self.advance()
-      left = BinaryOpNode(left, op, func())
-    return left
-    
   def atom(self) -> ASTNode:
     tok = self.token
     if tok.type in (NUMBER, STRING):
@@ -380,8 +499,8 @@ class Parser(object):
     )
     
   def tuple_expr(self) -> TupleNode:
-    pos_start = self.token.pos_start.copy()
-    if not any(i.type == RPAR for i in self.tokens[self.index:]):
+    first = self.token
+    if not self.closed():
       raise errors.SyntaxError(
         self.token.pos_start, self.token.pos_end, 
         "'(' was never closed"
@@ -390,7 +509,7 @@ class Parser(object):
     self.advance()
     if self.token.type == RPAR:
       self.advance()
-      return TupleNode([], pos_start, self.token.pos_end.copy())
+      return TupleNode([], first, self.token)
     
     node = self.star_expression()
     if self.token.type == RPAR:
@@ -404,33 +523,33 @@ class Parser(object):
     self.advance()
     if self.token.type == RPAR:
       self.advance()
-      return TupleNode([node], pos_start, self.token.pos_end.copy())
+      return TupleNode([node], first, self.token)
     
     items = self.star_expressions().items
     if self.token.type != RPAR:
       raise errors.SyntaxError(
-        pos_start, self.token.pos_end, 
+        first.pos_start, self.token.pos_end, 
         "'(' was never closed"
       )
     self.advance()
-    return TupleNode([node] + items, pos_start, self.token.pos_end.copy())
+    return TupleNode([node] + items, first, self.token)
     
   def list_expr(self) -> ListNode:
     if self.token.type != LSQB:
       raise errors.SyntaxError(
         self.token.pos_start, self.token.pos_end, 
       )
-    if not any(i.type == RSQB for i in self.tokens[self.index:]):
+    if not self.closed():
       raise errors.SyntaxError(
         self.token.pos_start, self.token.pos_end, 
         "'[' was never closed"
       )
      
-    pos_start = self.token.pos_start.copy()
+    first = self.token
     self.advance()
     if self.token.type == RSQB:
       self.advance()
-      return ListNode([], pos_start, self.token.pos_end)
+      return ListNode([], first, self.token)
     
     items = self.star_expressions().items
     if self.token.type != RSQB:
@@ -439,7 +558,7 @@ class Parser(object):
         'expected "]"'
       )
     self.advance()
-    return ListNode(items, pos_start, self.token.pos_end.copy())
+    return ListNode(items, first, self.token)
   
   def dict_expr(self) -> DictNode:
     if self.token.type != LBRACE:
@@ -447,17 +566,17 @@ class Parser(object):
         self.token.pos_start, self.token.pos_end, 
         'invalid syntax'
       )
-    if not any(i.type == RBRACE for i in self.tokens[self.index:]):
+    if not self.closed():
       raise errors.SyntaxError(
         self.token.pos_start, self.token.pos_end, 
         "'{' was never closed"
       )
       
-    pos_start = self.token.pos_start.copy()
+    first = self.token
     self.advance()
     if self.token.type == RBRACE:
       self.advance()
-      return DictNode({}, pos_start, self.token.pos_end)
+      return DictNode({}, first, self.token)
       
     items = self.double_starred_kvpairs()
     if self.token.type != RBRACE:
@@ -466,7 +585,7 @@ class Parser(object):
         'expected "}"'
       )
     self.advance()
-    return DictNode(items, pos_start, self.token.pos_end.copy())
+    return DictNode(items, first, self.token)
     
   def double_starred_kvpairs(self) -> dict[ASTNode, ASTNode]:
     k, v = self.double_starred_kvpair()
@@ -499,7 +618,7 @@ class Parser(object):
         self.token.pos_start, self.token.pos_end
       )
     
-    pos_start = self.token.pos_start.copy()
+    first = self.token
     self.advance()
     var = self.token
     if var.type != NAME:
@@ -513,7 +632,7 @@ class Parser(object):
       )
     self.advance()
     if self.token.type != COMMA:
-      return VarDeleteNode(var, pos_start, var.pos_end.copy())
+      return VarDeleteNode(var, first, var)
       
     var_list = [var]
     while self.token.type == COMMA:
@@ -530,7 +649,7 @@ class Parser(object):
         )
       var_list.append(var)
       self.advance()
-    return VarDeleteNode(var_list, pos_start, self.token.pos_end.copy())
+    return VarDeleteNode(var_list, first, self.token)
     
   def if_stmt(self):
     if not self.token.matches(NAME, IF_KEYWORDS):
@@ -538,7 +657,7 @@ class Parser(object):
         self.token.pos_start, self.token.pos_end,
         'expected "if"'
       )
-    pos_start = self.token.pos_start.copy()
+    first = self.token
     self.advance()
     
     cases = []
@@ -551,7 +670,7 @@ class Parser(object):
       )
     self.advance()
     
-    block = self.block('if', pos_start)
+    block = self.block('if', first)
     cases.append((condition, block))
     if self.token.type == NEWLINE and self.lookahead().matches(NAME, ELIF_KEYWORDS):
       self.advance()
@@ -566,13 +685,13 @@ class Parser(object):
       else_block = self.else_block()
     return IfNode(False, cases, else_block)
   
-  def elif_stmt(self, cases, else_block, pos_start):
+  def elif_stmt(self, cases, else_block, first):
     if not self.token.matches(NAME, ELIF_KEYWORDS):
       raise errors.SyntaxError(
         self.token.pos_start, self.token.pos_end,
         'expected "elif"'
       )
-    pos_start = self.token.pos_start.copy()
+    first = self.token
     self.advance()
     condition = self.expression()
     
@@ -583,7 +702,7 @@ class Parser(object):
       )
     self.advance()
     
-    cases.append((condition, self.block('elif', pos_start)))
+    cases.append((condition, self.block('elif', first)))
     if self.token.matches(NAME, ELIF_KEYWORDS):
       cases, else_block = self.elif_stmt(cases, elif_stmt)
       
@@ -601,7 +720,7 @@ class Parser(object):
         self.token.pos_start, self.token.pos_end,
         f'expected "else"'
       )
-    pos_start = self.token.pos_start.copy()
+    first = self.token
     self.advance()
     
     if self.token.type != COLON:
@@ -610,15 +729,15 @@ class Parser(object):
         'expected ":"'
       )
     self.advance()
-    return self.block('else', pos_start)
+    return self.block('else', first)
   
-  def block(self, name, pos_start):
-    pos_start = self.token.pos_start.copy()
+  def block(self, name, first):
+    first = self.token
     if self.token.type == NEWLINE:
       self.advance()
       if self.token.type != INDENT:
         raise errors.IndentationError(
-          pos_start, self.token.pos_end, 
+          first.pos_start, self.token.pos_end, 
           f'expected an indented block after {name} definition',
           self.token.pos_start, self.token.pos_end
         )
@@ -628,18 +747,18 @@ class Parser(object):
       res = self.statements()
       if not res:
         raise errors.IndentationError(
-          pos_start, self.token.pos_end, 
+          first.pos_start, self.token.pos_end, 
           f'expected an indented block after {name} definition',
           self.token.pos_start, self.token.pos_end
         )
       
       if self.token.type != DEDENT or self.token.value != indent:
         raise errors.IndentationError(
-          pos_start, self.token.pos_end, 
+          first.pos_start, self.token.pos_end, 
           f'unexpected indent',
           self.token.pos_start, self.token.pos_end
         )
       self.advance()
       return res
     
-    return ListNode(self.simple_stmts(), pos_start, self.token.pos_end.copy())
+    return ListNode(self.simple_stmts(), first, self.token)
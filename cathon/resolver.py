@@ -0,0 +1,47 @@
+from .parser.nodes import *
+from .interpreter import SymbolTable
+
+
+class Resolver(object):
+  """
+  在执行前把变量名解析为 symbol_table 中的 (层数, 槽位), 记录在 VarAccessNode/VarAssignNode 上:
+  程序中赋值过的变量都在 symbol_table 中, 只读取的变量可以直接解析到上级表 (如内置变量表);
+  同时找出一定未定义的变量: 程序中没有为其赋值, 执行前 (包括内置变量) 也不存在
+  """
+
+  def __init__(self, symbol_table: SymbolTable = None):
+    self.symbol_table = symbol_table
+    # 一定未定义的变量的访问节点
+    self.undefined: list[VarAccessNode] = []
+
+  def resolve(self, node: ASTNode) -> ASTNode:
+    assigns = []
+    accesses = []
+    for i in node.walk():
+      if isinstance(i, VarAccessNode):
+        accesses.append(i)
+      elif isinstance(i, VarAssignNode):
+        assigns.append(i)
+    assigned = {i.var.value for i in assigns}
+
+    table = self.symbol_table
+    if table is not None:
+      for i in assigns:
+        i.slot = table.slot(i.var.value)
+      for i in accesses:
+        i.depth, i.slot = table.resolve(i.var.value, i.var.value in assigned)
+
+    for i in accesses:
+      name = i.var.value
+      if name in assigned:
+        continue
+      if table is not None and table.get(name) is not table.undefined:
+        continue
+      self.undefined.append(i)
+    return node
+
+  def report(self) -> list[str]:
+    return [
+      f'{i.pos_start.file}:{i.pos_start.line + 1}: name {i.var.value!r} is never defined'
+      for i in self.undefined
+    ]
@@ -0,0 +1,230 @@
+from .parser.nodes import *
+from .interpreter.table import SymbolTable
+from .interpreter.interpreter import (
+  NATIVE_TYPES, NATIVE_UNARY_OPS, NATIVE_BINARY_OPS, unary_dispatch, binary_dispatch,
+)
+
+
+# 类型格中的最低点 (还没有推断出任何值) 与最高点 (类型不确定)
+NOTHING = 'nothing'
+UNKNOWN = 'unknown'
+
+# 推断运算结果类型时使用的样本值
+SAMPLES = {
+  bool: (False, True),
+  int: (-2, 0, 3),
+  float: (-1.5, 0.0, 2.5),
+  str: ('', 'ab'),
+  type(None): (None,),
+}
+
+
+def result_type(func, *types):
+  """
+  原生类型的运算结果的类型; 对所有样本值 (忽略报错的组合) 结果类型都相同时返回该类型,
+  否则 (如 int ** int 可能得到 float) 返回 UNKNOWN
+  """
+  res = set()
+  todo = [()]
+  for i in types:
+    todo = [args + (value,) for args in todo for value in SAMPLES[i]]
+  for args in todo:
+    try:
+      res.add(type(func(*args)))
+    except Exception:
+      pass
+  if len(res) == 1:
+    return res.pop()
+  return UNKNOWN
+
+
+def build_result_types():
+  """
+  {(运算符, 操作数类型...): 结果类型}, 只包括操作数都为原生类型、由 NATIVE_*_OPS 直接计算的组合
+  """
+  res = {}
+  for (op, type_), func in unary_dispatch.items():
+    if type_ in NATIVE_TYPES and func is NATIVE_UNARY_OPS[op]:
+      res[op, type_] = result_type(func, type_)
+  for (op, left, right), func in binary_dispatch.items():
+    if left in NATIVE_TYPES and right in NATIVE_TYPES and func is NATIVE_BINARY_OPS[op]:
+      res[op, left, right] = result_type(func, left, right)
+  return res
+
+
+result_types = build_result_types()
+
+
+def join(a, b):
+  if a is NOTHING:
+    return b
+  if b is NOTHING or a == b:
+    return a
+  return UNKNOWN
+
+
+def type_name(type_) -> str:
+  if type_ is type(None):
+    return 'null'
+  return getattr(type_, '__name__', str(type_))
+
+
+class TypeChecker(object):
+  """
+  静态类型推断: 推断字面量、变量与运算结果的原生类型 (int/float/bool/str/null);
+  变量的类型为程序中所有赋给它的值 (以及执行前已有的值) 的类型, 不区分赋值的先后;
+  操作数类型都确定且结果类型只由操作数类型决定的运算替换为 TypedUnaryOpNode/TypedBinaryOpNode,
+  执行时不经过 auto 与类型分派; 推断不出类型的节点保持原样
+  """
+
+  def __init__(self, symbol_table: SymbolTable = None):
+    self.symbol_table = symbol_table
+    # {变量名: 类型}, 类型不确定时为 UNKNOWN
+    self.variables: dict[str, object] = {}
+    # [(节点, 说明)], 按在源代码中的位置排序后输出
+    self.explanations: list = []
+    # {运算节点: 类型}, 变量的类型确定后缓存, 避免长的表达式被反复推断
+    self.types: dict = {}
+    self.specialized = 0
+    self.generic = 0
+
+  def check(self, node: ASTNode) -> ASTNode:
+    self.infer_variables(node)
+    return self.transform(node)
+
+  def infer_variables(self, node: ASTNode):
+    # {变量名: [赋值节点...]}
+    assigns = {}
+    deleted = set()
+    for i in node.walk():
+      if isinstance(i, VarAssignNode):
+        assigns.setdefault(i.var.value, []).append(i)
+      elif isinstance(i, VarDeleteNode):
+        for var in (i.var if isinstance(i.var, list) else [i.var]):
+          deleted.add(var.value)
+
+    variables = self.variables
+    for name in assigns:
+      variables[name] = self.existing(name)
+    # 变量的类型相互依赖, 反复推断直到不再变化
+    changed = True
+    while changed:
+      changed = False
+      for name, nodes in assigns.items():
+        type_ = variables[name]
+        for i in nodes:
+          type_ = join(type_, self.infer(i.value))
+        if type_ != variables[name]:
+          variables[name] = type_
+          changed = True
+    for name in deleted:
+      variables[name] = UNKNOWN
+
+    for name, nodes in assigns.items():
+      type_ = variables[name]
+      if type_ is not NOTHING and type_ is not UNKNOWN:
+        self.explanations.append((nodes[0], f'{name} is always {type_name(type_)}'))
+
+  def existing(self, name: str):
+    """
+    执行前变量已有的值的类型, 没有值时为 NOTHING
+    """
+    if self.symbol_table is None:
+      return NOTHING
+    value = self.symbol_table.get(name)
+    if value is SymbolTable.undefined:
+      return NOTHING
+    return type(value) if type(value) in NATIVE_TYPES else UNKNOWN
+
+  def infer(self, node):
+    """
+    node 的值的类型: 原生类型、NOTHING (一定没有值) 或 UNKNOWN
+    """
+    if node in self.types:
+      return self.types[node]
+    if isinstance(node, (NumberNode, StringNode)):
+      return type(node.value.value)
+    if isinstance(node, VarAccessNode):
+      name = node.var.value
+      if name in self.variables:
+        return self.variables[name]
+      # 程序中没有赋值的变量: 执行前没有值时读取会报错或得到内置变量
+      type_ = self.existing(name)
+      return UNKNOWN if type_ is NOTHING else type_
+    if isinstance(node, VarAssignNode):
+      return self.infer(node.value)
+    if isinstance(node, UnaryOpNode):
+      return self.operation((node.op.type,), (node.right,))
+    if isinstance(node, BinaryOpNode):
+      return self.operation((node.op.type,), (node.left, node.right))
+    if isinstance(node, BoolOpNode):
+      # 结果为左操作数或右操作数的值
+      return join(self.infer(node.left), self.infer(node.right))
+    return UNKNOWN
+
+  def operation(self, key, operands):
+    types = [self.infer(i) for i in operands]
+    if NOTHING in types:
+      return NOTHING
+    if UNKNOWN in types:
+      return UNKNOWN
+    return result_types.get(key + tuple(types), UNKNOWN)
+
+  def transform(self, value):
+    if isinstance(value, ASTNode):
+      return self.visit(value)
+    if isinstance(value, dict):
+      return {self.transform(k): self.transform(v) for k, v in value.items()}
+    if isinstance(value, list):
+      return [self.transform(i) for i in value]
+    if isinstance(value, tuple):
+      return tuple(self.transform(i) for i in value)
+    return value
+
+  def visit(self, node: ASTNode) -> ASTNode:
+    for name, value in node.iter_fields():
+      setattr(node, name, self.transform(value))
+    if type(node) is UnaryOpNode:
+      operands = (node.right,)
+    elif type(node) is BinaryOpNode:
+      operands = (node.left, node.right)
+    else:
+      return node
+
+    op = node.op.type
+    types = [self.infer(i) for i in operands]
+    res = self.operation((op,), operands)
+    self.types[node] = res
+    text = node.source.code[node.index_start:node.index_end]
+    if res is NOTHING or res is UNKNOWN:
+      self.generic += 1
+      if UNKNOWN in types or NOTHING in types:
+        reason = 'operand types unknown'
+      elif (op, *types) in result_types:
+        reason = 'result type depends on the values of ' + ', '.join(map(type_name, types))
+      else:
+        reason = 'no native implementation for ' + ', '.join(map(type_name, types))
+      self.explanations.append((node, f'{text!r} left generic: {reason}'))
+      return node
+
+    self.specialized += 1
+    symbol = node.source.code[node.op.index_start:node.op.index_end]
+    if len(types) == 1:
+      signature = symbol + type_name(types[0])
+    else:
+      signature = f' {symbol} '.join(map(type_name, types))
+    self.explanations.append((node, f'{text!r} specialized as {signature} -> {type_name(res)}'))
+    if len(operands) == 1:
+      typed = TypedUnaryOpNode(node.op, node.right, NATIVE_UNARY_OPS[op], res)
+    else:
+      typed = TypedBinaryOpNode(node.left, node.op, node.right, NATIVE_BINARY_OPS[op], res)
+    self.types[typed] = res
+    return typed
+
+  def report(self) -> list[str]:
+    res = [
+      f'{i.pos_start.file}:{i.pos_start.line + 1}: {text}'
+      for i, text in sorted(self.explanations, key=lambda i: i[0].index_start)
+    ]
+    res.append(f'typecheck: {self.specialized} operations specialized, {self.generic} left generic')
+    return res
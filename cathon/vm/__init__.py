@@ -0,0 +1,6 @@
+from .code import CodeObject, Span
+from .compiler import Compiler
+from .machine import VirtualMachine
+from . import opcodes
+
+__all__ = ['CodeObject', 'Span', 'Compiler', 'VirtualMachine', 'opcodes']
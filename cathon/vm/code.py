@@ -0,0 +1,138 @@
+import marshal
+from ..lexer.position import Position, Source
+from ..token import tok_name
+from ..interpreter.table import SymbolTable
+from ..interpreter.interpreter import constant
+from ..interpreter.values import AttributeSite
+from .opcodes import *
+
+
+# 序列化格式的版本, 指令集变化时需要修改
+MAGIC = 4
+
+
+class Span(object):
+  """
+  源代码中的一段区间, 与 ASTNode 一样提供 pos_start/pos_end,
+  作为运行时产生的值的位置
+  """
+  __slots__ = ('index_start', 'index_end', 'source')
+
+  def __init__(self, source: Source, index_start: int, index_end: int):
+    self.source = source
+    self.index_start = index_start
+    self.index_end = index_end
+
+  @property
+  def pos_start(self) -> Position:
+    return Position(self.source, self.index_start)
+
+  @property
+  def pos_end(self) -> Position:
+    return Position(self.source, self.index_end)
+
+
+class CodeObject(object):
+  """
+  编译后的代码:
+    code 为扁平的 (操作码, 参数, 操作码, 参数...) 元组;
+    consts 为常量池 (字面量的 Python 值), names 为名称表;
+    positions 为行号表, 依次记录每条指令对应的源代码区间的起止索引
+  """
+  __slots__ = ('code', 'consts', 'names', 'positions', 'source', '_spans', '_slots', '_sites', '_values')
+
+  def __init__(self, code: tuple, consts: tuple, names: tuple, positions: tuple, source: Source):
+    self.code = code
+    self.consts = consts
+    self.names = names
+    self.positions = positions
+    self.source = source
+    self._spans = None
+    self._slots = None
+    self._sites = None
+    self._values = None
+
+  @property
+  def values(self) -> list:
+    """
+    常量池中各字面量对应的值 (Object), 第一次执行时从常量池中取得, 之后每次执行共用
+    """
+    if self._values is None:
+      self._values = [constant(i) for i in self.consts]
+    return self._values
+
+  def resolve(self, table: SymbolTable) -> tuple[list, list]:
+    """
+    名称表中各变量名在 table 中的 ([层数...], [槽位...]), 规则与 Resolver 相同;
+    槽位只对 table 有效, 因此不序列化, 第一次在 table 中执行时才解析
+    """
+    if self._slots is None or self._slots[0] is not table:
+      code = self.code
+      loaded = {code[pc + 1] for pc in range(0, len(code), 2) if code[pc] == LOAD_NAME}
+      assigned = {code[pc + 1] for pc in range(0, len(code), 2) if code[pc] == STORE_NAME}
+      depths = [0] * len(self.names)
+      slots = [None] * len(self.names)
+      for i in loaded | assigned:
+        depths[i], slots[i] = table.resolve(self.names[i], i in assigned)
+      self._slots = table, depths, slots
+    return self._slots[1:]
+
+  @property
+  def sites(self) -> list:
+    """
+    每条 LOAD_ATTR/LOAD_METHOD 指令的内联缓存 (AttributeSite), 其他指令处为 None; 第一次执行时才创建
+    """
+    if self._sites is None:
+      code = self.code
+      self._sites = [
+        AttributeSite(self.names[code[pc + 1]]) if code[pc] in (LOAD_ATTR, LOAD_METHOD) else None
+        for pc in range(0, len(code), 2)
+      ]
+    return self._sites
+
+  @property
+  def spans(self) -> list[Span]:
+    """
+    每条指令对应的 Span, 第一次执行时才创建
+    """
+    if self._spans is None:
+      source = self.source
+      positions = self.positions
+      self._spans = [
+        Span(source, positions[i], positions[i + 1])
+        for i in range(0, len(positions), 2)
+      ]
+    return self._spans
+
+  def dumps(self) -> bytes:
+    return marshal.dumps((
+      MAGIC, self.source.file, self.source.code,
+      self.code, self.consts, self.names, self.positions,
+    ))
+
+  @classmethod
+  def loads(cls, data: bytes) -> 'CodeObject':
+    magic, file, text, code, consts, names, positions = marshal.loads(data)
+    if magic != MAGIC:
+      raise ValueError(f'bad magic number in code object: {magic}')
+    return cls(code, consts, names, positions, Source(file, text))
+
+  def dis(self) -> str:
+    """
+    反汇编, 用于调试
+    """
+    res = []
+    code = self.code
+    for pc in range(0, len(code), 2):
+      op, arg = code[pc], code[pc + 1]
+      if op == LOAD_CONST:
+        detail = repr(self.consts[arg])
+      elif op in (LOAD_NAME, STORE_NAME, DELETE_NAME, LOAD_ATTR, STORE_ATTR, LOAD_METHOD):
+        detail = self.names[arg]
+      elif op in (UNARY_OP, BINARY_OP, NATIVE_UNARY_OP, NATIVE_BINARY_OP):
+        detail = tok_name[arg]
+      else:
+        detail = ''
+      line = self.source.line_column(self.positions[pc])[0] + 1
+      res.append(f'{line:>4} {pc:>6} {opname[op]:<20}{arg:>4} {detail}'.rstrip())
+    return '\n'.join(res)
@@ -0,0 +1,225 @@
+from collections.abc import Callable
+from ..constants import DOUBLEVBAR
+from ..parser.nodes import *
+from ..interpreter.interpreter import constant_key
+from .code import CodeObject
+from .opcodes import *
+
+
+class Compiler(object):
+  """
+  把语法树编译为 CodeObject; 各节点生成的指令与 Interpreter 中的求值顺序一致
+  """
+  # {节点类型: compile_* 方法}, 与 Interpreter.visitors 相同
+  compilers: dict[type, Callable] = {}
+
+  def __init__(self):
+    self.code = []
+    self.positions = []
+    self.consts = []
+    self.const_index = {}
+    self.names = []
+    self.name_index = {}
+
+  def __init_subclass__(cls, **kwargs):
+    super().__init_subclass__(**kwargs)
+    cls.build_compilers()
+
+  @classmethod
+  def build_compilers(cls):
+    cls.compilers = {}
+    todo = [ASTNode]
+    while todo:
+      node_class = todo.pop()
+      todo.extend(node_class.__subclasses__())
+      method = getattr(cls, f'compile_{node_class.__name__}', None)
+      if method is not None:
+        cls.compilers[node_class] = method
+
+  @classmethod
+  def compile(cls, node: ASTNode) -> CodeObject:
+    self = cls()
+    self.visit(node)
+    return CodeObject(
+      tuple(self.code), tuple(self.consts), tuple(self.names),
+      tuple(self.positions), node.source,
+    )
+
+  def visit(self, node):
+    try:
+      compiler = self.compilers[type(node)]
+    except KeyError:
+      method_name = f'compile_{type(node).__name__}'
+      if not hasattr(self, method_name):
+        raise AttributeError(f'No compile method "{method_name}"')
+      compiler = self.compilers[type(node)] = getattr(type(self), method_name)
+    compiler(self, node)
+
+  def emit(self, op: int, arg: int, node) -> int:
+    """
+    添加一条指令, node (节点或 Token) 为其在源代码中的位置; 返回指令的索引
+    """
+    pc = len(self.code)
+    self.code += (op, arg)
+    self.positions += (node.index_start, node.index_end)
+    return pc
+
+  def patch(self, pc: int, target: int = None):
+    """
+    把 pc 处跳转指令的目标设为 target (默认为下一条指令)
+    """
+    self.code[pc + 1] = len(self.code) if target is None else target
+
+  def const(self, value) -> int:
+    key = constant_key(value)
+    index = self.const_index.get(key)
+    if index is None:
+      index = self.const_index[key] = len(self.consts)
+      self.consts.append(value)
+    return index
+
+  def name(self, name: str) -> int:
+    index = self.name_index.get(name)
+    if index is None:
+      index = self.name_index[name] = len(self.names)
+      self.names.append(name)
+    return index
+
+  def compile_NumberNode(self, node):
+    self.emit(LOAD_CONST, self.const(node.value.value), node.value)
+
+  def compile_StringNode(self, node):
+    self.emit(LOAD_CONST, self.const(node.value.value), node.value)
+
+  def compile_UnaryOpNode(self, node):
+    self.visit(node.right)
+    self.emit(UNARY_OP, node.op.type, node)
+
+  def compile_BinaryOpNode(self, node):
+    self.visit(node.left)
+    self.visit(node.right)
+    self.emit(BINARY_OP, node.op.type, node)
+
+  def compile_BoolOpNode(self, node):
+    self.visit(node.left)
+    op = JUMP_IF_TRUE_OR_POP if node.op.type == DOUBLEVBAR else JUMP_IF_FALSE_OR_POP
+    jump = self.emit(op, 0, node)
+    self.visit(node.right)
+    self.patch(jump)
+
+  def compile_TypedUnaryOpNode(self, node):
+    self.visit(node.right)
+    self.emit(NATIVE_UNARY_OP, node.op.type, node)
+
+  def compile_TypedBinaryOpNode(self, node):
+    self.visit(node.left)
+    self.visit(node.right)
+    self.emit(NATIVE_BINARY_OP, node.op.type, node)
+
+  def compile_VarAccessNode(self, node):
+    self.emit(LOAD_NAME, self.name(node.var.value), node)
+
+  def compile_VarAssignNode(self, node):
+    self.visit(node.value)
+    self.emit(STORE_NAME, self.name(node.var.value), node)
+
+  def compile_VarDeleteNode(self, node):
+    vars = node.var if isinstance(node.var, list) else [node.var]
+    for i in vars:
+      self.emit(DELETE_NAME, self.name(i.value), i)
+    self.emit(LOAD_NONE, 0, node)
+
+  def compile_TupleNode(self, node):
+    for i in node.items:
+      self.visit(i)
+    self.emit(BUILD_TUPLE, len(node.items), node)
+
+  def compile_ListNode(self, node):
+    for i in node.items:
+      self.visit(i)
+    self.emit(BUILD_LIST, len(node.items), node)
+
+  def compile_DictNode(self, node):
+    self.emit(BUILD_MAP, 0, node)
+    for k, v in node.items.items():
+      self.visit(k)
+      self.visit(v)
+      self.emit(MAP_ADD, 0, node)
+    self.emit(BUILD_DICT, 0, node)
+
+  def compile_SliceNode(self, node):
+    flags = 0
+    for bit, i in ((1, node.start), (2, node.stop), (4, node.step)):
+      if i is not None:
+        self.visit(i)
+        flags |= bit
+    self.emit(BUILD_SLICE, flags, node)
+
+  def compile_GetAttrNode(self, node):
+    self.visit(node.object)
+    self.emit(LOAD_ATTR, self.name(node.attr_name.value), node)
+
+  def compile_SetAttrNode(self, node):
+    self.visit(node.object)
+    self.visit(node.value)
+    self.emit(STORE_ATTR, self.name(node.attr_name.value), node)
+
+  def compile_GetItemNode(self, node):
+    self.visit(node.object)
+    self.emit(CHECK_GETITEM, 0, node)
+    self.visit(node.key)
+    self.emit(GET_ITEM, 0, node)
+
+  def compile_SetItemNode(self, node):
+    self.visit(node.object)
+    self.emit(CHECK_SETITEM, 0, node)
+    self.visit(node.key)
+    self.visit(node.value)
+    self.emit(SET_ITEM, 0, node)
+
+  def compile_IfNode(self, node):
+    oneline = node.oneline
+    ends = []
+    for condition, body in node.cases:
+      self.visit(condition)
+      jump = self.emit(POP_JUMP_IF_FALSE, 0, condition)
+      self.visit(body)
+      if oneline:
+        self.emit(WRAP, 0, body)
+        ends.append(self.emit(JUMP, 0, node))
+      else:
+        self.emit(POP_TOP, 0, node)
+      self.patch(jump)
+
+    else_block = node.else_block
+    if else_block:
+      self.visit(else_block)
+      if oneline:
+        self.emit(WRAP, 0, else_block)
+        ends.append(self.emit(JUMP, 0, node))
+      else:
+        self.emit(POP_TOP, 0, node)
+    self.emit(LOAD_NONE, 0, node)
+    for pc in ends:
+      self.patch(pc)
+
+  def compile_CallNode(self, node):
+    callee = node.object
+    if isinstance(callee, GetAttrNode):
+      # 调用方法: 属性所属的对象只求值一次
+      self.visit(callee.object)
+      self.emit(LOAD_METHOD, self.name(callee.attr_name.value), callee)
+      self.emit(CHECK_METHOD, 0, node)
+    else:
+      self.visit(callee)
+      self.emit(CHECK_CALL, 0, node)
+      self.emit(LOAD_NONE, 0, node)
+    for i in node.args.items:
+      self.visit(i)
+    kwargs = bool(node.kwargs.items)
+    if kwargs:
+      self.visit(node.kwargs)
+    self.emit(CALL, len(node.args.items) << 1 | kwargs, node)
+
+
+Compiler.build_compilers()
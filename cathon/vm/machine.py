@@ -0,0 +1,136 @@
+from ..interpreter.interpreter import Interpreter, auto, NATIVE_UNARY_OPS, NATIVE_BINARY_OPS
+from ..interpreter.context import Context
+from ..interpreter.values import *
+from .code import CodeObject
+from .opcodes import *
+
+
+class VirtualMachine(object):
+  """
+  栈式虚拟机: 在一个循环中逐条执行 CodeObject 的指令, 执行过程中没有递归;
+  各指令的语义 (包括报错) 与 Interpreter 共用同一套辅助方法,
+  报错的位置来自 CodeObject 的行号表
+  """
+  interpreter = Interpreter
+
+  @classmethod
+  def run(cls, code: CodeObject, context: Context):
+    interpreter = cls.interpreter
+    instructions = code.code
+    consts = code.consts
+    # 字面量的值 (Object) 放入常量池并由 code 持有, 包装这些字面量时共用同一个值
+    code.values
+    names = code.names
+    depths, slots = code.resolve(context.symbol_table)
+    spans = code.spans
+    sites = code.sites
+    truth = interpreter.truth
+    boolean = interpreter.boolean
+    stack = []
+    push = stack.append
+    pop = stack.pop
+    end = len(instructions)
+    pc = 0
+    while pc < end:
+      op = instructions[pc]
+      arg = instructions[pc + 1]
+      span = spans[pc >> 1]
+      pc += 2
+      if op == LOAD_CONST:
+        push(consts[arg])
+      elif op == LOAD_NAME:
+        push(interpreter.load_name(span, names[arg], depths[arg], slots[arg], context))
+      elif op == BINARY_OP:
+        right = pop()
+        stack[-1] = interpreter.binary_op(span, arg, stack[-1], right, context)
+      elif op == STORE_NAME:
+        stack[-1] = interpreter.assign(span, slots[arg], stack[-1], context)
+      elif op == UNARY_OP:
+        stack[-1] = interpreter.unary_op(span, arg, stack[-1], context)
+      elif op == NATIVE_BINARY_OP:
+        right = pop()
+        stack[-1] = NATIVE_BINARY_OPS[arg](stack[-1], right)
+      elif op == NATIVE_UNARY_OP:
+        stack[-1] = NATIVE_UNARY_OPS[arg](stack[-1])
+      elif op == POP_JUMP_IF_FALSE:
+        if not truth(pop()):
+          pc = arg
+      elif op == JUMP:
+        pc = arg
+      elif op == JUMP_IF_FALSE_OR_POP:
+        if boolean(stack[-1]):
+          pop()
+        else:
+          pc = arg
+      elif op == JUMP_IF_TRUE_OR_POP:
+        if boolean(stack[-1]):
+          pc = arg
+        else:
+          pop()
+      elif op == POP_TOP:
+        pop()
+      elif op == LOAD_NONE:
+        push(None)
+      elif op == BUILD_TUPLE or op == BUILD_LIST:
+        items = stack[len(stack) - arg:]
+        del stack[len(stack) - arg:]
+        make = Tuple if op == BUILD_TUPLE else List
+        push(make(auto(i) for i in items))
+      elif op == LOAD_ATTR:
+        stack[-1] = interpreter.get_attr(span, sites[(pc >> 1) - 1], stack[-1], context)
+      elif op == STORE_ATTR:
+        value = pop()
+        stack[-1] = interpreter.set_attr(span, names[arg], stack[-1], value, context)
+      elif op == CHECK_GETITEM:
+        interpreter.check_getitem(span, stack[-1], context)
+      elif op == GET_ITEM:
+        key = pop()
+        stack[-1] = interpreter.get_item(span, stack[-1], key, context)
+      elif op == CHECK_SETITEM:
+        interpreter.check_setitem(span, stack[-1], context)
+      elif op == SET_ITEM:
+        value = pop()
+        key = pop()
+        stack[-1] = interpreter.set_item(span, stack[-1], key, value, context)
+      elif op == CHECK_CALL:
+        interpreter.check_call(span, stack[-1], context)
+      elif op == LOAD_METHOD:
+        receiver = auto(stack[-1])
+        stack[-1], receiver = interpreter.load_method(span, sites[(pc >> 1) - 1], receiver, context)
+        push(receiver)
+      elif op == CHECK_METHOD:
+        if stack[-1] is None:
+          interpreter.check_call(span, stack[-2], context)
+      elif op == CALL:
+        kwargs = pop() if arg & 1 else None
+        count = len(stack) - (arg >> 1)
+        args = [auto(i) for i in stack[count:]]
+        del stack[count:]
+        receiver = pop()
+        if receiver is None:
+          stack[-1] = interpreter.call(span, stack[-1], args, kwargs, context)
+        else:
+          stack[-1] = interpreter.call_method(span, stack[-1], receiver, args, kwargs, context)
+      elif op == WRAP:
+        stack[-1] = auto(stack[-1])
+      elif op == BUILD_MAP:
+        push({})
+      elif op == MAP_ADD:
+        value = auto(pop())
+        key = auto(pop())
+        try:
+          stack[-1][key] = value
+        except TypeError:
+          interpreter.unhashable(span, key, context)
+      elif op == BUILD_DICT:
+        stack[-1] = Dict(stack[-1])
+      elif op == BUILD_SLICE:
+        step = pop() if arg & 4 else None
+        stop = pop() if arg & 2 else None
+        start = pop() if arg & 1 else None
+        push(interpreter.make_slice(start, stop, step))
+      elif op == DELETE_NAME:
+        interpreter.delete_name(span, names[arg], context)
+      else:
+        raise SystemError(f'unknown opcode {op}')
+    return stack.pop() if stack else None
@@ -0,0 +1,42 @@
+"""Opcode constants."""
+
+__all__ = ['opname', 'HAS_JUMP']
+
+LOAD_CONST = 0           # 常量池中的值
+LOAD_NONE = 1            # 空结果 (如不带返回值的语句)
+LOAD_NAME = 2            # 名称表中的变量
+STORE_NAME = 3           # 赋值, 结果留在栈顶
+DELETE_NAME = 4
+POP_TOP = 5
+UNARY_OP = 6             # 参数为运算符的 token 类型
+BINARY_OP = 7            # 参数为运算符的 token 类型
+BUILD_TUPLE = 8          # 参数为元素个数
+BUILD_LIST = 9           # 参数为元素个数
+BUILD_MAP = 10           # 压入一个空的 dict, 之后由 MAP_ADD 填充
+MAP_ADD = 11
+BUILD_DICT = 12
+BUILD_SLICE = 13         # 参数的 1/2/4 位分别表示 start/stop/step 是否存在
+LOAD_ATTR = 14           # 参数为名称表中的属性名
+STORE_ATTR = 15          # 参数为名称表中的属性名
+CHECK_GETITEM = 16
+GET_ITEM = 17
+CHECK_SETITEM = 18
+SET_ITEM = 19
+CHECK_CALL = 20
+LOAD_METHOD = 21         # 参数为名称表中的方法名; 把栈顶的对象替换为 (方法, 对象) 或 (属性值, None)
+CHECK_METHOD = 22        # LOAD_METHOD 取到的不是方法时检查是否可以调用
+CALL = 23                # 参数为 (参数个数 << 1) | 是否有关键字参数; 栈中依次为被调用对象、对象或 None、参数
+POP_JUMP_IF_FALSE = 24
+JUMP = 25
+WRAP = 26                # 把栈顶的结果转换为值 (None 转换为 null)
+NATIVE_UNARY_OP = 27     # 操作数一定为原生类型的 UNARY_OP (见 TypeChecker)
+NATIVE_BINARY_OP = 28    # 操作数一定为原生类型的 BINARY_OP
+JUMP_IF_FALSE_OR_POP = 29  # &&: 栈顶为假时保留并跳转, 否则弹出
+JUMP_IF_TRUE_OR_POP = 30   # ||: 栈顶为真时保留并跳转, 否则弹出
+
+HAS_JUMP = {POP_JUMP_IF_FALSE, JUMP, JUMP_IF_FALSE_OR_POP, JUMP_IF_TRUE_OR_POP}
+
+opname = {value: name
+          for name, value in globals().items()
+          if isinstance(value, int) and not name.startswith('_')}
+__all__.extend(opname.values())
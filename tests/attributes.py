@@ -0,0 +1,76 @@
+from cathon import errors
+from cathon.interpreter import values
+from cathon.interpreter.values import AttributeSite, Dict, Int, cat_getattr
+from .common import compare
+
+
+CODE = '''\
+d = {"k": 1}
+x = 1
+print(d.keys(), x.__class__, type.__dict__.keys())
+print(x.answer)
+'''
+
+
+# 内联缓存命中时与 cat_getattr 的结果相同
+site = AttributeSite('__class__')
+for i in range(3):
+  assert site.get(Int(i)) is cat_getattr(Int(i), '__class__')
+assert site.cls is Int
+
+# Type.__dict__ 在类未修改时复用同一个 mappingproxy
+assert cat_getattr(values.cat_type, '__dict__') is cat_getattr(values.cat_type, '__dict__')
+
+# 修改类后版本号改变, 缓存失效
+version = Int._cat_version
+before = compare('<attributes>', CODE, errors.AttributeError)
+assert "has no attribute 'answer'" in before, before
+Int.CATanswer = 42
+try:
+  assert Int._cat_version != version
+  assert AttributeSite('answer').get(Int(1)) == 42
+  after = compare('<attributes>', CODE)
+  assert after.endswith('42\n'), after
+  site = AttributeSite('answer')
+  assert site.get(Int(1)) == 42
+finally:
+  del Int.CATanswer
+assert site.get(Int(1)) is None
+assert compare('<attributes>', CODE, errors.AttributeError) == before
+
+# 是否为描述器只看值的类: 类中的 property 被调用, 实例自身的 __get__ 不起作用
+class Thing(values.Single):
+  CATanswer = values.cat_property(lambda obj: obj.value * 2)
+
+plain = values.Single(1)
+plain.CAT__get__ = lambda obj, cls: 'bound'
+Thing.CATplain = plain
+try:
+  assert cat_getattr(Thing(21), 'answer') == 42
+  assert AttributeSite('answer').get(Thing(21)) == 42
+  assert cat_getattr(Thing(21), 'plain') is plain
+  assert AttributeSite('plain').get(Thing(21)) is plain
+finally:
+  del Thing.CATplain
+
+# 类定义了 __getattribute__ 时所有属性都由它取得, 访问处不缓存 (即使类中有同名属性)
+class Proxy(values.Single):
+  CATanswer = 1
+
+  def CAT__getattribute__(self, attr):
+    return f'{attr} of {self.value}'
+
+
+site = AttributeSite('answer')
+for i in range(3):
+  assert cat_getattr(Proxy(i), 'answer') == f'answer of {i}'
+  assert site.get(Proxy(i)) == f'answer of {i}'
+  assert site.method(Proxy(i)) is None
+assert site.cls is None
+
+# 修改父类同样使子类的缓存失效
+version = Dict._cat_version
+values.Single.CATanswer = 1
+del values.Single.CATanswer
+assert Dict._cat_version != version
+print('ok')
@@ -0,0 +1,52 @@
+import io, contextlib
+from cathon import errors
+from cathon.basic import BACKENDS, global_symbol_table, set_builtins
+from cathon.interpreter import ClosureCompiler, Context
+from cathon.lexer.regex_lexer import RegexLexer
+from cathon.parser.parser import Parser
+from cathon.resolver import Resolver
+from .common import execute, compare
+
+
+PROGRAMS = [
+  'x = 7\ny = 0 + x * 2 - 3\nprint(y, y // 2, y % 4, -y, 2 ** 5, 7 / 2, 5 & 3 | 8 ^ 1, 1 << 4 >> 2)\n',
+  's = "abc"\nprint(s * 2, len(s), [s, 1], (s,))\n',
+  'd = {"a": 1, 2: [3]}\nprint(d, d["a"], d.get("z", 0), d.keys(), d[2][0])\n',
+  'x = 1\n若 x > 0:\n  print("pos")\n否则:\n  print("neg")\nprint(1 if 0 else 2, 0 ? 1 : 2)\n',
+  'x = 1\ndel x\nx = 2\nprint(x, type(x).__name__, getattr(x, "__class__"))\n',
+  'print(1 && 0 || "a", !1, null, true, false)\n',
+]
+# 报错的类型、信息与位置; 包括未包装为 Cathon 错误的 Python 异常
+ERRORS = [
+  ('print(undefined_name)\n', errors.NameError),
+  ('x = 1\nx.missing\n', errors.AttributeError),
+  ('l = [1]\nl[5]\n', errors.IndexError),
+  ('d = {}\nd["k"]\n', errors.KeyError),
+  ('s = "abc"\nprint(s[1])\n', errors.TypeError),
+  ('print(1 / 0)\n', ZeroDivisionError),
+  ('print(1 + "a")\n', TypeError),
+  ('l = [1, 2]\nl[0] = 9\n', AttributeError),
+]
+
+
+# 各执行方式的输出与报错都与遍历语法树相同
+for code in PROGRAMS:
+  compare('<backends>', code)
+for code, error in ERRORS:
+  compare('<backends>', code, error)
+assert 'tree' in BACKENDS and len(BACKENDS) > 1
+
+# 编译得到的闭包不依赖编译时的状态, 可以多次执行
+set_builtins()
+ast = Parser(RegexLexer('<backends>', PROGRAMS[0]).iter_tokens()).parse()
+Resolver(global_symbol_table).resolve(ast)
+closure = ClosureCompiler.compile(ast)
+context = Context('<module>')
+context.symbol_table = global_symbol_table
+expected = execute('<backends>', PROGRAMS[0])
+for _ in range(2):
+  output = io.StringIO()
+  with contextlib.redirect_stdout(output):
+    closure(context)
+  assert output.getvalue() == expected, output.getvalue()
+print(len(PROGRAMS) + len(ERRORS), 'programs ok')
@@ -0,0 +1,38 @@
+from cathon.optimizer import Optimizer
+from cathon.typechecker import TypeChecker
+from cathon.interpreter import Interpreter
+from cathon.basic import global_symbol_table
+from .common import execute, compare
+
+
+CODE = '''\
+print(2 and 3, 0 or 4, 1 && 0, 0 || "", 1 && 2 || 3, "" || null || 5, [] && print("no"))
+print(1 || print("no"), 0 && print("no"), 1 && print("yes"), 0 || print("yes"))
+print(1 ? 2 : print("no"), 1 if 1 else print("no"))
+x = 0
+y = 0 + x || 7
+print(y, x && 1 / 0, !x && y)
+'''
+
+
+# 右操作数只在左操作数不能决定结果时求值
+expected = compare('<boolop>', CODE)
+assert 'no' not in expected and expected.count('yes') == 2, expected
+assert expected.splitlines()[0] == "3 4 0 '' 2 5 []", expected
+compare('<boolop>', CODE, expected=expected, optimizer=Optimizer())
+compare('<boolop>', CODE, expected=expected, typechecker=TypeChecker(global_symbol_table))
+
+# && 与 || 按 __bool__ 判断 (Interpreter.boolean), 条件总是为真 (Interpreter.truth);
+# 两者的不同在各执行方式与优化后都保持一致
+DIVERGENCE = 'print(0 && 1, "" || 3, !0, 0 ? 1 : 2, 1 if 0 else 2, [] ? 4 : 5)\n'
+assert compare('<boolop>', DIVERGENCE) == '0 3 true 1 1 4\n'
+compare('<boolop>', DIVERGENCE, expected='0 3 true 1 1 4\n', optimizer=Optimizer(2))
+for value in (0, 1, 0.0, '', 'a', [], None, False, True):
+  assert Interpreter.truth(value)
+  assert Interpreter.boolean(value) == bool(value), value
+
+# 左操作数为常量时由优化器直接选出结果
+optimizer = Optimizer()
+execute('<boolop>', '1 && 2 || 3\n0 || print("x")', optimizer=optimizer)
+assert optimizer.folded == 3, optimizer.report()
+print(expected, end='')
@@ -0,0 +1,50 @@
+from cathon import errors
+from cathon.basic import BACKENDS
+from cathon.interpreter.clinic import builtin
+from cathon.interpreter.values import Int, String, cat_len
+from .common import execute, compare
+
+
+CODE = '''\
+print(type("a", (), {}), getattr(1, "__class__"), getattr(1, "missing", 3), int("11", 2))
+'''
+
+ERRORS = {
+  'type(1, (), {})': 'type.__new__() argument 1 must be str, not int',
+  'type("a", 1, {})': 'type.__new__() argument 2 must be tuple, not int',
+  'type("a", (), 1)': 'type.__new__() argument 3 must be dict, not int',
+  'getattr(1, 2)': 'getattr() argument 2 must be str, not int',
+  'int("5", "a")': 'int() argument 2 must be int, not str',
+  'len(1, 2)': 'len() takes 1 positional argument but 2 were given',
+}
+
+
+expected = compare('<builtins>', CODE)
+assert expected == "<class 'a'> <class 'int'> 3 3\n", expected
+
+# 参数类型不对时的报错信息在声明时确定, 与调用的位置无关
+for code, message in ERRORS.items():
+  for backend in BACKENDS:
+    res = execute('<builtins>', code, backend, errors.TypeError)
+    assert res.rstrip().endswith(message), (backend, code, res)
+
+# 生成的函数参数列表与实现相同; 没有需要检查的参数时就是实现本身
+@builtin('f')
+def f(a, b: 'Int' = 1, /, *args, c: String, **kwargs):
+  return a, b, args, c, kwargs
+
+x, two = String('x'), Int(2)
+assert f(1, c=x, d=2) == (1, 1, (), x, {'d': 2})
+assert f(1, two, 3, c=x)[1:3] == (two, (3,))
+for args, kwargs, message in (
+  ((1, x), {'c': x}, "f() argument 2 must be int, not str"),
+  ((1,), {'c': two}, "f() argument 'c' must be str, not int"),
+):
+  try:
+    f(*args, **kwargs)
+  except errors.TypeError as e:
+    assert e.details == message, e.details
+  else:
+    raise AssertionError(args)
+assert builtin('len')(cat_len) is cat_len
+print(expected, end='')
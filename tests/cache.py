@@ -0,0 +1,88 @@
+import gc, io, contextlib
+from cathon.basic import run, BACKENDS
+from cathon.interpreter import interpreter
+from cathon.interpreter.values import Int, String, true, false, null
+from .common import compare
+
+
+CODE = '''\
+x = 0
+print(x + 1, x + 1000, 1 < 2, 2 < 1, "abc", "abc")
+print([x + 1, x + 2, x + 3], {"k": 100 - 99})
+'''
+LONG = '"' + 'a' * 40 + '"'
+POOL = f'''\
+d = {{{LONG}: 1, 1.5: 2, 100000: 3}}
+print(d[{LONG}], d[1.5], d[100000])
+'''
+
+
+# 小整数与单例总是同一个对象, 大整数每次新建
+auto = interpreter.auto
+assert auto(1) is auto(1) and isinstance(auto(1), Int)
+assert auto(interpreter.SMALL_INT_MAX + 1) is not auto(interpreter.SMALL_INT_MAX + 1)
+assert auto(True) is true and auto(False) is false and auto(None) is null
+assert auto('abc') is auto('abc') and isinstance(auto('abc'), String)
+assert auto('a' * (interpreter.MAX_INTERN_LENGTH + 1)) is not auto('a' * (interpreter.MAX_INTERN_LENGTH + 1))
+
+# 驻留表满时淘汰最早驻留的字符串, 命中不改变淘汰的顺序
+saved, size = dict(interpreter.interned), interpreter.INTERN_SIZE
+interpreter.interned.clear()
+interpreter.INTERN_SIZE = 2
+try:
+  a = auto('a')
+  b = auto('b')
+  assert auto('a') is a
+  auto('c')
+  assert list(interpreter.interned) == ['b', 'c'] and auto('b') is b and auto('a') is not a
+finally:
+  interpreter.interned.clear()
+  interpreter.interned.update(saved)
+  interpreter.INTERN_SIZE = size
+
+# 驻留表只是分配缓存: 驻留的字符串被淘汰后, 相等的字符串仍能找到之前的键
+OVERFLOW = 'd = {"k": 1}\n' + ''.join(f'x = "s{i}"\n' for i in range(interpreter.INTERN_SIZE + 76)) + 'print(d["k"])\n'
+assert compare('<cache>', OVERFLOW) == '1\n'
+assert 'k' not in interpreter.interned
+
+# 默认不统计, 包装时不做额外的操作
+interpreter.clear_cache_stats()
+auto(1), auto('abc'), auto(None)
+assert all(hits == misses == 0 for hits, misses, _ in interpreter.cache_info().values())
+assert interpreter.boxers[int] is interpreter.box_int
+
+interpreter.enable_cache_stats()
+for backend in BACKENDS:
+  interpreter.clear_cache_stats()
+  with contextlib.redirect_stdout(io.StringIO()):
+    run('<cache>', CODE, backend)
+  print(backend, {
+    name: f'{hits}/{hits + misses}'
+    for name, (hits, misses, rate) in interpreter.cache_info().items()
+  })
+  assert interpreter.cache_info()['int'][0] > 0
+interpreter.enable_cache_stats(False)
+assert interpreter.boxers[int] is interpreter.box_int and interpreter.boxers[str] is interpreter.intern
+
+# 相同的字面量 (包括大整数、浮点数与长字符串) 包装后是常量池中的同一个值
+assert compare('<cache>', POOL) == '1 2 3\n'
+
+# 常量池只是分配缓存: 运算得到的数作为键时, 无论之后的代码是否有相同的字面量, 结果都相同
+RESULT_KEY = 'd = {999 + 1: 1, 0.5 + 1: 2}\nprint(d[998 + 2], d[1.25 + 0.25], d[1000.0])\n'
+assert compare('<cache>', RESULT_KEY) == '1 2 1\n'
+assert compare('<cache>', RESULT_KEY + 'y = 1000\nz = 1.5\n') == '1 2 1\n'
+
+# 0.0 与 -0.0 相等但不是同一个值, 不共用常量池中的值
+zero = interpreter.constant(0.0)
+assert interpreter.constant(-0.0) is not zero and repr(auto(-0.0)) == '-0.0'
+assert interpreter.constant_key(0.0) != interpreter.constant_key(-0.0)
+assert interpreter.constant_key(1) != interpreter.constant_key(1.0) != interpreter.constant_key(True)
+assert compare('<cache>', 'x = 0.0\nprint(0.0, -x, -0.0, 0.0 * -1)\n') == '0.0 -0.0 -0.0 -0.0\n'
+del zero
+
+# 常量池只引用仍在使用的值
+value = interpreter.constant(123457)
+assert auto(123457) is value and interpreter.constant(123457) is value
+del value
+gc.collect()
+assert 123457 not in interpreter.constants[int]
@@ -0,0 +1,27 @@
+from cathon import errors
+from .common import compare
+
+
+CODE = '''\
+d = {"k": 1}
+print(d.get("k"), d.get("z", 5), d.items(), type(d).__name__)
+{"once": print("receiver")}.keys()
+'''
+
+ERRORS = [
+  ('d = {"k": 1}\nd.get()', errors.TypeError),
+  ('d = {"k": 1}\nd.missing(print("not evaluated"))', errors.AttributeError),
+  ('d = {"k": 1}\nd.__class__.__name__(print("not evaluated"))', errors.TypeError),
+  ('print(1, sep="-")', errors.TypeError),
+]
+
+
+# 调用方法时属性所属的对象只求值一次
+expected = compare('<calls>', CODE)
+assert expected.count('receiver') == 1, expected
+
+# 报错 (包括报错前是否求值了参数) 在各执行方式下相同
+for code, error in ERRORS:
+  res = compare('<calls>', code, error)
+  assert 'not evaluated\n' not in res, res
+print(expected, end='')
@@ -0,0 +1,34 @@
+import io, contextlib
+from cathon.basic import run, BACKENDS
+
+
+def execute(file, code, backend='tree', error=None, **kwargs) -> str:
+  """
+  用 backend 执行 code, 返回输出;
+  error 为异常类型时, 执行必须以该类型的异常结束, 异常的类型名与信息追加在输出之后
+  """
+  output = io.StringIO()
+  with contextlib.redirect_stdout(output):
+    if error is None:
+      run(file, code, backend, **kwargs)
+      return output.getvalue()
+    try:
+      run(file, code, backend, **kwargs)
+    except error as e:
+      print(type(e).__name__, e)
+    else:
+      raise AssertionError(f'{backend}: {error.__name__} not raised by {code!r}')
+  return output.getvalue()
+
+
+def compare(file, code, error=None, expected=None, **kwargs) -> str:
+  """
+  在所有执行方式下执行 code, 输出 (包括报错及其位置) 都与 expected 相同;
+  expected 默认为不带 kwargs 遍历语法树的输出, 返回 expected
+  """
+  if expected is None:
+    expected = execute(file, code, 'tree', error)
+  for backend in BACKENDS:
+    res = execute(file, code, backend, error, **kwargs)
+    assert res == expected, (backend, code, res, expected)
+  return expected
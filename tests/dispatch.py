@@ -0,0 +1,50 @@
+import warnings
+from cathon.interpreter.interpreter import auto, binary_dispatch, unary_dispatch
+from cathon.interpreter.values import UNSUPPORTED, Object
+
+
+SAMPLES = {
+  bool: [True, False],
+  int: [0, 3, -7],
+  float: [0.0, 2.5, float('nan')],
+  str: ['', 'ab'],
+  type(None): [None],
+}
+
+
+def samples(type_):
+  if issubclass(type_, Object):
+    return [i for values in SAMPLES.values() for i in map(auto, values) if type(i) is type_]
+  return SAMPLES[type_]
+
+
+def result(func):
+  try:
+    return 'ok', repr(auto(func()))
+  except Exception as e:
+    return 'error', type(e).__name__, str(e)
+
+
+def generic_binary(op, left, right):
+  left, right = auto(left), auto(right)
+  val = left.binary_op(op, right)
+  if val is UNSUPPORTED:
+    val = right.binary_op(op, left)
+  return val
+
+
+warnings.simplefilter('ignore', DeprecationWarning)
+# 表中的每个实现与 Object.binary_op/unary_op 的结果 (包括 Python 的异常) 相同
+count = 0
+for (op, left_type, right_type), func in binary_dispatch.items():
+  for left in samples(left_type):
+    for right in samples(right_type):
+      expected = result(lambda: generic_binary(op, left, right))
+      assert result(lambda: func(left, right)) == expected, (op, left, right, expected)
+      count += 1
+for (op, type_), func in unary_dispatch.items():
+  for value in samples(type_):
+    expected = result(lambda: auto(value).unary_op(op))
+    assert result(lambda: func(value)) == expected, (op, value, expected)
+    count += 1
+print(f'{len(binary_dispatch)} binary and {len(unary_dispatch)} unary entries, {count} cases')
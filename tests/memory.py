@@ -0,0 +1,63 @@
+import gc, sys, tracemalloc
+from cathon.lexer import regex_lexer
+from cathon.lexer.position import Source
+from cathon.lexer.regex_lexer import RegexLexer
+from cathon.parser.parser import Parser
+
+
+BLOCK = '''\
+x = 1 + 2 * (3 - a) / b
+print(x, "s", [1, 2, 3], {1: x})
+若 x > 1:
+  y = [x.attr[1:2], -x]
+'''
+
+
+def measure(lines):
+  code = BLOCK * (lines // BLOCK.count('\n'))
+  tokens = RegexLexer('<memory>', code).parse()
+  gc.collect()
+  tracemalloc.start()
+  ast = Parser(tokens).parse()
+  gc.collect()
+  size = tracemalloc.get_traced_memory()[0]
+  tracemalloc.stop()
+  count = sum(1 for _ in ast.walk())
+  return size, count
+
+
+for lines in (1000, 10000):
+  size, count = measure(lines)
+  print(f'{lines:>6} lines: {count:>7} nodes  {size / count:6.1f} bytes/node')
+
+
+# 流式读取: 词法分析的窗口与语法分析的缓冲区不随文件增长,
+# 读取过程中已经计算的行首索引随新读入的文本增量更新, 与一次性计算的结果相同
+def stream(lines):
+  code = BLOCK * (lines // BLOCK.count('\n'))
+  lexer = RegexLexer('<memory>', code.splitlines(keepends=True))
+  sizes = []
+  parsers = []
+
+  def tokens():
+    for i, token in enumerate(lexer.iter_tokens()):
+      if i == 10:
+        lexer.source.line_column(token.pos_start.index)
+      sizes.append((len(lexer.code), len(parsers[0].tokens) if parsers else 0))
+      yield token
+
+  parsers.append(Parser(tokens()))
+  parsers[0].parse()
+  assert lexer.source.line_starts == Source('<memory>', code).line_starts
+  assert lexer.source.code == code
+  return max(i for i, _ in sizes), max(i for _, i in sizes)
+
+
+size = regex_lexer.CHUNK_SIZE
+regex_lexer.CHUNK_SIZE = 256
+try:
+  small, large = stream(100), stream(10000)
+finally:
+  regex_lexer.CHUNK_SIZE = size
+assert large[0] <= small[0] * 2 and large[1] <= small[1] * 2, (small, large)
+print('stream window', large)
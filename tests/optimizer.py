@@ -0,0 +1,27 @@
+from cathon import errors
+from cathon.optimizer import Optimizer
+from .common import execute
+
+
+CODE = '''\
+x = 1 + 2 * 3 - -4
+print(x, "a" * 3, 2 ** 10, 7 / 2, 1 < 2)
+若 true:
+  print(1)
+  若 0:
+    print(2)
+否则:
+  print(3)
+y = 5 if 1 else 6
+print(y, x.a)
+'''
+
+
+expected = execute('<optimizer>', CODE, error=errors.AttributeError)
+for level in (1, 2):
+  optimizer = Optimizer(level)
+  output = execute('<optimizer>', CODE, error=errors.AttributeError, optimizer=optimizer)
+  print(optimizer.report())
+  # 输出与报错 (包括报错的位置) 都与未优化时相同
+  assert output == expected, (level, output, expected)
+  assert optimizer.nodes_after < optimizer.nodes_before
@@ -0,0 +1,114 @@
+from cathon import errors
+from cathon.lexer.regex_lexer import RegexLexer
+from cathon.lexer.tokens import BracketTable
+from cathon.parser.parser import Parser
+from cathon.parser.nodes import BinaryOpNode, BoolOpNode, UnaryOpNode, CallNode
+
+
+UNCLOSED = {
+  'print(1, 2\nx = 3\n': ("'(' was never closed", 5),
+  'x = [1, (2\n': ("'[' was never closed", 4),
+  'x = (1, 2\n': ("'(' was never closed", 4),
+  'f(a)[1\n': ("'[' was never closed", 4),
+  'f(g(1)\n': ("'(' was never closed", 1),
+}
+# 运算符的结合方式, 与原先逐层递归下降的语法分析器相同 (包括 ** 左结合)
+PRECEDENCE = {
+  '1 - 2 - 3': '((1 MINUS 2) MINUS 3)',
+  '-2 ** 2': '(MINUS (2 DOUBLESTAR 2))',
+  '2 ** 3 ** 2': '((2 DOUBLESTAR 3) DOUBLESTAR 2)',
+  '1 | 2 ^ 3 & 4 << 1': '(1 VBAR (2 CIRCUMFLEX (3 AMPER (4 LEFTSHIFT 1))))',
+  '8 // 2 % 3 * -1': '(((8 DOUBLESLASH 2) PERCENT 3) STAR (MINUS 1))',
+  '1 || 2 && 3': '(1 DOUBLEVBAR (2 DOUBLEAMPER 3))',
+  '1 + 2 * 3 < 7 && !0 || 1': '((((1 PLUS (2 STAR 3)) LESS 7) DOUBLEAMPER (EXCLAMATION 0)) DOUBLEVBAR 1)',
+  '!1 == 2': '(EXCLAMATION (1 EQEQUAL 2))',
+}
+MEMO = '''\
+print((a.b[1](2), 3), [4, 5])
+f(x=1)
+x = (1, [2, (3, 4)])
+'''
+
+
+class RecordingParser(Parser):
+  """
+  记录记忆表曾经达到的最大条目数
+  """
+  largest = 0
+
+  def remember(self, key, value):
+    super().remember(key, value)
+    self.largest = max(self.largest, len(self.memo))
+
+
+def parse(code, **kwargs):
+  parser = RecordingParser(RegexLexer('<parser>', code).iter_tokens(), **kwargs)
+  return repr(parser.parse()), parser
+
+
+def shape(node):
+  """
+  表达式的结构, 每个运算加一层括号
+  """
+  if isinstance(node, (BinaryOpNode, BoolOpNode)):
+    return f'({shape(node.left)} {node.op!r} {shape(node.right)})'
+  if isinstance(node, UnaryOpNode):
+    return f'({node.op!r} {shape(node.right)})'
+  return str(node.value.value)
+
+
+# 括号匹配表: 左括号的起始索引 -> 右括号的起始索引, 没有读到右括号的左括号不在表中
+brackets = BracketTable()
+for token in RegexLexer('<parser>', 'f(a[1], {2: (3)}, (4\n').iter_tokens():
+  brackets.record(token)
+assert brackets == {3: 5, 12: 14, 8: 15}, brackets
+brackets.prune(8)
+assert brackets == {12: 14, 8: 15}, brackets
+
+# 未闭合的括号报告在第一个没有右括号的左括号处, 一次性读入与流式读取相同
+for code, (message, index) in UNCLOSED.items():
+  for source in (code, code.splitlines(keepends=True)):
+    try:
+      Parser(RegexLexer('<parser>', source).iter_tokens()).parse()
+    except errors.SyntaxError as e:
+      assert (e.details, e.pos_start.index) == (message, index), (code, e.details, e.pos_start.index)
+    else:
+      raise AssertionError(code)
+
+# 记忆表只改变速度: 不使用、容量很小 (频繁淘汰) 与默认容量时语法树相同
+expected, parser = parse(MEMO)
+assert parser.memo_hits > 0 and 0 < parser.largest <= parser.memo_size, (parser.memo_hits, parser.largest)
+# 语句结束后不会再回溯到之前的位置, 记忆表中只剩最后一条语句中的位置
+assert all(index >= parser.offset for _, index in parser.memo), (parser.offset, list(parser.memo))
+tree, parser = parse(MEMO, memo_size=0)
+assert tree == expected and parser.memo is None and parser.memo_hits == 0
+for size in (1, 2):
+  tree, parser = parse(MEMO, memo_size=size)
+  assert tree == expected and parser.largest == size, (size, parser.largest)
+
+for expr, expected in PRECEDENCE.items():
+  ast = Parser(RegexLexer('<parser>', f'print({expr})\n').iter_tokens()).parse()
+  call = next(i for i in ast.walk() if isinstance(i, CallNode))
+  assert shape(call.args.items[0]) == expected, (expr, shape(call.args.items[0]))
+
+# 节点只有 __slots__ 中的属性, _fields 都是声明过的属性;
+# walk 广度优先地访问每个节点恰好一次
+ast = Parser(RegexLexer('<parser>', MEMO + 'y = {1: -x.a[0]} if 1 else [2]\n').iter_tokens()).parse()
+nodes = list(ast.walk())
+for node in nodes:
+  assert not hasattr(node, '__dict__'), type(node)
+  slots = {i for cls in type(node).__mro__ for i in getattr(cls, '__slots__', ())}
+  assert set(node._fields) <= slots, type(node)
+
+
+def depths(node, depth=0):
+  yield node, depth
+  for child in node.iter_child_nodes():
+    yield from depths(child, depth + 1)
+
+
+expected = dict((id(node), depth) for node, depth in depths(ast))
+assert len(nodes) == len(expected) == len({id(i) for i in nodes})
+order = [expected[id(i)] for i in nodes]
+assert nodes[0] is ast and order == sorted(order), order
+print('ok')
@@ -0,0 +1,57 @@
+from cathon.basic import set_builtins, global_symbol_table
+from cathon.lexer.regex_lexer import RegexLexer
+from cathon.parser.parser import Parser
+from cathon.interpreter import Interpreter, ClosureCompiler, Context
+from cathon.interpreter import quicken
+from cathon.interpreter.interpreter import auto
+from cathon.interpreter.values import Dict, Float, List, String
+
+
+CODE = '''\
+a * 2 + 1
+l[i]
+d[k]
+d.keys()
+len(l)
+'''
+
+# 同一段代码反复执行, 前面的输入类型稳定, 之后类型改变、下标越界
+INPUTS = (
+  [(3, [1, 2], 0, {'x': 1}, 'x')] * 40
+  + [(2.5, [1, 2], 1, {1: 'y'}, 1)] * 40
+  + [(3, [1, 2], 5, {'x': 1}, 'z')] * 3
+  + [(True, [3], -1, {'x': 1}, 'x')] * 40
+  + [(String('s'), [[1]], 0, {'x': 1}, Float(1.0))] * 3
+  # 类型交替变化的节点是多态的
+  + [(3, [1], 0, {'x': 1}, 'x'), (0.5, [1], 0, {'x': 1}, 'x')] * 10
+)
+
+
+def execute(run, context):
+  try:
+    return repr(run(context))
+  except Exception as e:
+    return f'{type(e).__name__}: {e}'
+
+
+set_builtins()
+ast = Parser(RegexLexer('<quicken>', CODE).iter_tokens()).parse()
+closure = ClosureCompiler.compile(ast)
+context = Context('<module>')
+context.symbol_table = global_symbol_table
+quicken.clear_quicken_stats()
+results = set()
+# 特化前后的结果 (包括报错) 都与遍历语法树相同
+for a, l, i, d, k in INPUTS:
+  global_symbol_table.set('a', a)
+  global_symbol_table.set('l', List(auto(j) for j in l))
+  global_symbol_table.set('i', i)
+  global_symbol_table.set('d', Dict({auto(key): auto(value) for key, value in d.items()}))
+  global_symbol_table.set('k', k)
+  expected = execute(lambda c: Interpreter.visit(ast, c), context)
+  assert execute(closure, context) == expected, (a, l, i, d, k, expected)
+  results.add(expected)
+
+stats = quicken.quicken_info()
+print(len(results), 'distinct results', stats)
+assert all(stats.values()), stats
@@ -0,0 +1,77 @@
+import random
+from cathon import errors
+from cathon.lexer import Lexer
+from cathon.lexer import regex_lexer
+from cathon.lexer.regex_lexer import RegexLexer
+
+
+CASES = [
+  '',
+  'x = 1\n',
+  'a.b(1, 2.5, "s", \'t\', “u”) # comment\n',
+  'x = 0x1f + 0b10 + 1_000 + 1.5e\n',
+  '若 a > 1:\n  b = a * 2\n\n\n  若 b:\n    c = [1,\n      2, 3]\nd = b\n',
+  'f(\n  1,\n  2\n)\ny = {\n  1: 2}\n',
+  'print("a\\nb", ...)\nx...y\n',
+  'a\n  # comment\nb\n',
+  'a \nb\n\n\n',
+  'if x:\n\ty\n  z\n',
+  'x = "unterminated\n',
+  'x = 1 @ 2 ? 3\n',
+  '变量1 赋值 2\n如果 变量1：\n  打印（“你好，”，“世界！”)\n',
+]
+PIECES = [
+  'a', 'b1', '_x', '变量', 'if', 'else', 'and', 'not', '0', '12', '3.5', '0x1f', '1_0', '1.',
+  '+', '-', '*', '**', '//', '==', '!=', '<=', '>>=', '->', '.', '...', ',', ':', '：',
+  '(', ')', '[', ']', '{', '}', '（', '）', '"s"', "'t'", '“u”', '"a\\"b"', '# c',
+]
+SEPS = ['', ' ', '  ', '\n', '\n  ', '\n\n', '\n    ', '\t']
+
+
+def tokens(cls, code):
+  try:
+    return [
+      (t.type, t.value, t.pos_start.index, t.pos_end.index, t.pos_start.line, t.pos_start.column)
+      for t in cls('<regex_lexer>', code).parse()
+    ]
+  except errors.BaseError as e:
+    return type(e), e.details, e.pos_start.index, e.pos_end.index
+
+
+def generate(r):
+  return ''.join(r.choice(PIECES) + r.choice(SEPS) for _ in range(r.randint(1, 30)))
+
+
+# RegexLexer 产生的 token 流 (类型、值、位置) 以及报错都与 Lexer 完全一致;
+# Lexer 自身出错 (而不是报告语法错误) 的输入不作比较
+# 按行流式读取时 (窗口很小, 每读入几行就重新填充一次), token 流与报错也相同
+def streamed(code):
+  return tokens(RegexLexer, code.splitlines(keepends=True))
+
+
+r = random.Random(0)
+codes = CASES + [generate(r) for _ in range(3000)]
+count = 0
+size = regex_lexer.CHUNK_SIZE
+regex_lexer.CHUNK_SIZE = 8
+try:
+  for code in codes:
+    try:
+      expected = tokens(Lexer, code)
+    except (AttributeError, TypeError, ValueError):
+      continue
+    assert tokens(RegexLexer, code) == expected, code
+    assert streamed(code) == expected, code
+    count += 1
+finally:
+  regex_lexer.CHUNK_SIZE = size
+assert count > 2900, count
+
+# 跨越多次填充的字符串、括号与续行
+long = 'x = ("' + 'a' * 50 + '",\n' + '  1,\n' * 20 + ')\nprint(x)\n'
+regex_lexer.CHUNK_SIZE = 4
+try:
+  assert streamed(long) == tokens(Lexer, long)
+finally:
+  regex_lexer.CHUNK_SIZE = size
+print(count, 'cases ok')
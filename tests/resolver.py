@@ -0,0 +1,47 @@
+from cathon import errors
+from cathon.basic import global_symbol_table, builtins_symbol_table, set_builtins
+from cathon.interpreter import SymbolTable
+from cathon.lexer.regex_lexer import RegexLexer
+from cathon.parser.parser import Parser
+from cathon.parser.nodes import VarAccessNode, VarAssignNode
+from cathon.resolver import Resolver
+from .common import compare
+
+
+CODE = '''\
+x = 1
+y = [x, 2]
+print(x, y, len(y))
+print = 3
+del print
+print(missing)
+'''
+
+
+# 每个变量节点都解析为槽位, 只有 missing 一定未定义
+set_builtins()
+ast = Parser(RegexLexer('<resolver>', CODE).iter_tokens()).parse()
+resolver = Resolver(global_symbol_table)
+resolver.resolve(ast)
+assert all(
+  i.slot is not None
+  for i in ast.walk() if isinstance(i, (VarAccessNode, VarAssignNode))
+)
+assert [i.var.value for i in resolver.undefined] == ['missing'], resolver.report()
+# 只读取的内置变量直接解析到内置变量表 (第 1 层), 被赋值过的 print 在全局变量表中
+depths = {i.var.value: (i.depth, i.slot) for i in ast.walk() if isinstance(i, VarAccessNode)}
+assert depths['len'] == (1, builtins_symbol_table.names['len']), depths
+assert depths['print'] == (0, global_symbol_table.names['print']), depths
+assert depths['x'] == (0, global_symbol_table.names['x']), depths
+
+# 槽位按表分配: 全局变量不会占用内置变量表的槽位, 新的表从 0 开始分配
+assert 'x' not in builtins_symbol_table.names
+assert len(builtins_symbol_table.slots) == len(builtins_symbol_table.names)
+table = SymbolTable(builtins_symbol_table)
+Resolver(table).resolve(Parser(RegexLexer('<resolver>', 'b = 1\na = 0 + b + len("")\n').iter_tokens()).parse())
+assert table.names == {'b': 0, 'a': 1} and table.slots == [table.undefined] * 2, table.names
+print('\n'.join(resolver.report()))
+
+# 全局变量遮盖内置变量, 删除后内置变量重新可见
+expected = compare('<resolver>', CODE, errors.NameError)
+assert "name 'missing' is not defined" in expected, expected
@@ -0,0 +1,46 @@
+import time
+from cathon.lexer import Lexer
+from cathon.lexer.regex_lexer import RegexLexer
+
+
+BLOCK = '''\
+若 a > 1:
+  b = a * 2
+
+
+  若 b:
+    c = [1,
+      2, 3]
+d = b
+'''
+BLOCK_LINES = BLOCK.count('\n')
+
+
+def make_code(lines):
+  return BLOCK * (lines // BLOCK_LINES)
+
+
+def measure(cls, lines):
+  code = make_code(lines)
+  best = None
+  for _ in range(max(1, 10000 // lines)):
+    start = time.perf_counter()
+    cls('<scaling>', code).parse()
+    cost = time.perf_counter() - start
+    best = cost if best is None else min(best, cost)
+  return best
+
+
+for cls, sizes in (
+  (RegexLexer, (1000, 10000, 100000, 1000000)),
+  (Lexer, (1000, 10000, 100000)),
+):
+  print(cls.__name__)
+  base = None
+  for lines in sizes:
+    cost = measure(cls, lines)
+    per_line = cost / lines * 1e6
+    base = base or per_line
+    print(f'  {lines:>8} lines: {cost:8.3f}s  {per_line:6.2f}us/line  x{per_line / base:.2f}')
+    # 线性增长: 每行耗时不应随行数明显上升
+    assert per_line < base * 3, f'{cls.__name__} is not linear at {lines} lines'
@@ -0,0 +1,53 @@
+import types
+from cathon import errors
+from cathon.basic import global_symbol_table, set_builtins
+from cathon.interpreter import Transpiler
+from cathon.lexer.regex_lexer import RegexLexer
+from cathon.parser.parser import Parser
+from cathon.resolver import Resolver
+from .common import compare
+
+
+CODE = '''\
+x = 1
+y = 0 + x * 3
+print(x, y, 1 + 2 * 3, -x, "a" * 3, 7 // 2)
+print = 3
+del print
+print(x)
+'''
+
+
+def parse(code):
+  ast = Parser(RegexLexer('<transpiler>', code).iter_tokens()).parse()
+  Resolver(global_symbol_table).resolve(ast)
+  return ast
+
+
+def main(code):
+  return next(i for i in Transpiler.compile(parse(code))[0].co_consts if isinstance(i, types.CodeType))
+
+
+# 遮盖与删除内置变量、报错时已赋值的变量都与其他执行方式相同
+expected = compare('<transpiler>', CODE)
+assert expected.splitlines()[-1] == '1', expected
+compare('<transpiler>', 'a = 5\nb = 1 / 0\n', ZeroDivisionError)
+assert compare('<transpiler>', 'print(a)\n') == '5\n'
+compare('<transpiler>', 'x = 1\ndel x\nprint(x)\n', errors.NameError)
+
+# 解析到槽位的变量是 _main 的局部变量, 字面量之间的运算直接使用 Python 的运算符
+set_builtins()
+co = main(CODE)
+assert co.co_name == '_main'
+assert {'_v0_' + str(global_symbol_table.names[i]) for i in ('x', 'y', 'print')} <= set(co.co_varnames), co.co_varnames
+assert '_load_name' not in co.co_names and '_assign' not in co.co_names, co.co_names
+assert '_binary_op' not in main('print(1 + 2 * 3)\n').co_names
+
+# 相同的源代码与语法树结构复用同一个代码对象, 源代码不同时重新转换
+first = Transpiler.compile(parse(CODE))[0]
+assert Transpiler.compile(parse(CODE))[0] is first
+assert Transpiler.compile(parse(CODE + 'print(y)\n'))[0] is not first
+for i in range(Transpiler.cache_size):
+  Transpiler.compile(parse(f'print({i})\n'))
+assert Transpiler.compile(parse(CODE))[0] is not first
+print(expected, end='')
@@ -0,0 +1,50 @@
+from cathon.basic import global_symbol_table, set_builtins
+from cathon.lexer.regex_lexer import RegexLexer
+from cathon.parser.parser import Parser
+from cathon.parser.nodes import TypedBinaryOpNode, TypedUnaryOpNode
+from cathon.typechecker import TypeChecker
+from cathon.interpreter import Transpiler
+from cathon.vm import Compiler
+from cathon.vm.code import CodeObject
+from .common import compare
+
+
+CODE = '''\
+x = 1
+y = 0 + x * 3
+z = 2.5
+print(y + z, x ** 2, -x, "a" * y, 7 // 2 == 3, 1 / 0 + y)
+'''
+
+
+def parse(code):
+  return Parser(RegexLexer('<typecheck>', code).iter_tokens()).parse()
+
+
+set_builtins()
+global_symbol_table.remove('x')
+checker = TypeChecker(global_symbol_table)
+ast = checker.check(parse(CODE))
+report = checker.report()
+print('\n'.join(report))
+assert checker.variables['x'] is int and checker.variables['z'] is float
+assert "<typecheck>:4: 'x ** 2' left generic: result type depends on the values of int, int" in report
+typed = [i for i in ast.walk() if isinstance(i, (TypedUnaryOpNode, TypedBinaryOpNode))]
+assert len(typed) == checker.specialized > 0
+
+# 特化的节点在各执行方式下与未经类型检查时的结果 (包括报错) 相同
+expected = compare('<typecheck>', CODE, ZeroDivisionError)
+compare('<typecheck>', CODE, ZeroDivisionError, expected, typechecker=TypeChecker(global_symbol_table))
+
+# 同一段源代码经过类型检查前后转换出不同的 Python 代码
+assert Transpiler.compile(parse(CODE))[0] is not Transpiler.compile(ast)[0]
+
+# 特化的指令可以序列化
+co = CodeObject.loads(Compiler.compile(ast).dumps())
+assert co.code == Compiler.compile(ast).code
+
+# 执行前已有的值也参与推断: x 之前是字符串时, 不能认为 x 总是 int
+global_symbol_table.set('x', 'abc')
+checker = TypeChecker(global_symbol_table)
+checker.check(parse('x * 2\nx = 1\n'))
+assert checker.variables['x'] == 'unknown' and checker.specialized == 0, checker.report()
@@ -0,0 +1,57 @@
+from cathon import errors
+from cathon.interpreter import interpreter
+from cathon.interpreter.values import Object, Int, true, null
+from .common import compare
+
+
+auto = interpreter.auto
+
+
+# 值不记录位置与上下文, 同一个值可以在多处共享而不被修改
+for value in (auto(1), auto('a'), true, null, auto([1])):
+  assert not any(hasattr(value, i) for i in ('pos_start', 'pos_end', 'context', 'set_pos')), value
+
+# 值的方法中的错误按正在执行的节点定位: 共享的值在不同的行出错时报告各自所在的行,
+# 箭头覆盖整个出错的表达式
+SHARED = 'x = "a"\nprint(x.upper)\nprint(x - "b")\n'
+res = compare('<values>', SHARED, errors.AttributeError)
+assert 'line 2' in res and '          ^^^^^^^\n' in res, res
+res = compare('<values>', 'x = "a"\nprint(1)\nprint(x - "b")\n', errors.TypeError)
+assert 'line 3' in res and '          ^^^^^^^\n' in res, res
+
+# 小整数的边界: 范围内总是同一个值, 范围外 (且不在常量池中) 每次新建
+low, high = interpreter.SMALL_INT_MIN, interpreter.SMALL_INT_MAX
+assert auto(low) is auto(low) and auto(high) is auto(high)
+for value in (low - 1, high + 1):
+  assert value not in interpreter.int_constants
+  assert auto(value) is not auto(value) and auto(value).value == value
+
+# 驻留的边界: 恰好 MAX_INTERN_LENGTH 个字符的字符串驻留, 更长的不驻留
+length = interpreter.MAX_INTERN_LENGTH
+assert auto('a' * length) is auto('a' * length)
+assert auto('b' * (length + 1)) is not auto('b' * (length + 1))
+
+
+# bool 与原生类型的子类按最接近的原生类型包装
+class Count(int):
+  pass
+
+
+assert auto(True) is true and type(auto(Count(3))) is Int and type(auto(Count(300))) is Int
+assert type(interpreter.unbox(Count(3))) is Int
+assert interpreter.unbox(5) == 5 and type(interpreter.unbox(5)) is int
+assert interpreter.unbox('s') == 's' and interpreter.unbox(None) is None
+assert isinstance(interpreter.unbox((1,)), Object)
+
+# 原生值的运算跨越小整数的边界时, 结果在各执行方式下相同
+BOUNDARIES = '''\
+x = 255
+print(0 + x + 1, 0 - x - 262, 1 == 1.0, 1 + true, 7 // -2, -7 % 3, 2 ** 100)
+'''
+res = compare('<values>', BOUNDARIES)
+assert res == f'256 -517 true 2 -4 2 {2 ** 100}\n', res
+
+# 字典按内容查找字符串键: 运算得到的字符串无论长短 (是否驻留) 都能找到相等的键
+KEYS = 'd = {"a" * 32: 1, "a" * 33: 2}\nprint(d["a" * 32], d["a" * 33])\n'
+assert compare('<values>', KEYS) == '1 2\n'
+print('ok')
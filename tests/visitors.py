@@ -0,0 +1,69 @@
+from cathon.basic import global_symbol_table
+from cathon.interpreter import Interpreter, ClosureCompiler, Transpiler, Context
+from cathon.lexer.regex_lexer import RegexLexer
+from cathon.parser.parser import Parser
+from cathon.parser.nodes import ASTNode, SingleNode, NumberNode
+from cathon.vm import Compiler
+
+
+def node_classes(cls=ASTNode):
+  for i in cls.__subclasses__():
+    yield i
+    yield from node_classes(i)
+
+
+def number(value):
+  ast = Parser(RegexLexer('<visitors>', f'{value}\n').iter_tokens()).parse()
+  return next(i for i in ast.walk() if isinstance(i, NumberNode))
+
+
+# 每种具体的节点在各执行方式的表中都有对应的方法, 与按名字查找的结果相同
+CONCRETE = set(node_classes()) - {SingleNode}
+for owner, table, prefix in (
+  (Interpreter, Interpreter.visitors, 'visit_'),
+  (ClosureCompiler, ClosureCompiler.compilers, 'compile_'),
+  (Transpiler, Transpiler.transpilers, 'transpile_'),
+  (Compiler, Compiler.compilers, 'compile_'),
+):
+  missing = [i.__name__ for i in CONCRETE if i not in table]
+  assert not missing, (owner.__name__, missing)
+  for cls in CONCRETE:
+    assert table[cls] == getattr(owner, prefix + cls.__name__), (owner.__name__, cls.__name__)
+
+
+# 子类有自己的表, 覆盖的方法不影响 Interpreter
+class Doubling(Interpreter):
+  @staticmethod
+  def visit_NumberNode(node, context):
+    return node.value.value * 2
+
+
+context = Context('<visitors>')
+context.symbol_table = global_symbol_table
+node = number(21)
+assert Doubling.visitors is not Interpreter.visitors
+assert Doubling.visit(node, context) == 42 and Interpreter.visit(node, context) == 21
+
+
+# 之后定义的节点类在第一次访问时按名字查找并记入表中, 没有对应方法时报错
+class LateNode(NumberNode):
+  __slots__ = ()
+
+
+class OtherNode(NumberNode):
+  __slots__ = ()
+
+
+Doubling.visit_LateNode = Doubling.visit_NumberNode
+node.__class__ = LateNode
+assert LateNode not in Doubling.visitors
+assert Doubling.visit(node, context) == 42 and Doubling.visitors[LateNode] is Doubling.visit_NumberNode
+node.__class__ = OtherNode
+try:
+  Doubling.visit(node, context)
+except AttributeError as e:
+  assert str(e) == 'No visit method "visit_OtherNode"', e
+else:
+  raise AssertionError('OtherNode')
+assert OtherNode not in Doubling.visitors
+print(len(CONCRETE), 'node classes ok')
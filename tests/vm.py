@@ -0,0 +1,65 @@
+from cathon import errors
+from cathon.basic import set_builtins, global_symbol_table
+from cathon.lexer.regex_lexer import RegexLexer
+from cathon.parser.parser import Parser
+from cathon.interpreter import Interpreter, Context
+from cathon.optimizer import Optimizer
+from cathon.vm import Compiler, CodeObject, VirtualMachine
+from .common import compare
+
+
+CODE = '''\
+x = 1 + 2 * (3 - 4) / 5 ** 2
+l = [x, 2, "s", {1: x}]
+y = (l[0] - 1) * 2
+若 y < 0:
+  z = -y
+否则:
+  z = +y
+print(l[1:3], z, -x > 0 && 1 || 0)
+'''
+
+
+def context():
+  res = Context('<module>')
+  res.symbol_table = global_symbol_table
+  return res
+
+
+def execute(run, code):
+  try:
+    return repr(run(code))
+  except errors.BaseError as e:
+    return str(e)
+
+
+def run_tree(code):
+  ast = Parser(RegexLexer('<vm>', code).iter_tokens()).parse()
+  return Interpreter.visit(ast, context())
+
+
+def run_vm(code):
+  ast = Parser(RegexLexer('<vm>', code).iter_tokens()).parse()
+  # 经过一次序列化, 行号表与源代码也应随之保存
+  co = CodeObject.loads(Compiler.compile(ast).dumps())
+  return VirtualMachine.run(co, context())
+
+
+set_builtins()
+for code in (
+  CODE,
+  CODE + 'l.a\n',
+  CODE + 'print(x(1))\n',
+  CODE + 'undefined_name\n',
+):
+  expected = execute(run_tree, code)
+  got = execute(run_vm, code)
+  assert got == expected, (got, expected)
+
+# 常量按类型与符号区分: 折叠得到的 -0.0 与 0.0 是两个常量, 序列化后符号不变
+ZEROS = 'print(0.0, -0.0, 1, 1.0, true)\n'
+folded = Optimizer(1).optimize(Parser(RegexLexer('<vm>', ZEROS).iter_tokens()).parse())
+co = CodeObject.loads(Compiler.compile(folded).dumps())
+assert [repr(i) for i in co.consts if type(i) in (int, float, bool)] == ['0.0', '-0.0', '1', '1.0', 'True'], co.consts
+compare('<vm>', ZEROS, expected='0.0 -0.0 1 1.0 true\n', optimizer=Optimizer(1))
+print('ok')